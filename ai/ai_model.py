@@ -1,4 +1,7 @@
 import sys
+import json
+import socketserver
+import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestRegressor
@@ -6,8 +9,14 @@ from sklearn.metrics import mean_squared_error
 import joblib
 import os
 
-MODEL_PATH = "esg_model.pkl"
-DATA_PATH = "esg_data.csv"
+# Đường dẫn tính từ thư mục chứa file này, để backend gọi từ thư mục nào cũng được
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(BASE_DIR, "esg_model.pkl")
+DATA_PATH = os.path.join(BASE_DIR, "esg_data.csv")
+FEATURES = ['revenue', 'emissions']
+
+# (mtime_ns, predictor) của model đang dùng
+_loaded = None
 
 
 def train_model():
@@ -16,7 +25,7 @@ def train_model():
         raise FileNotFoundError(f"Không tìm thấy file dữ liệu: {DATA_PATH}")
 
     data = pd.read_csv(DATA_PATH)
-    X = data[['revenue', 'emissions']]
+    X = data[FEATURES]
     y = data['credit_score']
 
     # Train model
@@ -35,14 +44,90 @@ def train_model():
     joblib.dump(model, MODEL_PATH)
 
 
-def predict_esg(revenue: float, emissions: float) -> float:
-    """Dự đoán ESG score từ revenue và emissions"""
+def load_model():
+    """Nạp model một lần cho mỗi process, nạp lại khi file model thay đổi"""
+    global _loaded
     if not os.path.exists(MODEL_PATH):
         raise FileNotFoundError("Model chưa được train. Hãy chạy: python ai_model.py train")
 
-    loaded_model = joblib.load(MODEL_PATH)
-    input_data = pd.DataFrame({'revenue': [revenue], 'emissions': [emissions]})
-    return float(loaded_model.predict(input_data)[0])
+    mtime = os.stat(MODEL_PATH).st_mtime_ns
+    if _loaded is None or _loaded[0] != mtime:
+        from src.services.forest_engine import compile_predictor
+        _loaded = (mtime, compile_predictor(joblib.load(MODEL_PATH), "compiled"))
+    return _loaded[1]
+
+
+def predict_batch(records: list) -> list:
+    """Dự đoán ESG score cho nhiều bản ghi bằng một lần gọi model"""
+    X = np.empty((len(records), len(FEATURES)))
+    for i, record in enumerate(records):
+        for j, name in enumerate(FEATURES):
+            if record.get(name) is None:
+                raise ValueError(f"Bản ghi {i} thiếu trường '{name}'")
+            X[i, j] = float(record[name])
+    return [float(score) for score in load_model().predict(X)]
+
+
+def predict_esg(revenue: float, emissions: float) -> float:
+    """Dự đoán ESG score từ revenue và emissions"""
+    return predict_batch([{'revenue': revenue, 'emissions': emissions}])[0]
+
+
+def handle_request(line: str) -> dict:
+    """
+    Xử lý một dòng request JSON:
+      {"id": 1, "revenue": 1000000, "emissions": 500}     -> {"id": 1, "esg_score": ...}
+      {"id": 2, "records": [{"revenue": ..., "emissions": ...}]} -> {"id": 2, "esg_scores": [...]}
+    Lỗi được trả về trong trường "error", process vẫn tiếp tục chạy.
+    """
+    response = {}
+    try:
+        request = json.loads(line)
+        if not isinstance(request, dict):
+            raise ValueError("Request phải là một JSON object")
+        if 'id' in request:
+            response['id'] = request['id']
+        if 'records' in request:
+            response['esg_scores'] = predict_batch(request['records'])
+        else:
+            response['esg_score'] = predict_batch([request])[0]
+    except Exception as e:
+        response['error'] = str(e)
+    return response
+
+
+def serve_stream(infile, outfile):
+    """Trả lời từng dòng request (NDJSON) từ infile, mỗi response một dòng"""
+    for line in infile:
+        if not line.strip():
+            continue
+        outfile.write(json.dumps(handle_request(line)) + "\n")
+        outfile.flush()
+
+
+class _SocketHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            self.wfile.write((json.dumps(handle_request(line)) + "\n").encode("utf-8"))
+
+
+def serve_socket(path: str):
+    """Phục vụ NDJSON qua Unix socket, mỗi kết nối một thread"""
+    if os.path.exists(path):
+        os.remove(path)
+    with socketserver.ThreadingUnixStreamServer(path, _SocketHandler) as server:
+        print(f"[INFO] Listening on {path}", file=sys.stderr)
+        server.serve_forever()
+
+
+def serve_stdio():
+    """Phục vụ NDJSON qua stdin/stdout; mọi thứ khác in ra stderr để không lẫn vào response"""
+    responses = os.fdopen(os.dup(sys.stdout.fileno()), "w")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    load_model()
+    serve_stream(sys.stdin, responses)
 
 
 if __name__ == "__main__":
@@ -56,7 +141,20 @@ if __name__ == "__main__":
         emissions = float(sys.argv[2])
         print(predict_esg(revenue, emissions))  # ✅ chỉ in số duy nhất
 
+    # python ai_model.py serve [--socket /tmp/ai_model.sock]
+    elif len(sys.argv) >= 2 and sys.argv[1] == "serve":
+        if len(sys.argv) == 4 and sys.argv[2] == "--socket":
+            load_model()
+            serve_socket(sys.argv[3])
+        else:
+            serve_stdio()
+
+    # echo '{"revenue": 1000000, "emissions": 500}' | python ai_model.py
+    elif len(sys.argv) == 1 and not sys.stdin.isatty():
+        serve_stdio()
+
     else:
         print("Usage:")
         print("  Train model: python ai_model.py train")
         print("  Predict:     python ai_model.py <revenue> <emissions>")
+        print("  Server:      python ai_model.py serve [--socket <path>]  (NDJSON requests)")
@@ -0,0 +1,32 @@
+"""
+Training job executor of the pre-forked server.
+
+    python -m run.jobs
+
+Runs the training jobs that the serving workers queue in the shared job
+history. ``python -m run.serve`` starts and supervises it, so a worker
+replaced after a model reload never takes a running job down with it.
+The development server (``python -m run.run``) runs jobs in-process.
+
+Its training job metrics are written to SERVER_METRICS_DIR, where the
+workers' /metrics picks them up.
+"""
+import signal
+import sys
+
+from src.configs.load_config import Config
+from src.services.job_runner import job_runner
+from src.utils.metrics import metrics
+
+
+def _stop(signum, frame):
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    signal.signal(signal.SIGTERM, _stop)
+    server = Config().server
+    metrics.share(server.metrics_dir, server.metrics_flush_interval)
+    # This process serves no predictions; the server's master picks up new models.
+    job_runner.refresh_models = False
+    job_runner.run_forever()
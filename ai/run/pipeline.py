@@ -0,0 +1,104 @@
+"""
+Run the KFP training pipeline on this machine.
+
+    python -m run.pipeline [--data data/company_esg_financial_dataset.csv] [-o trained_models]
+                           [--n-iter 50] [--s3-endpoint URL] [--no-cache]
+
+Every component of src.controllers.esg_pipeline runs as a local
+subprocess (kfp.local), through the same graph as on the cluster:
+prepare, the search shards, select and export. S3 is reached at
+--s3-endpoint, e.g. a MinIO container:
+
+    docker run -p 9000:9000 -e MINIO_ROOT_USER=minio -e MINIO_ROOT_PASSWORD=minio123 minio/minio server /data
+
+Without it, an in-process moto server stands in for S3 (pip install
+"moto[server]"). The dataset is uploaded first, and the exported model
+and its preprocessing are downloaded to -o. Search shards are cached in
+local_outputs/cache, so a run on unchanged data only prepares and
+exports.
+"""
+import argparse
+import os
+import sys
+
+import boto3
+
+from src.configs.load_config import Config
+
+BUCKET = "datasets"
+MODEL_BUCKET = "models"
+MODEL_KEY = "esg/model.joblib"
+# Written next to the model by the export step
+PREPROCESSING_KEY = "esg/model.preprocessing.json"
+PIPELINE_ROOT = "./local_outputs"
+# The endpoint is an input of every S3 step, so it stays the same across
+# runs for the local cache to hit.
+MOTO_PORT = 5055
+
+
+def run_pipeline(data_path: str, output_dir: str, n_iter: int = 50, s3_endpoint: str | None = None,
+                 cache: bool = True) -> str:
+    """Run the pipeline locally and return the path of the downloaded model."""
+    from kfp import local
+
+    from src.controllers.esg_pipeline import esg_pipeline
+
+    server = None
+    if s3_endpoint is None:
+        server, s3_endpoint = _start_moto()
+    try:
+        s3 = boto3.client("s3", endpoint_url=s3_endpoint,
+                          aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID", "minio"),
+                          aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY", "minio123"))
+        for bucket in (BUCKET, MODEL_BUCKET):
+            if bucket not in {b["Name"] for b in s3.list_buckets()["Buckets"]}:
+                s3.create_bucket(Bucket=bucket)
+        csv_key = os.path.basename(data_path)
+        s3.upload_file(data_path, BUCKET, csv_key)
+        print(f"[INFO] Uploaded {data_path} to s3://{BUCKET}/{csv_key} at {s3_endpoint}", file=sys.stderr)
+
+        local.init(runner=local.SubprocessRunner(use_venv=False), pipeline_root=PIPELINE_ROOT,
+                   enable_caching=cache, cache_root=os.path.join(PIPELINE_ROOT, "cache"))
+        esg_pipeline(bucket=BUCKET, csv_key=csv_key, model_bucket=MODEL_BUCKET, model_key=MODEL_KEY,
+                     n_iter=n_iter, s3_endpoint=s3_endpoint)
+
+        os.makedirs(output_dir, exist_ok=True)
+        model_path = os.path.join(output_dir, "model.joblib")
+        s3.download_file(MODEL_BUCKET, PREPROCESSING_KEY,
+                         os.path.join(output_dir, "model.preprocessing.json"))
+        s3.download_file(MODEL_BUCKET, MODEL_KEY, model_path)
+        print(f"[INFO] Downloaded the exported model to {model_path}", file=sys.stderr)
+        return model_path
+    finally:
+        if server is not None:
+            server.stop()
+
+
+def _start_moto():
+    try:
+        from moto.server import ThreadedMotoServer
+    except ImportError:
+        raise RuntimeError('No --s3-endpoint given and moto is not installed: pip install "moto[server]"')
+    # Component subprocesses sign their requests; moto accepts any credentials.
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=MOTO_PORT, verbose=False)
+    server.start()
+    return server, f"http://127.0.0.1:{MOTO_PORT}"
+
+
+if __name__ == "__main__":
+    config = Config()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=config.data.path)
+    parser.add_argument("-o", "--output", default=config.model.dir, help="where the exported model is written")
+    parser.add_argument("--n-iter", type=int, default=50, help="hyperparameter candidates searched")
+    parser.add_argument("--s3-endpoint", help="S3 API to use instead of an in-process moto server")
+    parser.add_argument("--no-cache", action="store_true", help="run every search shard again")
+    args = parser.parse_args()
+
+    try:
+        run_pipeline(args.data, args.output, args.n_iter, args.s3_endpoint, cache=not args.no_cache)
+    except Exception as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        sys.exit(1)
@@ -3,4 +3,6 @@ from src.controllers.apis import *
 
 app = App(env=Env(), routes=APIS)
 if __name__ == "__main__":
+    # Serve /healthz at once; /readyz turns 200 when the models are loaded.
+    app.env.warm_up.start()
     app.run()
@@ -0,0 +1,72 @@
+"""
+Score a local CSV file without the HTTP service.
+
+    python -m run.score_csv input.csv -o scored.csv [--format csv|ndjson] [--chunk-rows 10000]
+
+Rows are scored like POST /predict/esg_overall/csv: chunk by chunk with
+the ESG_Overall model of MODEL_DIR (or --model-dir) and its
+preprocessing, so memory stays flat whatever the file size. "-" reads
+stdin or writes stdout. Progress goes to stderr; the exit code is 1 if
+the file could not be parsed to the end.
+"""
+import argparse
+import os
+import sys
+
+from src.configs.load_config import Config
+from src.constants.model_features import MODEL_ESG_OVERALL
+from src.services.csv_scoring import CONTENT_TYPES, FORMAT_CSV, CsvScoring
+from src.services.model_registry import model_registry
+
+
+def score_file(input_path: str, output_path: str, output_format: str = FORMAT_CSV,
+               chunk_rows: int = 10000, quiet: bool = False) -> dict:
+    """Score ``input_path`` into ``output_path`` and return the summary counts."""
+    loaded = model_registry.get(MODEL_ESG_OVERALL)
+    source = sys.stdin.buffer if input_path == "-" else open(input_path, "rb")
+    target = sys.stdout if output_path == "-" else open(output_path, "w", newline="")
+    total_bytes = None if input_path == "-" else os.path.getsize(input_path)
+    try:
+        scoring = CsvScoring(source, loaded.predictor, loaded.preprocessor, chunk_rows, output_format,
+                             progress=None if quiet else _progress, total_bytes=total_bytes)
+        for text in scoring:
+            target.write(text)
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+    print(f"[INFO] Scored {scoring.stats['rows']} rows with model {loaded.version}: "
+          f"{scoring.stats['succeeded']} succeeded, {scoring.stats['failed']} failed "
+          f"in {scoring.stats['seconds']:.1f}s", file=sys.stderr)
+    return scoring.stats
+
+
+def _progress(stats: dict) -> None:
+    if stats["bytes_total"]:
+        read = f"{stats['bytes_read'] / stats['bytes_total']:.0%}"
+    else:
+        read = f"{stats['bytes_read'] / 1e6:.1f}MB"
+    print(f"[INFO] {read} read, {stats['rows']} rows scored, {stats['failed']} failed", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    config = Config()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="CSV file to score, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="where to write the scored rows (default: stdout)")
+    parser.add_argument("--format", choices=list(CONTENT_TYPES), default=FORMAT_CSV)
+    parser.add_argument("--chunk-rows", type=int, default=config.model.csv_chunk_rows)
+    parser.add_argument("--model-dir", default=config.model.dir)
+    parser.add_argument("--quiet", action="store_true", help="do not report progress")
+    args = parser.parse_args()
+
+    model_registry.model_dir = args.model_dir
+    try:
+        stats = score_file(args.input, args.output, args.format, args.chunk_rows, args.quiet)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        sys.exit(1)
+    if stats["error"]:
+        print(f"[ERROR] {stats['error']}", file=sys.stderr)
+    sys.exit(1 if stats["error"] else 0)
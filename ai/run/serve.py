@@ -0,0 +1,184 @@
+"""
+Production server: pre-forked gunicorn workers sharing one preloaded model.
+
+    python -m run.serve
+
+The app, the models and their preprocessing are loaded once in the master
+process before the workers are forked, so every worker shares the same
+model memory copy-on-write instead of loading its own copy. This is the
+warm-up (src.services.warm_up), which also test-predicts every model:
+startup fails if the warm-up fails, and workers are ready on /readyz at once.
+
+The master watches the model files. When one changes, it loads the new
+version and replaces the workers gracefully: new workers are forked with
+the new model while the old ones finish their in-flight requests.
+``kill -HUP <master pid>`` does the same by hand.
+
+Training jobs submitted to any worker run in one ``python -m run.jobs``
+process that the master keeps alive, outside the workers it replaces.
+
+Each worker is a separate process with its own prediction cache and its
+own metrics. /metrics still reports the whole server: every process
+(master, workers and run.jobs) writes its metrics to SERVER_METRICS_DIR
+every SERVER_METRICS_FLUSH_INTERVAL seconds, and the worker serving the
+scrape sums those files. Values of the other processes are therefore up
+to one interval old, and a process killed without exiting cleanly (e.g.
+a worker past its timeout) loses what it recorded in its last interval.
+Counters of replaced workers are kept; their gauges are dropped.
+"""
+import gc
+import math
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+from gunicorn.app.base import BaseApplication
+
+from src.configs.load_config import Config
+from src.constants.model_features import MODEL_FILES
+from src.services.job_runner import job_runner
+from src.services.model_registry import model_registry
+from src.utils.logger import logger
+from src.utils.metrics import metrics
+
+# Directory containing the run and src packages
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class ServingApplication(BaseApplication):
+    """Runs the Flask app under gunicorn with the settings of ``Config().server``."""
+
+    def __init__(self, config: Config):
+        self.config = config
+        self.executor = JobExecutor()
+        super().__init__()
+
+    def load_config(self):
+        server = self.config.server
+        settings = {
+            "bind": f"{self.config.flask.host or '0.0.0.0'}:{self.config.flask.port or 5000}",
+            "workers": server.workers,
+            "worker_class": "gthread",
+            "threads": server.threads,
+            "timeout": server.timeout,
+            "graceful_timeout": server.graceful_timeout,
+            "preload_app": True,
+            "when_ready": self.when_ready,
+            "on_reload": self.on_reload,
+            "pre_fork": self.pre_fork,
+            "worker_exit": self.worker_exit,
+            "child_exit": self.child_exit,
+            "on_exit": self.on_exit,
+        }
+        for key, value in settings.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from run.run import app
+
+        server = self.config.server
+        metrics.share(server.metrics_dir, server.metrics_flush_interval, clear=True)
+        if not app.env.warm_up.run():
+            logger.error(f"Cannot start: {app.env.warm_up.error}")
+            sys.exit(1)
+        # Workers never reload a model themselves: the master loads the new
+        # version once and forks new workers that share it.
+        model_registry.check_interval = math.inf
+        # Workers only queue training jobs; run.jobs runs them.
+        job_runner.execute = False
+        return app
+
+    def when_ready(self, server):
+        watcher = ModelWatcher(model_registry.interval)
+        threading.Thread(target=watcher.run, name="model-watcher", daemon=True).start()
+        threading.Thread(target=self.executor.run, name="job-executor", daemon=True).start()
+
+    def on_reload(self, server):
+        # Runs in the master before the replacement workers are forked.
+        for name in MODEL_FILES:
+            try:
+                model_registry.refresh(name)
+            except Exception as e:
+                logger.error(f"Could not reload model {name}, workers keep the loaded version: {e}")
+
+    def pre_fork(self, server, worker):
+        # Objects that exist before the fork are never touched by the cyclic
+        # GC in the workers, so their pages stay shared.
+        gc.collect()
+        gc.freeze()
+
+    def worker_exit(self, server, worker):
+        # Runs in the worker: write what it recorded since the last flush.
+        metrics.flush()
+
+    def child_exit(self, server, worker):
+        metrics.process_exited(worker.pid)
+
+    def on_exit(self, server):
+        self.executor.stop()
+
+
+class ModelWatcher:
+    """
+    Master-side thread that sends the master a SIGHUP when a model file
+    changes. It only stats files (or sends HEAD requests for an s3://
+    MODEL_DIR) and signals: loading happens in the master's main thread,
+    so no lock is ever held across a fork.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = max(interval, 0.1)
+        self._seen = {}
+        self._seen = self._signatures()
+
+    def run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            current = self._signatures()
+            if current != self._seen:
+                # Remember what we signalled for, so a file that fails to
+                # load does not make the workers restart in a loop.
+                self._seen = current
+                os.kill(os.getpid(), signal.SIGHUP)
+
+    def _signatures(self) -> dict:
+        signatures = {}
+        for name in MODEL_FILES:
+            try:
+                signatures[name] = model_registry.signature(name)
+            except FileNotFoundError:
+                signatures[name] = None
+            except Exception as e:
+                # The object store is unreachable: nothing changed as far as we know.
+                logger.warning(f"Could not check model {name}: {e}")
+                signatures[name] = self._seen.get(name)
+        return signatures
+
+
+class JobExecutor:
+    """Master-side thread that keeps one ``python -m run.jobs`` process running."""
+
+    def __init__(self):
+        self.process = None
+        self._stopping = False
+
+    def run(self) -> None:
+        while not self._stopping:
+            self.process = subprocess.Popen([sys.executable, "-m", "run.jobs"], cwd=PROJECT_ROOT)
+            self.process.wait()
+            metrics.process_exited(self.process.pid)
+            if not self._stopping:
+                logger.warning("Training job executor exited, restarting it")
+                time.sleep(1)
+
+    def stop(self) -> None:
+        self._stopping = True
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+
+
+if __name__ == "__main__":
+    ServingApplication(Config()).run()
@@ -0,0 +1,178 @@
+"""
+Offline benchmark suite for the ai service hot paths.
+
+Runs, for the bundled dataset and synthetic copies scaled from its schema:
+training wall time of every trainer (with a fixed search budget), model
+load time, app import and warm-up time for each model artifact,
+preprocessing cost, single-row and batch predict latency for each
+serving engine and explain latency; and the request-path cost of
+request logging. Every case runs in its own process and reports its
+peak RSS.
+
+    python -m src.benchmarks --scales 1 10 100 --output bench.json
+    python -m src.benchmarks --output bench.json --baseline baseline.json --threshold 0.2
+
+With --baseline, metrics that got worse by more than --threshold (as a
+fraction) are listed and the exit code is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from src.benchmarks.synthetic import write_scaled_dataset
+
+# Trainers benchmarked, in order: the update needs the model trained first.
+TRAIN_KINDS = ("esg_overall", "esg_overall_update", "market_cap")
+ENGINES = ("sklearn", "compiled")
+# Model artifacts the startup is measured with, when they were trained
+ARTIFACTS = {"joblib": "model.joblib", "slim": "model.slim.npz"}
+CASE_NAMES = ("train", "load", "startup", "encode", "predict", "explain", "request_log")
+# Metrics where a larger value is better; everything else is a cost.
+HIGHER_IS_BETTER = ("rows_per_s", "r2")
+# Metrics that describe the run rather than its performance
+IGNORED = ("rows", "engine", "artifact", "pending", "written", "dropped")
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def run_suite(data_path: str, scales, work_dir: str, n_jobs: int = 1, max_fits: int = 5,
+              cases=None, verbose: bool = False) -> dict:
+    """Run every case for every scale and return the nested results."""
+    cases = set(cases or CASE_NAMES)
+    results = {}
+    for scale in scales:
+        scale_dir = os.path.join(work_dir, f"x{scale}")
+        model_dir = os.path.join(scale_dir, "model")
+        scaled_path = write_scaled_dataset(data_path, scale, work_dir)
+        common = {"data_path": os.path.abspath(scaled_path), "model_dir": model_dir}
+        scale_results = results[f"x{scale}"] = {}
+
+        if "train" in cases or not os.path.exists(os.path.join(model_dir, "model.joblib")):
+            for kind in TRAIN_KINDS:
+                scale_results[f"train_{kind}"] = _run_case("train", {
+                    **common, "kind": kind, "n_jobs": n_jobs, "max_fits": max_fits,
+                    "data_cache_dir": os.path.join(work_dir, "data_cache"),
+                }, verbose)
+        if "load" in cases:
+            scale_results["load"] = _run_case("load", common, verbose)
+        if "startup" in cases:
+            for artifact, file_name in ARTIFACTS.items():
+                if not os.path.exists(os.path.join(model_dir, file_name)):
+                    continue
+                scale_results[f"startup_{artifact}"] = _run_case("startup", {**common, "artifact": artifact}, verbose)
+        if "encode" in cases:
+            scale_results["encode"] = _run_case("encode", common, verbose)
+        if "predict" in cases:
+            for engine in ENGINES:
+                scale_results[f"predict_{engine}"] = _run_case("predict", {**common, "engine": engine}, verbose)
+        if "explain" in cases:
+            scale_results["explain"] = _run_case("explain", common, verbose)
+    if "request_log" in cases:
+        # Independent of the dataset scale
+        results["request_log"] = _run_case("request_log", {}, verbose)
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[dict]:
+    """List the metrics of ``results`` that regressed by more than ``threshold`` against ``baseline``."""
+    current, previous = _flatten(results["results"]), _flatten(baseline["results"])
+    regressions = []
+    for name, value in current.items():
+        before = previous.get(name)
+        if not before or value is None:
+            continue
+        higher_is_better = name.rsplit(".", 1)[-1] in HIGHER_IS_BETTER
+        change = (before - value) / abs(before) if higher_is_better else (value - before) / abs(before)
+        if change > threshold:
+            regressions.append({"metric": name, "baseline": before, "current": value, "change": round(change, 4)})
+    return regressions
+
+
+def _run_case(case: str, args: dict, verbose: bool) -> dict:
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        result_path = f.name
+    try:
+        started = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-m", "src.benchmarks.cases", case, json.dumps(args), result_path],
+            cwd=PROJECT_ROOT, check=True,
+            stdout=None if verbose else subprocess.DEVNULL,
+            stderr=None if verbose else subprocess.DEVNULL,
+        )
+        with open(result_path) as f:
+            result = json.load(f)
+    finally:
+        os.remove(result_path)
+    label = args.get("kind") or args.get("engine") or args.get("artifact") or ""
+    print(f"[INFO] {case} {label} done in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return result
+
+
+def _flatten(tree: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in tree.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) and key not in IGNORED:
+            flat[name] = value
+    return flat
+
+
+def _environment() -> dict:
+    import numpy
+    import pandas
+    import sklearn
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": numpy.__version__,
+        "pandas": pandas.__version__,
+        "sklearn": sklearn.__version__,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default="data/company_esg_financial_dataset.csv")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--cases", nargs="+", choices=CASE_NAMES)
+    parser.add_argument("--work-dir", default=os.path.join(tempfile.gettempdir(), "esg-benchmarks"))
+    parser.add_argument("--n-jobs", type=int, default=1)
+    parser.add_argument("--max-fits", type=int, default=5, help="CV fits per trainer search")
+    parser.add_argument("--output", help="write the results JSON here (default: stdout)")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="tolerated relative regression")
+    parser.add_argument("--verbose", action="store_true", help="show the output of every case")
+    args = parser.parse_args()
+
+    report = {
+        "created_at": time.time(),
+        "environment": _environment(),
+        "settings": {"scales": args.scales, "n_jobs": args.n_jobs, "max_fits": args.max_fits},
+        "results": run_suite(args.data, args.scales, args.work_dir, args.n_jobs, args.max_fits,
+                             args.cases, args.verbose),
+    }
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["regressions"] = compare(report, json.load(f), args.threshold)
+        report["threshold"] = args.threshold
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    for regression in report.get("regressions", []):
+        print(f"[WARNING] {regression['metric']}: {regression['baseline']} -> {regression['current']} "
+              f"({regression['change']:+.1%})", file=sys.stderr)
+    sys.exit(1 if report.get("regressions") else 0)
@@ -0,0 +1,259 @@
+"""
+Benchmark cases. Each case runs in its own process (see src.benchmarks)
+so that its peak RSS is its own:
+
+    python -m src.benchmarks.cases <case> '<json args>' <result path>
+"""
+import importlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+# Single-row requests cycle through this many distinct dataset rows.
+SAMPLE_ROWS = 1000
+# Modules the serving process should load late, or never
+HEAVY_MODULES = ("pandas", "joblib", "scipy", "sklearn", "sklearn.model_selection", "pymongo", "kfp", "boto3")
+
+
+def bench_train(kind: str, data_path: str, model_dir: str, n_jobs: int, max_fits: int,
+                data_cache_dir: str | None = None, **_) -> dict:
+    """Wall time of one trainer with a fixed search budget."""
+    from src.services.dataset_cache import load_dataset
+    from src.services.job_runner import TRAINERS
+
+    module_name, function_name, _ = TRAINERS[kind]
+    trainer = getattr(importlib.import_module(module_name), function_name)
+
+    started = time.perf_counter()
+    df = load_dataset(data_path, data_cache_dir)
+    load_seconds = time.perf_counter() - started
+
+    params = {"budget": {"max_fits": max_fits}}
+    if kind == "esg_overall_update":
+        params["new_rows"] = max(4, len(df) // 100)
+    started = time.perf_counter()
+    result = trainer(df, model_dir=model_dir, n_jobs=n_jobs, **params)
+    return {
+        "rows": len(df),
+        "data_load_seconds": round(load_seconds, 4),
+        "train_seconds": round(time.perf_counter() - started, 3),
+        "r2": result["metrics"]["r2"],
+    }
+
+
+def bench_load(model_dir: str, repeats: int = 3, **_) -> dict:
+    """Model file size, deserialization time and compiled-engine build time."""
+    import joblib
+
+    from src.services.forest_engine import compile_predictor
+    from src.services.preprocessing import load_preprocessor
+
+    path = os.path.join(model_dir, "model.joblib")
+    load, compile_ = [], []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        model = joblib.load(path)
+        load_preprocessor(path)
+        load.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        compile_predictor(model, "compiled")
+        compile_.append(time.perf_counter() - started)
+    return {
+        "model_mb": round(os.path.getsize(path) / 2**20, 2),
+        "load_seconds": round(min(load), 4),
+        "compile_seconds": round(min(compile_), 4),
+    }
+
+
+def bench_encode(data_path: str, model_dir: str, repeats: int = 2000, **_) -> dict:
+    """Preprocessing cost: single-record encode latency and batch encoding throughput."""
+    import pandas as pd
+
+    from src.services.preprocessing import load_preprocessor
+
+    preprocessor = load_preprocessor(os.path.join(model_dir, "model.joblib"))
+    records = pd.read_csv(data_path, nrows=SAMPLE_ROWS).to_dict("records")
+
+    single = _timed(lambda i: preprocessor.encode(records[i % len(records)]), repeats)
+    batch = _timed(lambda i: preprocessor.encode_records(records), 20)
+    return {
+        "encode_single": _percentiles(single),
+        "encode_batch": {**_percentiles(batch), "rows": len(records),
+                         "rows_per_s": round(len(records) / float(np.median(batch)))},
+    }
+
+
+def bench_predict(data_path: str, model_dir: str, engine: str, repeats: int = 500,
+                  batch_sizes=(100, 1000), **_) -> dict:
+    """
+    End-to-end latency of /predict/esg_overall and /predict/esg_overall/batch
+    through the Flask test client, with the prediction cache disabled.
+    """
+    import pandas as pd
+
+    os.environ.update({"MODEL_DIR": model_dir, "MODEL_ENGINE": engine, "PREDICTION_CACHE_SIZE": "0"})
+    os.environ.setdefault("FLASK_NAME", "esg-benchmark")
+    from run.run import app
+
+    client = app.app.test_client()
+    df = pd.read_csv(data_path, nrows=max(SAMPLE_ROWS, *batch_sizes))
+    records = json.loads(df.to_json(orient="records"))
+
+    def single(i):
+        response = client.post("/predict/esg_overall", json=records[i % SAMPLE_ROWS])
+        assert response.status_code == 200, response.json
+
+    result = {"engine": engine, "single": _percentiles(_timed(single, repeats))}
+    for size in batch_sizes:
+        body = json.dumps(records[:size])
+
+        def batch(_):
+            response = client.post("/predict/esg_overall/batch", data=body, content_type="application/json")
+            assert response.status_code == 200, response.json
+
+        samples = _timed(batch, 20)
+        result[f"batch_{size}"] = {**_percentiles(samples), "rows_per_s": round(size / float(np.median(samples)))}
+    return result
+
+
+def bench_explain(data_path: str, model_dir: str, repeats: int = 500, batch_sizes=(100, 1000), **_) -> dict:
+    """End-to-end latency of /explain/esg_overall and /explain/esg_overall/batch through the Flask test client."""
+    import pandas as pd
+
+    os.environ.update({"MODEL_DIR": model_dir})
+    os.environ.setdefault("FLASK_NAME", "esg-benchmark")
+    from run.run import app
+
+    client = app.app.test_client()
+    df = pd.read_csv(data_path, nrows=max(SAMPLE_ROWS, *batch_sizes))
+    records = json.loads(df.to_json(orient="records"))
+
+    def single(i):
+        response = client.post("/explain/esg_overall", json=records[i % SAMPLE_ROWS])
+        assert response.status_code == 200, response.json
+
+    result = {"single": _percentiles(_timed(single, repeats))}
+    for size in batch_sizes:
+        body = json.dumps(records[:size])
+
+        def batch(_):
+            response = client.post("/explain/esg_overall/batch", data=body, content_type="application/json")
+            assert response.status_code == 200, response.json
+
+        samples = _timed(batch, 20)
+        result[f"batch_{size}"] = {**_percentiles(samples), "rows_per_s": round(size / float(np.median(samples)))}
+    return result
+
+
+def bench_startup(data_path: str, model_dir: str, artifact: str, repeats: int = 3, **_) -> dict:
+    """
+    Cold start of the Flask app: time to import run.run in a fresh
+    interpreter, and the steps of the warm-up until it is ready. The
+    feature store is built in memory, as on a first start.
+    """
+    os.environ.update({"MODEL_DIR": model_dir, "MODEL_ARTIFACT": artifact, "DATA_PATH": data_path,
+                       "DATA_CACHE_DIR": ""})
+    os.environ.setdefault("FLASK_NAME", "esg-benchmark")
+    script = ("import json, sys, time; started = time.perf_counter(); import run.run; "
+              "print(json.dumps([time.perf_counter() - started, sorted(sys.modules)]))")
+    imports = []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, "-c", script], check=True, capture_output=True, text=True).stdout
+        seconds, modules = json.loads(output.splitlines()[-1])
+        imports.append(seconds)
+
+    from run.run import app
+
+    started = time.perf_counter()
+    ready = app.env.warm_up.run()
+    warm_up_seconds = time.perf_counter() - started
+    assert ready, app.env.warm_up.error
+    return {
+        "artifact": artifact,
+        "import_seconds": round(min(imports), 4),
+        "warm_up_seconds": round(warm_up_seconds, 4),
+        "warm_up": app.env.warm_up.status()["steps"],
+        "modules_at_import": [name for name in HEAVY_MODULES if name in modules],
+        "modules_when_ready": [name for name in HEAVY_MODULES if name in sys.modules],
+    }
+
+
+def bench_request_log(repeats: int = 20000, **_) -> dict:
+    """
+    Request-path cost of the request log middleware: start_request_log
+    plus log_request for a logged request and for a sampled-out one. The
+    entries are written to /dev/null by the writer thread.
+    """
+    from flask import Flask
+    from flask_log_request_id import RequestID
+
+    from src.middlewares import log_request as middleware
+    from src.utils.logger import log_writer
+
+    app = Flask("esg-benchmark")
+    RequestID(app)
+    log_writer.stream = open(os.devnull, "w")
+    record = {"Industry": "Retail", "Region": "Asia", "Year": 2020, "Revenue": 1000.0}
+    with app.test_request_context("/predict/esg_overall", method="POST", json=record):
+        app.preprocess_request()
+        response = app.make_response(({"success": True, "prediction": 57.0}, 200))
+
+        def request_log(_):
+            middleware.start_request_log()
+            middleware.log_request(response)
+
+        logged = _timed(request_log, repeats)
+        log_writer.flush(timeout=30)
+        middleware.SAMPLE_2XX = 0.0
+        sampled_out = _timed(request_log, repeats)
+    return {"logged": _percentiles(logged), "sampled_out": _percentiles(sampled_out), **log_writer.stats()}
+
+
+CASES = {
+    "startup": bench_startup,
+    "request_log": bench_request_log,
+    "train": bench_train,
+    "load": bench_load,
+    "encode": bench_encode,
+    "predict": bench_predict,
+    "explain": bench_explain,
+}
+
+
+def _timed(fn, repeats: int, warmup: int = 5) -> list[float]:
+    for i in range(min(warmup, repeats)):
+        fn(i)
+    samples = []
+    for i in range(repeats):
+        started = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def _percentiles(samples: list[float]) -> dict:
+    ms = np.asarray(samples) * 1e3
+    return {
+        "p50_ms": round(float(np.percentile(ms, 50)), 4),
+        "p99_ms": round(float(np.percentile(ms, 99)), 4),
+        "mean_ms": round(float(ms.mean()), 4),
+    }
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+
+if __name__ == "__main__":
+    case, args, result_path = sys.argv[1], json.loads(sys.argv[2]), sys.argv[3]
+    result = CASES[case](**args)
+    result["peak_rss_mb"] = _peak_rss_mb()
+    with open(result_path, "w") as f:
+        json.dump(result, f)
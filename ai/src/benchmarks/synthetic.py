@@ -0,0 +1,61 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.constants.model_features import BUNDLE_TARGETS, TRAIN_FEATURES
+
+# Feature columns that keep their sampled value
+CATEGORICAL_COLUMNS = ("Industry", "Region")
+INTEGER_COLUMNS = ("CompanyID", "Year")
+# Numeric features that are jittered. Training targets keep their sampled value, MarketCap
+# included although it is also a feature of the ESG models.
+JITTERED_COLUMNS = tuple(name for name in TRAIN_FEATURES
+                         if name not in CATEGORICAL_COLUMNS + INTEGER_COLUMNS and name not in BUNDLE_TARGETS)
+# Std of the multiplicative noise applied to numeric feature columns
+JITTER = 0.05
+
+
+def scaled_dataset(df: pd.DataFrame, scale: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Build a synthetic dataset ``scale`` times the size of ``df`` with the same schema.
+
+    Rows are resampled with replacement, so categories, feature correlations
+    and the targets keep their joint distribution; the numeric features of
+    JITTERED_COLUMNS are scaled by a small random factor so no two rows are
+    exact duplicates while signs and magnitudes are preserved. Training
+    targets (the ESG scores and MarketCap) are never jittered. Missing
+    GrowthRate values stay missing at the source rate. Companies are
+    renumbered so names stay unique per (company, year).
+    """
+    if scale == 1:
+        return df.copy()
+    rng = np.random.default_rng(seed)
+    n = len(df) * scale
+    out = df.iloc[rng.integers(0, len(df), size=n)].reset_index(drop=True)
+
+    for name in JITTERED_COLUMNS:
+        if name not in out.columns:
+            continue
+        factor = 1 + rng.standard_normal(n) * JITTER
+        out[name] = np.round(out[name].to_numpy(dtype=np.float64) * factor, 2)
+
+    if "CompanyID" in out.columns:
+        rows_per_company = max(1, len(df) // df["CompanyID"].nunique())
+        out["CompanyID"] = np.arange(n) // rows_per_company + 1
+        if "CompanyName" in out.columns:
+            out["CompanyName"] = "Company_" + out["CompanyID"].astype(str)
+    return out
+
+
+def write_scaled_dataset(source: str, scale: int, work_dir: str, seed: int = 0) -> str:
+    """Write the ``scale``x synthetic copy of a CSV to ``work_dir`` once and return its path."""
+    if scale == 1:
+        return source
+    path = os.path.join(work_dir, f"dataset_x{scale}_seed{seed}.csv")
+    if not os.path.exists(path):
+        os.makedirs(work_dir, exist_ok=True)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        scaled_dataset(pd.read_csv(source), scale, seed).to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    return path
@@ -10,6 +10,138 @@ class Config:
             self.debug = os.getenv('FLASK_DEBUG')
             self.port = os.getenv('FLASK_PORT')
             self.host = os.getenv('FLASK_HOST')
-    
+
+    class MongoDBConfig:
+        def __init__(self):
+            # Predictions and training runs are only persisted when a host (or mongodb:// URI) is set
+            self.host = os.getenv('MONGODB_HOST')
+            self.port = os.getenv('MONGODB_PORT', '27017')
+            self.username = os.getenv('MONGODB_USERNAME')
+            self.password = os.getenv('MONGODB_PASSWORD')
+            self.database = os.getenv('MONGODB_DATABASE', 'esg')
+            # Connections kept per process
+            self.max_pool_size = int(os.getenv('MONGODB_MAX_POOL_SIZE', '10'))
+            self.min_pool_size = int(os.getenv('MONGODB_MIN_POOL_SIZE', '0'))
+            # Documents waiting to be written; new ones are dropped beyond this
+            self.queue_size = int(os.getenv('MONGODB_WRITE_QUEUE_SIZE', '50000'))
+            # Documents per insert_many call
+            self.batch_size = int(os.getenv('MONGODB_WRITE_BATCH_SIZE', '1000'))
+            # Longest a queued document waits before being written
+            self.flush_interval = float(os.getenv('MONGODB_FLUSH_INTERVAL', '0.5'))
+
+    class ModelConfig:
+        def __init__(self):
+            # Local directory, or s3://bucket/prefix to serve models from an object store
+            self.dir = os.getenv('MODEL_DIR', './trained_models')
+            # Seconds between stat() checks of a loaded model file
+            self.check_interval = float(os.getenv('MODEL_CHECK_INTERVAL', '1.0'))
+            # Seconds between HEAD requests checking an s3:// model for a new version
+            self.remote_check_interval = float(os.getenv('MODEL_REMOTE_CHECK_INTERVAL', '30'))
+            # Local copies of s3:// models, one directory per content hash, shared by the workers
+            self.cache_dir = os.getenv('MODEL_CACHE_DIR', './model_cache')
+            # Cached artifact versions kept on disk
+            self.cache_keep = int(os.getenv('MODEL_CACHE_KEEP', '8'))
+            self.max_batch_size = int(os.getenv('PREDICT_MAX_BATCH_SIZE', '10000'))
+            # Rows parsed, encoded and predicted at a time when scoring a CSV file
+            self.csv_chunk_rows = int(os.getenv('PREDICT_CSV_CHUNK_ROWS', '10000'))
+            # 'sklearn' or 'compiled' (flattened-array forest evaluator)
+            self.engine = os.getenv('MODEL_ENGINE', 'sklearn')
+            # Batches above this many rows go to sklearn even with the compiled engine
+            self.engine_max_rows = int(os.getenv('MODEL_ENGINE_MAX_ROWS', '256'))
+            # 'joblib', or 'slim' to serve forests from the compact model.slim.npz
+            # written by the slimming step after training
+            self.artifact = os.getenv('MODEL_ARTIFACT', 'joblib')
+            # Holdout r2 the slimming step may give up to drop trees and depth
+            self.slim_max_r2_drop = float(os.getenv('MODEL_SLIM_MAX_R2_DROP', '0.005'))
+            # SQLite file of the search candidates already cross-validated, so a search
+            # on unchanged data does not fit them again; empty to always search from scratch
+            self.trials_path = os.getenv('SEARCH_TRIALS_PATH', './trained_models/trials.sqlite')
+            # Best candidates of earlier searches tried first when the data has changed
+            self.search_warm_start = int(os.getenv('SEARCH_WARM_START', '10'))
+
+    class CacheConfig:
+        def __init__(self):
+            # Single predictions kept per process; 0 disables the cache
+            self.max_entries = int(os.getenv('PREDICTION_CACHE_SIZE', '10000'))
+            self.ttl_seconds = float(os.getenv('PREDICTION_CACHE_TTL', '3600'))
+            # Versions of a model whose entries are kept, so a rollout or rollback does not empty the cache
+            self.max_versions = int(os.getenv('PREDICTION_CACHE_VERSIONS', '2'))
+            # Optional Redis (or Redis-protocol compatible) server shared by all workers
+            self.redis_url = os.getenv('PREDICTION_CACHE_REDIS_URL')
+
+    class MicroBatchConfig:
+        def __init__(self):
+            # Under concurrent load, wait this long for more single predictions to batch together
+            self.window_ms = float(os.getenv('PREDICT_MICRO_BATCH_WINDOW_MS', '2'))
+            # Rows per batched predict call; 1 predicts every request on its own
+            self.max_rows = int(os.getenv('PREDICT_MICRO_BATCH_ROWS', '64'))
+            # Longest a request waits for its batched prediction
+            self.timeout_seconds = float(os.getenv('PREDICT_MICRO_BATCH_TIMEOUT', '1.0'))
+
+    class DataConfig:
+        def __init__(self):
+            self.path = os.getenv('DATA_PATH', './data/company_esg_financial_dataset.csv')
+            # Columnar copies of training CSVs; empty to parse the CSV on every run
+            self.cache_dir = os.getenv('DATA_CACHE_DIR', './data/cache')
+            # Seconds between checks of the dataset behind the feature store
+            self.check_interval = float(os.getenv('DATA_CHECK_INTERVAL', '5.0'))
+
+    class JobConfig:
+        def __init__(self):
+            # Training jobs running at the same time
+            self.max_workers = int(os.getenv('JOB_MAX_WORKERS', '1'))
+            # Cores each training job may use; the rest stay with prediction traffic
+            self.core_budget = int(os.getenv('JOB_CORE_BUDGET', str(max(1, (os.cpu_count() or 2) // 2))))
+            self.history_path = os.getenv('JOB_HISTORY_PATH', './jobs/history.json')
+            self.history_limit = int(os.getenv('JOB_HISTORY_LIMIT', '200'))
+
+    class ServerConfig:
+        def __init__(self):
+            # Pre-forked worker processes of `python -m run.serve`
+            self.workers = int(os.getenv('SERVER_WORKERS', str(os.cpu_count() or 1)))
+            # Request threads per worker
+            self.threads = int(os.getenv('SERVER_THREADS', '4'))
+            self.timeout = int(os.getenv('SERVER_TIMEOUT', '120'))
+            # Seconds in-flight requests get to finish when workers are replaced
+            self.graceful_timeout = int(os.getenv('SERVER_GRACEFUL_TIMEOUT', '30'))
+            # Directory where the server's processes write their metrics, so /metrics on
+            # any worker reports the whole server; emptied when the server starts
+            self.metrics_dir = os.getenv('SERVER_METRICS_DIR', './metrics')
+            # Seconds between writes of a process's metrics to that directory
+            self.metrics_flush_interval = float(os.getenv('SERVER_METRICS_FLUSH_INTERVAL', '1.0'))
+
+    class S3Config:
+        def __init__(self):
+            # S3 API of MinIO or another compatible store; unset for AWS.
+            # Credentials are read from AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY.
+            self.endpoint_url = os.getenv('S3_ENDPOINT_URL') or None
+            # Byte range per request of parallel downloads, and part size of multipart uploads
+            self.part_size = int(os.getenv('S3_PART_SIZE_MB', '8')) << 20
+            self.max_concurrency = int(os.getenv('S3_MAX_CONCURRENCY', '8'))
+            # Seconds a request may wait for the next bytes; a model check runs on a request thread
+            self.read_timeout = float(os.getenv('S3_READ_TIMEOUT', '5'))
+
+    class LogConfig:
+        def __init__(self):
+            # 'color' (readable text) or 'json' (one object per line, for log collectors)
+            self.format = os.getenv('LOG_FORMAT', 'color')
+            # Lines waiting for the log writer thread; more are dropped and counted
+            self.queue_size = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+            # One JSON line per request: method, path, status, latency and bounded payloads
+            self.requests = os.getenv('REQUEST_LOG', 'true').lower() in ('1', 'true', 'yes')
+            # Fraction of 2xx requests logged; other statuses are always logged
+            self.sample_2xx = float(os.getenv('REQUEST_LOG_SAMPLE_2XX', '1.0'))
+            # Bytes of the request and response bodies kept per line; 0 logs no payloads
+            self.max_payload_bytes = int(os.getenv('REQUEST_LOG_MAX_PAYLOAD', '512'))
+
     def __init__(self):
         self.flask = self.FlaskConfig()
+        self.mongodb = self.MongoDBConfig()
+        self.model = self.ModelConfig()
+        self.cache = self.CacheConfig()
+        self.micro_batch = self.MicroBatchConfig()
+        self.data = self.DataConfig()
+        self.job = self.JobConfig()
+        self.server = self.ServerConfig()
+        self.s3 = self.S3Config()
+        self.log = self.LogConfig()
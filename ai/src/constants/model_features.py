@@ -13,3 +13,47 @@ TRAIN_FEATURES = [
     "Industry", "Region", "Year", "Revenue", "ProfitMargin", "MarketCap",
     "GrowthRate", "CarbonEmissions", "WaterUsage", "EnergyConsumption"
 ]
+
+# ESG scores predicted together by the model bundle
+ESG_PILLARS = ["ESG_Overall", "ESG_Environmental", "ESG_Social", "ESG_Governance"]
+
+# Targets of the model bundle, in output order
+BUNDLE_TARGETS = ESG_PILLARS + ["MarketCap"]
+
+# Models served by the registry, keyed by name
+MODEL_ESG_OVERALL = "esg_overall"
+MODEL_BUNDLE = "bundle"
+
+MODEL_FILES = {
+    MODEL_ESG_OVERALL: "model.joblib",
+    MODEL_BUNDLE: "bundle.joblib",
+}
+
+# Compact artifacts served instead with MODEL_ARTIFACT=slim
+SLIM_MODEL_FILES = {
+    MODEL_ESG_OVERALL: "model.slim.npz",
+}
+
+# Hyperparameter search modes of the training jobs
+SEARCH_RANDOM = "random"
+SEARCH_HALVING = "halving"
+SEARCH_MODES = (SEARCH_RANDOM, SEARCH_HALVING)
+
+# Hyperparameter grid of the ESG forests
+ESG_FOREST_PARAMS = {
+    'n_estimators': [100, 200, 500],
+    'max_depth': [None, 10, 20, 30],
+    'min_samples_split': [2, 5, 10],
+    'min_samples_leaf': [1, 2, 4],
+    'max_features': [1.0, 'sqrt'],
+    'bootstrap': [True, False]
+}
+# Hyperparameter grid of the MarketCap gradient boosting model
+MARKET_CAP_BOOSTING_PARAMS = {
+    'n_estimators': [100, 200, 300],
+    'learning_rate': [0.01, 0.05, 0.1, 0.2],
+    'max_depth': [3, 5, 7],
+    'subsample': [0.8, 1.0],
+    'min_samples_split': [2, 5, 10],
+    'min_samples_leaf': [1, 2, 4]
+}
@@ -1,10 +1,32 @@
 from src.controllers.service_controller import *
 from src.controllers.routes import *
-from src.controllers.model_controller import *
+from src.controllers.lazy_handler import LazyHandler
+
+# Imported by the warm-up or on their first request, so the app starts
+# without pandas, the model libraries or the job runner.
+MODEL_CONTROLLER = 'src.controllers.model_controller'
+JOB_CONTROLLER = 'src.controllers.job_controller'
 
 APIS = [
     (ROUTE_PING, ping),
-    (ROUTE_TRAIN_ESG_OVERALL, train_model_esg_overall),
-    (ROUTE_PREDICT_ESG_OVERALL, predict_esg_overall),
-    (ROUTE_TRAIN_MARKET_CAP, train_model_market_cap),
+    (ROUTE_METRICS, get_metrics),
+    (ROUTE_HEALTHZ, healthz),
+    (ROUTE_READYZ, readyz),
+    (ROUTE_TRAIN_ESG_OVERALL, LazyHandler(JOB_CONTROLLER, 'submit_train_esg_overall')),
+    (ROUTE_UPDATE_ESG_OVERALL, LazyHandler(JOB_CONTROLLER, 'submit_update_esg_overall')),
+    (ROUTE_PREDICT_ESG_OVERALL, LazyHandler(MODEL_CONTROLLER, 'predict_esg_overall')),
+    (ROUTE_PREDICT_ESG_OVERALL_BATCH, LazyHandler(MODEL_CONTROLLER, 'predict_esg_overall_batch')),
+    (ROUTE_PREDICT_ESG_OVERALL_CSV, LazyHandler(MODEL_CONTROLLER, 'predict_esg_overall_csv')),
+    (ROUTE_PREDICT_ESG_OVERALL_BY_ID, LazyHandler(MODEL_CONTROLLER, 'predict_esg_overall_by_id')),
+    (ROUTE_PREDICT_ESG, LazyHandler(MODEL_CONTROLLER, 'predict_esg')),
+    (ROUTE_EXPLAIN_ESG_OVERALL, LazyHandler(MODEL_CONTROLLER, 'explain_esg_overall')),
+    (ROUTE_EXPLAIN_ESG_OVERALL_BATCH, LazyHandler(MODEL_CONTROLLER, 'explain_esg_overall_batch')),
+    (ROUTE_PREDICTION_CACHE, LazyHandler(MODEL_CONTROLLER, 'prediction_cache_stats')),
+    (ROUTE_CLEAR_PREDICTION_CACHE, LazyHandler(MODEL_CONTROLLER, 'clear_prediction_cache')),
+    (ROUTE_TRAIN_MARKET_CAP, LazyHandler(JOB_CONTROLLER, 'submit_train_market_cap')),
+    (ROUTE_TRAIN_BUNDLE, LazyHandler(JOB_CONTROLLER, 'submit_train_bundle')),
+    (ROUTE_MODELS, LazyHandler(MODEL_CONTROLLER, 'list_models')),
+    (ROUTE_JOBS, LazyHandler(JOB_CONTROLLER, 'list_jobs')),
+    (ROUTE_JOB, LazyHandler(JOB_CONTROLLER, 'get_job')),
+    (ROUTE_CANCEL_JOB, LazyHandler(JOB_CONTROLLER, 'cancel_job')),
 ]
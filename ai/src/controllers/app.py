@@ -2,9 +2,12 @@ from flask import Flask
 from flask_cors import CORS
 from flask_log_request_id import RequestID
 
-from src.middlewares.log_request import log_request
+from src.middlewares.log_request import RequestIdFilter, log_request, start_request_log
+from src.middlewares.request_metrics import end_request, record_request, start_request_timer
+from src.utils.logger import handler as log_handler
 from ..models.route import Route
 from .env import Env
+from .lazy_handler import LazyHandler
 
 class App:
     """
@@ -20,10 +23,11 @@ class App:
         self.app = Flask(env.config.flask.name)
 
         self._setup_request_id()
+        self._setup_metrics()
         self._setup_routes(routes or [])
         self._setup_cors()
-        # Uncomment if middleware compatibility is resolved
-        # self._setup_middlewares()
+        if env.config.log.requests:
+            self._setup_middlewares()
 
     def __call__(self, *args, **kwargs):
         return self.app(*args, **kwargs)
@@ -32,17 +36,27 @@ class App:
         """Attach request ID middleware."""
         RequestID(self.app)
 
+    def _setup_metrics(self):
+        """Record per-route latency and in-flight requests for /metrics."""
+        self.app.before_request(start_request_timer)
+        self.app.after_request(record_request)
+        self.app.teardown_request(end_request)
+
     def _setup_middlewares(self):
-        """Attach custom middlewares."""
+        """Log every request from the log writer thread, and tag log records with the request id."""
+        self.app.before_request(start_request_log)
         self.app.after_request(log_request)
+        log_handler.addFilter(RequestIdFilter())
 
     def _setup_cors(self):
         """Enable CORS for the application."""
         CORS(self.app)
 
     def _setup_routes(self, routes: list[tuple[Route, any]]):
-        """Register routes to the Flask app."""
+        """Register routes to the Flask app; lazy handlers are imported by the warm-up."""
         for route, handler in routes:
+            if isinstance(handler, LazyHandler):
+                self.env.warm_up.handlers.append(handler)
             setattr(self, route.name, handler)
             self.app.add_url_rule(
                 route.path,
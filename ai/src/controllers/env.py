@@ -1,7 +1,11 @@
 from ..configs.load_config import Config
-from ..stores.store import Store
+from ..services.warm_up import warm_up
+from ..stores.esg import esg_store
 
 class Env:
     def __init__(self):
         self.config = Config()
-        # self.db_store = Store(self.config)
\ No newline at end of file
+        # Write-behind MongoDB persistence; records nothing unless MONGODB_HOST is set
+        self.db_store = esg_store
+        # Loads and test-predicts the models; /readyz reports its progress
+        self.warm_up = warm_up
@@ -1,134 +1,209 @@
-import kfp
+import json
+from typing import List
+
 from kfp import dsl
 from kfp.dsl import component
 
+from src.constants.model_features import ESG_FOREST_PARAMS
+
+# search_shard_component tasks the candidates are spread over
+SEARCH_SHARDS = 5
+# In-cluster MinIO of Kubeflow
+S3_ENDPOINT = "http://minio-service.kubeflow:9000"
+
+
 @component(
     base_image="python:3.10",
-    packages_to_install=["pandas", "scikit-learn", "joblib", "boto3"]
+    packages_to_install=["pandas", "numpy", "boto3"]
 )
-def train_component(bucket: str, csv_key: str, model_bucket: str, model_key: str) -> str:
+def prepare_component(bucket: str, csv_key: str, s3_endpoint: str) -> str:
+    """
+    Encode the CSV like the service's Preprocessor and upload the encoded
+    arrays, holdout split and preprocessing under prepared/<fingerprint>/
+    of ``bucket``. Returns that prefix: the search and export steps only
+    take it, so they are cached as long as the data does not change.
+    """
+    import hashlib
+    import io
+    import json
     import os
+
     import boto3
+    import numpy as np
     import pandas as pd
-    from sklearn import preprocessing
-    from sklearn.preprocessing import LabelEncoder
-    from sklearn.model_selection import train_test_split
-    from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
-    from sklearn.metrics import mean_absolute_error, r2_score, mean_squared_error, root_mean_squared_error
-    from sklearn.model_selection import RandomizedSearchCV
-    import joblib
 
-    # MinIO client
-    s3 = boto3.client(
-        "s3",
-        endpoint_url="http://minio-service.kubeflow:9000",
-        aws_access_key_id="minio",
-        aws_secret_access_key="minio123"
-    )
-
-    # Download dataset
-    local_csv = "/tmp/data.csv"
-    s3.download_file(bucket, csv_key, local_csv)
-    df = pd.read_csv(local_csv)
-
-    # Train
-    model_dir = "/tmp/model"
-    
-    def train_model_esg_overall(df: pd.DataFrame, model_dir: str = "./trained_models") -> str:
-        # Placeholder for model training logic
-        print(df.head())
-
-        df['GrowthRate'] = df['GrowthRate'].fillna(df['GrowthRate'].mean())
-
-        le = preprocessing.LabelEncoder()
-        df['NewCompanyName'] = le.fit_transform(df.CompanyName)
-
-        col = ['Industry', 'Region', 'Year', 'Revenue', 'ProfitMargin', 'MarketCap',
-        'GrowthRate', 'CarbonEmissions', 'WaterUsage', 'EnergyConsumption']
-
-        df_X = df[col]
-        le = LabelEncoder()
-        df_X['Industry'] = le.fit_transform(df_X['Industry'])
-        df_X['Region'] = le.fit_transform(df_X['Region'])
-
-        df_Y = df['ESG_Overall']
-        x_train, x_test, y_train, y_test = train_test_split(
-            df_X, df_Y, test_size=0.22, random_state=42)
-
-        print("Model training started.")
-        # Random Forest Regression
-        rf = RandomForestRegressor()
-        # Hyperparameter grid
-        param_dist = {
-            'n_estimators': [100, 200, 500],
-            'max_depth': [None, 10, 20, 30],
-            'min_samples_split': [2, 5, 10],
-            'min_samples_leaf': [1, 2, 4],
-            'max_features': ['auto', 'sqrt'],
-            'bootstrap': [True, False]
-        }
-
-        random_search = RandomizedSearchCV(
-            estimator=rf,
-            param_distributions=param_dist,
-            n_iter=50,
-            cv=5,
-            verbose=2,
-            scoring='r2',
-            random_state=42,
-            n_jobs=-1
-        )
-        
-        random_search.fit(x_train, y_train)
-        best_rf = random_search.best_estimator_
-
-        # Evaluate
-        y_pred = best_rf.predict(x_test)
-        r2 = r2_score(y_test, y_pred)
-        mse = mean_squared_error(y_test, y_pred)
-        rmse = root_mean_squared_error(y_test, y_pred)
-        mae = mean_absolute_error(y_test, y_pred)
-
-        print("Best Parameters:", random_search.best_params_)
-        print(f"R² Score: {r2:.2f}")
-        print(f"MSE: {mse:.2f}")
-        print(f"MAE: {mae:.2f}")
-        print(f"RMSE: {rmse:.2f}")
-
-        final_rf = RandomForestRegressor(**random_search.best_params_, random_state=42)
-        final_rf.fit(df_X, df_Y)
-
-        print("Saving the trained model...")
-        os.makedirs(model_dir, exist_ok=True)
-        model_path = os.path.join(model_dir, "model_esg_overall.joblib")
-        joblib.dump(final_rf, model_path)
-        print(f"[INFO] Saved model to {model_path}")
-
-        print("Model training completed.")
-        return model_path
-    
-    model_path = train_model_esg_overall(df, model_dir=model_dir)
-
-    # Upload model back
-    s3.upload_file(model_path, model_bucket, model_key)
-    print(f"[INFO] Model uploaded to s3://{model_bucket}/{model_key}")
+    features = ["Industry", "Region", "Year", "Revenue", "ProfitMargin", "MarketCap",
+                "GrowthRate", "CarbonEmissions", "WaterUsage", "EnergyConsumption"]
+    s3 = boto3.client("s3", endpoint_url=s3_endpoint,
+                      aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID", "minio"),
+                      aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY", "minio123"))
+    df = pd.read_csv(io.BytesIO(s3.get_object(Bucket=bucket, Key=csv_key)["Body"].read()))
+
+    # Same tables as Preprocessor.fit: sorted category codes, GrowthRate mean fill
+    categories = {name: sorted(df[name].dropna().unique().tolist()) for name in ("Industry", "Region")}
+    fill_values = {"GrowthRate": float(df["GrowthRate"].mean())}
+    X = np.empty((len(df), len(features)), dtype=np.float32)
+    for j, name in enumerate(features):
+        if name in categories:
+            X[:, j] = pd.Categorical(df[name], categories=categories[name]).codes
+        else:
+            X[:, j] = df[name].fillna(fill_values.get(name, np.nan)).to_numpy(dtype=np.float64)
+    y = df["ESG_Overall"].to_numpy(dtype=np.float64)
+    preprocessing = {"format_version": 1, "features": features, "categories": categories,
+                     "fill_values": fill_values}
+
+    # Holdout split of train_model_esg_overall: train_test_split(test_size=0.22, random_state=42)
+    n_test = int(np.ceil(0.22 * len(df)))
+    order = np.random.RandomState(42).permutation(len(df))
+    test_index, train_index = order[:n_test], order[n_test:]
+
+    digest = hashlib.sha256(X.tobytes() + y.tobytes() + train_index.tobytes())
+    digest.update(json.dumps(preprocessing, sort_keys=True).encode("utf-8"))
+    prefix = f"prepared/{digest.hexdigest()[:16]}"
+    buffer = io.BytesIO()
+    np.savez(buffer, X=X, y=y, train_index=train_index, test_index=test_index)
+    s3.put_object(Bucket=bucket, Key=f"{prefix}/dataset.npz", Body=buffer.getvalue())
+    s3.put_object(Bucket=bucket, Key=f"{prefix}/preprocessing.json", Body=json.dumps(preprocessing).encode("utf-8"))
+    print(f"[INFO] Prepared {len(df)} rows ({len(train_index)} train) as s3://{bucket}/{prefix}")
+    return prefix
+
+
+@component(base_image="python:3.10")
+def plan_shards_component(dataset: str, n_shards: int) -> list:
+    """One {"dataset", "shard", "n_shards"} item per search shard, fanned out by the pipeline."""
+    return [{"dataset": dataset, "shard": shard, "n_shards": n_shards} for shard in range(n_shards)]
+
+
+@component(
+    base_image="python:3.10",
+    packages_to_install=["numpy", "scikit-learn", "boto3"]
+)
+def search_shard_component(bucket: str, dataset: str, param_grid: str, n_iter: int, shard: int,
+                           n_shards: int, s3_endpoint: str) -> str:
+    """
+    Cross-validate every ``n_shards``-th of the ``n_iter`` candidates
+    RandomizedSearchCV(random_state=42) samples from ``param_grid``,
+    starting at ``shard``, on the 5 folds of the training rows. Returns
+    the trials as JSON: [{"index", "params", "fold_scores"}].
+    """
+    import io
+    import json
+    import os
+
+    import boto3
+    import numpy as np
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.model_selection import KFold, ParameterSampler, cross_val_score
+
+    s3 = boto3.client("s3", endpoint_url=s3_endpoint,
+                      aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID", "minio"),
+                      aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY", "minio123"))
+    data = np.load(io.BytesIO(s3.get_object(Bucket=bucket, Key=f"{dataset}/dataset.npz")["Body"].read()))
+    X, y = data["X"][data["train_index"]], data["y"][data["train_index"]]
+
+    candidates = list(ParameterSampler(json.loads(param_grid), n_iter, random_state=42))
+    trials = []
+    for index in range(shard, len(candidates), n_shards):
+        scores = cross_val_score(RandomForestRegressor(**candidates[index]), X, y, cv=KFold(5),
+                                 scoring="r2", n_jobs=-1)
+        trials.append({"index": index, "params": candidates[index], "fold_scores": scores.tolist()})
+        print(f"[INFO] Candidate {index}: r2 {scores.mean():.4f} {candidates[index]}")
+    return json.dumps(trials)
+
+
+@component(base_image="python:3.10")
+def select_component(shard_trials: List[str]) -> str:
+    """Pick the candidate with the best mean CV score; ties go to the first sampled, as in RandomizedSearchCV."""
+    import json
+    import math
+
+    trials = sorted((trial for shard in shard_trials for trial in json.loads(shard)), key=lambda t: t["index"])
+    for trial in trials:
+        mean = sum(trial["fold_scores"]) / len(trial["fold_scores"])
+        trial["cv_r2"] = mean if math.isfinite(mean) else -math.inf
+    best = max(trials, key=lambda t: (t["cv_r2"], -t["index"]))
+    print(f"[INFO] Best of {len(trials)} candidates: r2 {best['cv_r2']:.4f} {best['params']}")
+    return json.dumps({"params": best["params"], "cv_r2": best["cv_r2"], "candidates": len(trials)})
+
+
+@component(
+    base_image="python:3.10",
+    packages_to_install=["numpy", "scikit-learn", "joblib", "boto3"]
+)
+def export_component(bucket: str, dataset: str, best: str, model_bucket: str, model_key: str,
+                     s3_endpoint: str) -> str:
+    """
+    Report the holdout metrics of the selected parameters, refit them on
+    every row and upload the forest with its preprocessing next to it
+    (model.joblib + model.preprocessing.json), as the service loads them.
+    Both carry their SHA-256 in the "sha256" metadata the service's
+    artifact store checks downloads against.
+    """
+    import hashlib
+    import io
+    import json
+    import os
+    import time
 
+    import boto3
+    import joblib
+    import numpy as np
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.metrics import r2_score, root_mean_squared_error
+
+    s3 = boto3.client("s3", endpoint_url=s3_endpoint,
+                      aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID", "minio"),
+                      aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY", "minio123"))
+    data = np.load(io.BytesIO(s3.get_object(Bucket=bucket, Key=f"{dataset}/dataset.npz")["Body"].read()))
+    preprocessing = s3.get_object(Bucket=bucket, Key=f"{dataset}/preprocessing.json")["Body"].read()
+    X, y, train_index, test_index = data["X"], data["y"], data["train_index"], data["test_index"]
+    params = json.loads(best)["params"]
+
+    holdout = RandomForestRegressor(**params, random_state=42, n_jobs=-1).fit(X[train_index], y[train_index])
+    y_pred = holdout.predict(X[test_index])
+    r2, rmse = r2_score(y[test_index], y_pred), root_mean_squared_error(y[test_index], y_pred)
+    print(f"[INFO] Holdout r2 {r2:.4f}, rmse {rmse:.4f}")
+
+    model = RandomForestRegressor(**params, random_state=42).fit(X, y)
+    model.training_info_ = {"rows": len(X), "r2": float(r2), "rmse": float(rmse),
+                            "trained_at": time.time(), "updates": 0}
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    preprocessing_key = model_key[:-len(".joblib")] if model_key.endswith(".joblib") else model_key
+    for key, body in ((f"{preprocessing_key}.preprocessing.json", preprocessing), (model_key, buffer.getvalue())):
+        s3.put_object(Bucket=model_bucket, Key=key, Body=body,
+                      Metadata={"sha256": hashlib.sha256(body).hexdigest()})
+    print(f"[INFO] Model uploaded to s3://{model_bucket}/{model_key}")
     return f"s3://{model_bucket}/{model_key}"
 
 
 @dsl.pipeline(
     name="ESG Training Pipeline",
-    description="Train and export ESG RandomForest model"
+    description="Search, select and export the ESG_Overall RandomForest, the search fanned out over shards"
 )
 def esg_pipeline(
     bucket: str = "datasets",
     csv_key: str = "company_esg_financial_dataset.csv",
     model_bucket: str = "models",
-    model_key: str = "esg/model_esg_overall.joblib"
+    model_key: str = "esg/model.joblib",
+    n_iter: int = 50,
+    s3_endpoint: str = S3_ENDPOINT
 ):
-    train_component(
-        bucket=bucket,
-        csv_key=csv_key,
-        model_bucket=model_bucket,
-        model_key=model_key
-    )
+    # Reads an object that may change under the same key, so it always runs
+    prepare = prepare_component(bucket=bucket, csv_key=csv_key, s3_endpoint=s3_endpoint)
+    prepare.set_caching_options(False)
+
+    # The loop body only takes task outputs through its items, which is
+    # also all the local runner (kfp.local) passes into a ParallelFor.
+    plan = plan_shards_component(dataset=prepare.output, n_shards=SEARCH_SHARDS)
+    with dsl.ParallelFor(items=plan.output) as item:
+        search = search_shard_component(
+            bucket=bucket, dataset=item.dataset, param_grid=json.dumps(ESG_FOREST_PARAMS),
+            n_iter=n_iter, shard=item.shard, n_shards=item.n_shards, s3_endpoint=s3_endpoint)
+
+    select = select_component(shard_trials=dsl.Collected(search.output))
+
+    export = export_component(bucket=bucket, dataset=prepare.output, best=select.output,
+                              model_bucket=model_bucket, model_key=model_key, s3_endpoint=s3_endpoint)
+    # Uploads the model, so it never reuses an earlier result
+    export.set_caching_options(False)
@@ -0,0 +1,113 @@
+from flask import request
+
+from src.constants.model_features import SEARCH_MODES
+from src.services.job_runner import job_runner
+
+
+def submit_train_esg_overall():
+    """
+    Queue an ESG_Overall training job; poll /jobs/<id> for its status.
+
+    Optional JSON body: {"search_mode": "random" | "halving",
+    "budget": {"max_fits": int, "max_seconds": float}, "reuse_trials": bool}.
+    reuse_trials (default true) skips the candidates already scored on the
+    same data.
+    """
+    return _submit('esg_overall')
+
+def submit_update_esg_overall():
+    """
+    Queue an incremental ESG_Overall update that adds trees to the saved
+    model, falling back to a full retrain when holdout quality drops.
+
+    Optional JSON body: {"new_rows": int, "since_year": int,
+    "n_new_trees": int, "replace_oldest": bool, "max_rmse_increase": float},
+    plus search_mode and budget for the fallback.
+    """
+    return _submit('esg_overall_update', _update_params)
+
+def submit_train_market_cap():
+    """Queue a MarketCap training job; poll /jobs/<id> for its status."""
+    return _submit('market_cap')
+
+def submit_train_bundle():
+    """
+    Queue a training job for every ESG pillar and MarketCap, saved as one
+    model bundle; poll /jobs/<id> for its status.
+
+    Optional JSON body: {"multi_output": bool, "max_r2_drop": float},
+    plus search_mode and budget.
+    """
+    return _submit('bundle', _bundle_params)
+
+def list_jobs():
+    return {'success': True, 'jobs': job_runner.list()}, 200
+
+def get_job(job_id: str):
+    job = job_runner.get(job_id)
+    if job is None:
+        return {'success': False, 'error': f'Job not found: {job_id}'}, 404
+    return {'success': True, 'job': job}, 200
+
+def cancel_job(job_id: str):
+    job = job_runner.cancel(job_id)
+    if job is None:
+        return {'success': False, 'error': f'Job not found: {job_id}'}, 404
+    return {'success': True, 'job': job}, 200
+
+def _submit(kind: str, parse_params=None):
+    parse_params = parse_params or _search_params
+    try:
+        job = job_runner.submit(kind, parse_params(request.get_json(silent=True) or {}))
+        return {'success': True, 'job': job}, 202
+    except Exception as e:
+        return {'success': False, 'error': str(e)}, 400
+
+def _search_params(body: dict) -> dict:
+    params = {}
+    if 'search_mode' in body:
+        if body['search_mode'] not in SEARCH_MODES:
+            raise ValueError(f"Invalid search_mode: {body['search_mode']}. Allowed: {list(SEARCH_MODES)}")
+        params['search_mode'] = body['search_mode']
+    if body.get('budget'):
+        budget = body['budget']
+        unknown = set(budget) - {'max_fits', 'max_seconds'}
+        if unknown:
+            raise ValueError(f"Unknown budget keys: {sorted(unknown)}. Allowed: ['max_fits', 'max_seconds']")
+        if any(not isinstance(v, (int, float)) or v <= 0 for v in budget.values()):
+            raise ValueError("Budget values must be positive numbers")
+        params['budget'] = budget
+    if 'reuse_trials' in body:
+        if not isinstance(body['reuse_trials'], bool):
+            raise ValueError("reuse_trials must be a boolean")
+        params['reuse_trials'] = body['reuse_trials']
+    return params
+
+def _update_params(body: dict) -> dict:
+    params = _search_params(body)
+    for key in ('new_rows', 'since_year', 'n_new_trees'):
+        if key in body:
+            if not isinstance(body[key], int) or isinstance(body[key], bool) or body[key] <= 0:
+                raise ValueError(f"{key} must be a positive integer")
+            params[key] = body[key]
+    if 'replace_oldest' in body:
+        if not isinstance(body['replace_oldest'], bool):
+            raise ValueError("replace_oldest must be a boolean")
+        params['replace_oldest'] = body['replace_oldest']
+    if 'max_rmse_increase' in body:
+        if not isinstance(body['max_rmse_increase'], (int, float)) or body['max_rmse_increase'] < 0:
+            raise ValueError("max_rmse_increase must be a non-negative number")
+        params['max_rmse_increase'] = body['max_rmse_increase']
+    return params
+
+def _bundle_params(body: dict) -> dict:
+    params = _search_params(body)
+    if 'multi_output' in body:
+        if not isinstance(body['multi_output'], bool):
+            raise ValueError("multi_output must be a boolean")
+        params['multi_output'] = body['multi_output']
+    if 'max_r2_drop' in body:
+        if not isinstance(body['max_r2_drop'], (int, float)) or body['max_r2_drop'] < 0:
+            raise ValueError("max_r2_drop must be a non-negative number")
+        params['max_r2_drop'] = body['max_r2_drop']
+    return params
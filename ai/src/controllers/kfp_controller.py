@@ -1,11 +1,14 @@
-from kfp import Client
-from controllers.model_controller import train_model_esg_overall
-from controllers.esg_pipeline import esg_pipeline
+from src.controllers.esg_pipeline import esg_pipeline
 
-client = Client(host="http://localhost:8080")  # Replace with your KFP endpoint
+# Replace with your KFP endpoint
+KFP_HOST = "http://localhost:8080"
 
 
 def create_training_pipeline(csv_path: str, model_dir: str) -> None:
+    # Imported here so that nothing connects to KFP when this module is imported
+    from kfp import Client
+
+    client = Client(host=KFP_HOST)
     experiment = client.create_experiment(name="esg-experiment")
 
     run = client.create_run_from_pipeline_package(
@@ -21,4 +24,4 @@ if __name__ == "__main__":
     create_training_pipeline(
         csv_path="/mnt/data/company_esg_financial_dataset.csv",
         model_dir="/mnt/models/esg-model"
-    )
\ No newline at end of file
+    )
@@ -0,0 +1,28 @@
+import importlib
+
+
+class LazyHandler:
+    """
+    A route handler imported from its module on first use.
+
+    Routes can be registered without importing the modules behind them, so
+    the app starts with Flask alone. ``resolve()`` imports the handler; the
+    warm-up calls it before the service reports ready, and a request that
+    comes first resolves it itself.
+    """
+
+    def __init__(self, module: str, name: str):
+        self.module = module
+        self.__name__ = name
+        self._handler = None
+
+    def resolve(self):
+        if self._handler is None:
+            self._handler = getattr(importlib.import_module(self.module), self.__name__)
+        return self._handler
+
+    def __call__(self, *args, **kwargs):
+        return (self._handler or self.resolve())(*args, **kwargs)
+
+    def __repr__(self):
+        return f"LazyHandler({self.module}.{self.__name__})"
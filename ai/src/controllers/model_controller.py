@@ -1,309 +1,372 @@
-import os
-from flask import request
-import pandas as pd
-from sklearn import preprocessing
-from sklearn.preprocessing import LabelEncoder
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
-from sklearn.metrics import mean_absolute_error, r2_score, mean_squared_error, root_mean_squared_error
-from sklearn.model_selection import RandomizedSearchCV
-import joblib
-from typing import Dict, Union
-
-ALLOWED_INDUSTRIES = [
-    "Retail", "Transportation", "Technology", "Finance", "Healthcare",
-    "Energy", "Consumer Goods", "Utilities", "Manufacturing"
-]
-
-ALLOWED_REGIONS = [
-    "Latin America", "Asia", "Africa", "Middle East",
-    "Oceania", "Europe", "North America"
-]
-
-# Features used during training
-TRAIN_FEATURES = [
-    "Industry", "Region", "Year", "Revenue", "ProfitMargin", "MarketCap",
-    "GrowthRate", "CarbonEmissions", "WaterUsage", "EnergyConsumption"
-]
-
-def examine_data(df: pd.DataFrame) -> None:
-    print(df.head())
-    print(df.info())
-    print(df.describe())
-    print(df.isnull().sum())
-
-def train_model_esg_overall(df: pd.DataFrame, model_dir: str = "./trained_models") -> str:
-    # Placeholder for model training logic
-    print(df.head())
-
-    df['GrowthRate'] = df['GrowthRate'].fillna(df['GrowthRate'].mean())
-
-    le = preprocessing.LabelEncoder()
-    df['NewCompanyName'] = le.fit_transform(df.CompanyName)
-
-    col = ['Industry', 'Region', 'Year', 'Revenue', 'ProfitMargin', 'MarketCap',
-       'GrowthRate', 'CarbonEmissions', 'WaterUsage', 'EnergyConsumption']
-
-    df_X = df[col]
-    le = LabelEncoder()
-    df_X['Industry'] = le.fit_transform(df_X['Industry'])
-    df_X['Region'] = le.fit_transform(df_X['Region'])
-
-    df_Y = df['ESG_Overall']
-    x_train, x_test, y_train, y_test = train_test_split(
-        df_X, df_Y, test_size=0.22, random_state=42)
-
-    print("Model training started.")
-    # Random Forest Regression
-    rf = RandomForestRegressor()
-    # Hyperparameter grid
-    param_dist = {
-        'n_estimators': [100, 200, 500],
-        'max_depth': [None, 10, 20, 30],
-        'min_samples_split': [2, 5, 10],
-        'min_samples_leaf': [1, 2, 4],
-        'max_features': ['auto', 'sqrt'],
-        'bootstrap': [True, False]
-    }
-
-    random_search = RandomizedSearchCV(
-        estimator=rf,
-        param_distributions=param_dist,
-        n_iter=50,
-        cv=5,
-        verbose=2,
-        scoring='r2',
-        random_state=42,
-        n_jobs=-1
-    )
-    
-    random_search.fit(x_train, y_train)
-    best_rf = random_search.best_estimator_
-
-    # Evaluate
-    y_pred = best_rf.predict(x_test)
-    r2 = r2_score(y_test, y_pred)
-    mse = mean_squared_error(y_test, y_pred)
-    rmse = root_mean_squared_error(y_test, y_pred)
-    mae = mean_absolute_error(y_test, y_pred)
-
-    print("Best Parameters:", random_search.best_params_)
-    print(f"R² Score: {r2:.2f}")
-    print(f"MSE: {mse:.2f}")
-    print(f"MAE: {mae:.2f}")
-    print(f"RMSE: {rmse:.2f}")
-
-    final_rf = RandomForestRegressor(**random_search.best_params_, random_state=42)
-    final_rf.fit(df_X, df_Y)
-
-    print("Saving the trained model...")
-    os.makedirs(model_dir, exist_ok=True)
-    model_path = os.path.join(model_dir, "model.joblib")
-    joblib.dump(final_rf, model_path)
-    print(f"[INFO] Saved model to {model_path}")
-
-    print("Model training completed.")
-    return model_path
-
-def train_model_market_cap(df: pd.DataFrame, model_dir: str = "./trained_models") -> None:
-    # Placeholder for model training logic
-    print(df.head())
-    col = ['Industry', 'Region', 'Year', 'Revenue', 'ProfitMargin', 'GrowthRate',
-           'ESG_Overall', 'CarbonEmissions',  'WaterUsage', 'EnergyConsumption']
-    df['GrowthRate'] = df['GrowthRate'].fillna(df['GrowthRate'].mean())
-    
-    df_X = df[col]
-    df_Y = df['MarketCap']
-
-    le = LabelEncoder()
-    df_X['Industry'] = le.fit_transform(df_X['Industry'])
-    df_X['Region'] = le.fit_transform(df_X['Region'])
-
-
-    x_train, x_test, y_train, y_test = train_test_split(
-        df_X, df_Y, test_size=.25, random_state=100)
-    x_train.shape, x_test.shape, y_train.shape, y_test.shape
-
-    param_dist = {
-        'n_estimators': [100, 200, 300],
-        'learning_rate': [0.01, 0.05, 0.1, 0.2],
-        'max_depth': [3, 5, 7],
-        'subsample': [0.8, 1.0],
-        'min_samples_split': [2, 5, 10],
-        'min_samples_leaf': [1, 2, 4]
-    }
-
-    gbr = GradientBoostingRegressor(random_state=42)
-
-    random_search = RandomizedSearchCV(
-        gbr, param_distributions=param_dist,
-        n_iter=50, cv=5, scoring='r2', n_jobs=-1, verbose=2, random_state=42
-    )
-
-    random_search.fit(x_train, y_train)
-    best_gbr = random_search.best_estimator_
-    
-    y_pred = best_gbr.predict(x_test)  # or gbr.predict(X_test)
-
-    r2 = r2_score(y_test, y_pred)
-    mse = mean_squared_error(y_test, y_pred)
-    rmse = root_mean_squared_error(y_test, y_pred)
-    mae = mean_absolute_error(y_test, y_pred)
-    
-    print(f"R² Score: {r2:.4f}")
-    print(f"MSE: {mse:.4f}")
-    print(f"RMSE: {rmse:.4f}")
-    print(f"MAE: {mae:.4f}")
-
-def train_model_esg_overall_on_co2_emission_and_revenue(df: pd.DataFrame, model_dir: str = "./trained_models") -> str:
+import time
+from flask import Response, request, stream_with_context
+import numpy as np
+
+from src.configs.load_config import Config
+from src.constants.model_features import MODEL_BUNDLE, MODEL_ESG_OVERALL
+from src.services.csv_scoring import FORMAT_CSV, CsvScoring
+from src.services.esg_scoring import explain_records, parse_records, score_records
+from src.services.feature_store import LATEST_YEAR, feature_store, parse_ids
+from src.services.micro_batcher import bundle_micro_batcher, micro_batcher
+from src.services.model_registry import model_registry
+from src.services.prediction_cache import prediction_cache
+from src.stores.esg import esg_store
+from src.utils.metrics import PREDICT_STAGE_SECONDS
+
+config = Config()
+
+# Stage timers of the predict endpoints, bound once so requests only observe.
+# 'validation' parses and checks the request body, 'model' gets the served model
+# from the registry, 'encoding' checks and encodes the features in one pass.
+PREDICT_STAGES = {stage: PREDICT_STAGE_SECONDS.labels('esg_overall', stage)
+                  for stage in ('validation', 'model', 'encoding', 'cache', 'inference')}
+BATCH_STAGES = {stage: PREDICT_STAGE_SECONDS.labels('esg_overall_batch', stage)
+                for stage in ('validation', 'model', 'encoding', 'inference')}
+BUNDLE_STAGES = {stage: PREDICT_STAGE_SECONDS.labels('esg', stage)
+                 for stage in ('validation', 'model', 'encoding', 'cache', 'inference')}
+BY_ID_STAGES = {stage: PREDICT_STAGE_SECONDS.labels('esg_overall_by_id', stage)
+                for stage in ('validation', 'model', 'lookup', 'inference')}
+EXPLAIN_STAGES = {stage: PREDICT_STAGE_SECONDS.labels('explain_esg_overall', stage)
+                  for stage in ('validation', 'model', 'encoding', 'inference')}
+EXPLAIN_BATCH_STAGES = {stage: PREDICT_STAGE_SECONDS.labels('explain_esg_overall_batch', stage)
+                        for stage in ('validation', 'model', 'encoding', 'inference')}
+CSV_STAGES = {stage: PREDICT_STAGE_SECONDS.labels('esg_overall_csv', stage)
+              for stage in ('model', 'parsing', 'encoding', 'inference', 'writing')}
+
+def predict_esg_overall() -> float:
     """
-    Train a RandomForestRegressor model to predict ESG_Overall using only
-    Revenue and CarbonEmissions, so that inference aligns with predict_esg().
+    Predict ESG_Overall score from trained RandomForest model.
+
+    The request body is a dict with keys matching TRAIN_FEATURES. The model
+    and its preprocessing are served from the in-process registry, so they
+    are only read from disk when a new version has been trained. Repeated
+    requests for the same encoded features and model version are answered
+    from the prediction cache; concurrent misses share one batched predict
+    call through the micro-batcher. Predictions are persisted off the
+    request path by the ESG store.
+
+    Returns:
+        Predicted ESG_Overall score (float), the model version used and
+        whether it came from the cache.
     """
-    print("[INFO] Training dataset preview:")
-    print(df.head())
-
-    # Select only the features you want for prediction
-    features = ["Revenue", "CarbonEmissions"]
-    target = "ESG_Overall"
-
-    df_X = df[features].copy()
-    df_Y = df[target].copy()
-
-    # Train-test split
-    x_train, x_test, y_train, y_test = train_test_split(
-        df_X, df_Y, test_size=0.22, random_state=42
-    )
-
-    print("[INFO] Model training started.")
-
-    # Base model
-    rf = RandomForestRegressor(random_state=42)
-
-    # Hyperparameter grid
-    param_dist = {
-        "n_estimators": [100, 200, 500],
-        "max_depth": [None, 10, 20, 30],
-        "min_samples_split": [2, 5, 10],
-        "min_samples_leaf": [1, 2, 4],
-        "max_features": ["auto", "sqrt"],
-        "bootstrap": [True, False],
-    }
-
-    random_search = RandomizedSearchCV(
-        estimator=rf,
-        param_distributions=param_dist,
-        n_iter=20,
-        cv=3,
-        verbose=1,
-        scoring="r2",
-        random_state=42,
-        n_jobs=-1,
-    )
-
-    random_search.fit(x_train, y_train)
-    best_rf = random_search.best_estimator_
-
-    # Evaluate
-    print("x_test shape:", x_test)
-    y_pred = best_rf.predict(x_test)
-    r2 = r2_score(y_test, y_pred)
-    mse = mean_squared_error(y_test, y_pred)
-    rmse = root_mean_squared_error(y_test, y_pred)
-    mae = mean_absolute_error(y_test, y_pred)
-
-    print("[INFO] Best Parameters:", random_search.best_params_)
-    print(f"[INFO] R² Score: {r2:.2f}")
-    print(f"[INFO] MSE: {mse:.2f}")
-    print(f"[INFO] MAE: {mae:.2f}")
-    print(f"[INFO] RMSE: {rmse:.2f}")
-
-    # Train final model on all data
-    final_rf = RandomForestRegressor(
-        **random_search.best_params_, random_state=42
-    )
-    final_rf.fit(df_X, df_Y)
-
-    # Save model
-    os.makedirs(model_dir, exist_ok=True)
-    model_path = os.path.join(model_dir, "model.joblib")
-    joblib.dump(final_rf, model_path)
-
-    print(f"[INFO] Saved model to {model_path}")
-    print("[INFO] Model training completed.")
-
-    return model_path
-
-def predict_esg_overall(model_dir: str = "./trained_models") -> float:
+    try:
+        started = time.perf_counter()
+        input_data = request.get_json()
+        validated = time.perf_counter()
+        PREDICT_STAGES['validation'].observe(validated - started)
+        loaded = model_registry.get(MODEL_ESG_OVERALL)
+        resolved = time.perf_counter()
+        PREDICT_STAGES['model'].observe(resolved - validated)
+
+        # Check and encode with the preprocessing saved alongside the model
+        X = loaded.preprocessor.encode(input_data)
+        encoded = time.perf_counter()
+        PREDICT_STAGES['encoding'].observe(encoded - resolved)
+
+        prediction = prediction_cache.get(MODEL_ESG_OVERALL, loaded.version, X)
+        cached = prediction is not None
+        looked_up = time.perf_counter()
+        PREDICT_STAGES['cache'].observe(looked_up - encoded)
+        if not cached:
+            # Predict, batched with concurrent requests
+            prediction = micro_batcher.predict(loaded.predictor, X)
+            prediction_cache.put(MODEL_ESG_OVERALL, loaded.version, X, prediction)
+            PREDICT_STAGES['inference'].observe(time.perf_counter() - looked_up)
+        esg_store.record_predictions(MODEL_ESG_OVERALL, loaded.version, 'esg_overall', [input_data],
+                                     [{'success': True, 'prediction': prediction}], cached)
+        return {'success': True, 'prediction': prediction, 'model_version': loaded.version, 'cached': cached}, 200
+    except TimeoutError as e:
+        return {'success': False, 'error': str(e)}, 503
+    except Exception as e:
+        return {'success': False, 'error': str(e)}, 400
+
+def predict_esg():
     """
-    Predict ESG_Overall score from trained RandomForest model.
-    
-    Args:
-        input_data: dict with keys matching TRAIN_FEATURES.
-        model_dir: directory where model.joblib is stored.
-    
+    Predict every target of the model bundle (the ESG pillars and
+    MarketCap) for one record, with one predict call.
+
+    The request body is a dict with keys matching TRAIN_FEATURES, as for
+    /predict/esg_overall, except that MarketCap is optional: the MarketCap
+    prediction never uses it, and the ESG pillars fall back to the training
+    mean when it is missing (less accurate than the actual value). Served
+    like /predict/esg_overall: registry, prediction cache and micro-batching.
+
     Returns:
-        Predicted ESG_Overall score (float).
+        {"predictions": {target: value}} with the bundle version used and
+        whether it came from the cache.
     """
     try:
-        
-    # Load trained model
+        started = time.perf_counter()
         input_data = request.get_json()
-        model_path = os.path.join(model_dir, "model.joblib")
-        if not os.path.exists(model_path):
-            raise FileNotFoundError(
-                f"Model not found at {model_path}. Train it first.")
-        model = joblib.load(model_path)
-
-        # Validate categorical features
-        industry = input_data.get("Industry")
-        if industry not in ALLOWED_INDUSTRIES:
+        validated = time.perf_counter()
+        BUNDLE_STAGES['validation'].observe(validated - started)
+        loaded = model_registry.get(MODEL_BUNDLE)
+        resolved = time.perf_counter()
+        BUNDLE_STAGES['model'].observe(resolved - validated)
+
+        X = loaded.preprocessor.encode(input_data)
+        encoded = time.perf_counter()
+        BUNDLE_STAGES['encoding'].observe(encoded - resolved)
+
+        values = prediction_cache.get(MODEL_BUNDLE, loaded.version, X)
+        cached = values is not None
+        looked_up = time.perf_counter()
+        BUNDLE_STAGES['cache'].observe(looked_up - encoded)
+        if not cached:
+            values = bundle_micro_batcher.predict(loaded.predictor, X)
+            prediction_cache.put(MODEL_BUNDLE, loaded.version, X, values)
+            BUNDLE_STAGES['inference'].observe(time.perf_counter() - looked_up)
+        predictions = dict(zip(loaded.model.targets, values))
+        esg_store.record_predictions(MODEL_BUNDLE, loaded.version, 'esg', [input_data],
+                                     [{'success': True, 'prediction': predictions}], cached)
+        return {'success': True, 'predictions': predictions, 'model_version': loaded.version, 'cached': cached}, 200
+    except TimeoutError as e:
+        return {'success': False, 'error': str(e)}, 503
+    except Exception as e:
+        return {'success': False, 'error': str(e)}, 400
+
+def predict_esg_overall_batch():
+    """
+    Predict ESG_Overall for a batch of records with a single model.predict call.
+
+    The body is a JSON array of records, an object with a ``records`` array,
+    or NDJSON (Content-Type: application/x-ndjson). Invalid rows are reported
+    individually and do not fail the rest of the batch.
+
+    Returns:
+        Per-row results in input order, plus the model version used.
+    """
+    try:
+        started = time.perf_counter()
+        records = parse_records(request.get_data(), request.content_type)
+        if len(records) > config.model.max_batch_size:
             raise ValueError(
-                f"Invalid Industry: {industry}. Allowed: {ALLOWED_INDUSTRIES}")
+                f"Batch too large: {len(records)} records. Max: {config.model.max_batch_size}")
+        validated = time.perf_counter()
+        BATCH_STAGES['validation'].observe(validated - started)
+        loaded = model_registry.get(MODEL_ESG_OVERALL)
+        BATCH_STAGES['model'].observe(time.perf_counter() - validated)
+        results = score_records(loaded.predictor, loaded.preprocessor, records, BATCH_STAGES)
+        esg_store.record_predictions(MODEL_ESG_OVERALL, loaded.version, 'esg_overall_batch', records, results)
+        succeeded = sum(1 for r in results if r['success'])
+        return {
+            'success': True,
+            'model_version': loaded.version,
+            'count': len(results),
+            'succeeded': succeeded,
+            'failed': len(results) - succeeded,
+            'results': results,
+        }, 200
+    except Exception as e:
+        return {'success': False, 'error': str(e)}, 400
+
+def explain_esg_overall():
+    """
+    Explain an ESG_Overall prediction: how much each feature moved the
+    score away from the average company's.
 
-        region = input_data.get("Region")
-        if region not in ALLOWED_REGIONS:
+    The request body is a dict with keys matching TRAIN_FEATURES, as for
+    /predict/esg_overall. Contributions are read off the decision paths
+    of the forest's trees (see CompiledForest.explain), so ``bias`` plus
+    the sum of ``contributions`` is the prediction.
+
+    Returns:
+        The prediction, the bias (mean training score) and the
+        contribution of every feature, with the model version used.
+    """
+    try:
+        started = time.perf_counter()
+        input_data = request.get_json()
+        validated = time.perf_counter()
+        EXPLAIN_STAGES['validation'].observe(validated - started)
+        loaded = model_registry.get(MODEL_ESG_OVERALL)
+        explainer = loaded.explainer
+        resolved = time.perf_counter()
+        EXPLAIN_STAGES['model'].observe(resolved - validated)
+
+        X = loaded.preprocessor.encode(input_data)
+        encoded = time.perf_counter()
+        EXPLAIN_STAGES['encoding'].observe(encoded - resolved)
+
+        predictions, bias, contributions = explainer.explain(X)
+        EXPLAIN_STAGES['inference'].observe(time.perf_counter() - encoded)
+        return {
+            'success': True,
+            'prediction': float(predictions[0]),
+            'bias': bias,
+            'contributions': dict(zip(loaded.preprocessor.features, contributions[0].tolist())),
+            'model_version': loaded.version,
+        }, 200
+    except Exception as e:
+        return {'success': False, 'error': str(e)}, 400
+
+def explain_esg_overall_batch():
+    """
+    Explain ESG_Overall predictions for a batch of records with one walk
+    of the forest.
+
+    The body is read like /predict/esg_overall/batch's; invalid rows are
+    reported individually.
+
+    Returns:
+        Per-row predictions and feature contributions in input order, the
+        bias they add up from and the model version used.
+    """
+    try:
+        started = time.perf_counter()
+        records = parse_records(request.get_data(), request.content_type)
+        if len(records) > config.model.max_batch_size:
             raise ValueError(
-                f"Invalid Region: {region}. Allowed: {ALLOWED_REGIONS}")
+                f"Batch too large: {len(records)} records. Max: {config.model.max_batch_size}")
+        validated = time.perf_counter()
+        EXPLAIN_BATCH_STAGES['validation'].observe(validated - started)
+        loaded = model_registry.get(MODEL_ESG_OVERALL)
+        explainer = loaded.explainer
+        EXPLAIN_BATCH_STAGES['model'].observe(time.perf_counter() - validated)
+        bias, results = explain_records(explainer, loaded.preprocessor, records, EXPLAIN_BATCH_STAGES)
+        succeeded = sum(1 for r in results if r['success'])
+        return {
+            'success': True,
+            'model_version': loaded.version,
+            'bias': bias,
+            'count': len(results),
+            'succeeded': succeeded,
+            'failed': len(results) - succeeded,
+            'results': results,
+        }, 200
+    except Exception as e:
+        return {'success': False, 'error': str(e)}, 400
 
-        # Build dataframe
-        df = pd.DataFrame([input_data], columns=TRAIN_FEATURES)
+def predict_esg_overall_csv():
+    """
+    Score a CSV file in the schema of company_esg_financial_dataset.csv,
+    streaming the scored rows back while the file is still being read.
 
-        # Handle GrowthRate missing
-        if pd.isna(df.loc[0, "GrowthRate"]):
-            df["GrowthRate"] = 0.0  # Default or could impute mean from training
+    The file is the request body (Content-Type: text/csv) or the "file"
+    field of a multipart form. Query parameters: ``format`` ("csv" or
+    "ndjson"), ``chunk_rows`` (rows scored at a time, up to
+    PREDICT_MAX_BATCH_SIZE) and, for NDJSON, ``progress=true`` to add a
+    ``{"progress": ...}`` line after every chunk. Only one chunk is held
+    in memory (see CsvScoring).
 
-        # Encode categorical features (simple mapping consistent with training order)
-        industry_mapping = {name: idx for idx,
-                            name in enumerate(ALLOWED_INDUSTRIES)}
-        region_mapping = {name: idx for idx, name in enumerate(ALLOWED_REGIONS)}
+    A body upload is scored as it arrives, so the client has to read the
+    response while it sends the file (curl does). Multipart files are
+    received in full, spooled to disk, before scoring starts.
 
-        df["Industry"] = df["Industry"].map(industry_mapping)
-        df["Region"] = df["Region"].map(region_mapping)
+    Returns:
+        The scored rows, one per input row, with the model version in the
+        X-Model-Version header; 400 before streaming if the file or the
+        parameters are invalid.
+    """
+    try:
+        output_format = request.args.get('format', FORMAT_CSV)
+        chunk_rows = int(request.args.get('chunk_rows', config.model.csv_chunk_rows))
+        if not 1 <= chunk_rows <= config.model.max_batch_size:
+            raise ValueError(f"Invalid chunk_rows: {chunk_rows}. Max: {config.model.max_batch_size}")
+        if request.mimetype == 'multipart/form-data':
+            if 'file' not in request.files:
+                raise ValueError("Expected the CSV in a 'file' field")
+            stream, total_bytes = request.files['file'].stream, None
+        else:
+            stream, total_bytes = request.stream, request.content_length
+        started = time.perf_counter()
+        loaded = model_registry.get(MODEL_ESG_OVERALL)
+        CSV_STAGES['model'].observe(time.perf_counter() - started)
+        scoring = CsvScoring(stream, loaded.predictor, loaded.preprocessor, chunk_rows, output_format,
+                             progress_lines=request.args.get('progress') == 'true',
+                             total_bytes=total_bytes, stages=CSV_STAGES)
+    except Exception as e:
+        return {'success': False, 'error': str(e)}, 400
+    return Response(stream_with_context(iter(scoring)), content_type=scoring.content_type,
+                    headers={'X-Model-Version': loaded.version})
+
+def predict_esg_overall_by_id():
+    """
+    Predict ESG_Overall for companies of the dataset, by CompanyID and Year.
 
-        # Predict
-        prediction = model.predict(df)[0]
-        return {'success': True, 'prediction': float(prediction)}, 200
+    The body is {"CompanyID": 1, "Year": 2020} for one company, or
+    {"ids": [...]} for many, each item being such an object, a
+    [CompanyID, Year] pair or a bare CompanyID. Without a Year, the
+    company's latest year is scored. Feature rows come already encoded
+    from the feature store, so nothing is parsed or encoded per company.
+
+    Returns:
+        The prediction (404 for an unknown company), or per-item results
+        in input order for ``ids``, plus the model version used.
+    """
+    try:
+        started = time.perf_counter()
+        payload = request.get_json()
+        bulk = isinstance(payload, dict) and 'ids' in payload
+        items = payload['ids'] if bulk else [payload]
+        if not isinstance(items, list):
+            raise ValueError("Expected 'ids' to be an array")
+        if len(items) > config.model.max_batch_size:
+            raise ValueError(f"Batch too large: {len(items)} ids. Max: {config.model.max_batch_size}")
+        company_ids, years, errors = parse_ids(items)
+        validated = time.perf_counter()
+        BY_ID_STAGES['validation'].observe(validated - started)
+        loaded = model_registry.get(MODEL_ESG_OVERALL)
+        features = feature_store.get(loaded.preprocessor)
+        resolved = time.perf_counter()
+        BY_ID_STAGES['model'].observe(resolved - validated)
+
+        rows, years = features.lookup(company_ids, years)
+        # Items that failed to parse are never predicted, whatever they matched
+        found = (rows >= 0) & np.fromiter((error is None for error in errors), dtype=bool, count=len(errors))
+        looked_up = time.perf_counter()
+        BY_ID_STAGES['lookup'].observe(looked_up - resolved)
+
+        if not bulk:
+            if errors[0] is not None:
+                raise ValueError(errors[0])
+            if not found[0]:
+                year = 'any year' if years[0] == LATEST_YEAR else f'Year {years[0]}'
+                return {'success': False, 'error': f'No data for CompanyID {company_ids[0]} in {year}'}, 404
+            prediction = micro_batcher.predict(loaded.predictor, features.X[rows[0]:rows[0] + 1])
+            BY_ID_STAGES['inference'].observe(time.perf_counter() - looked_up)
+            record = {'CompanyID': int(company_ids[0]), 'Year': int(years[0])}
+            esg_store.record_predictions(MODEL_ESG_OVERALL, loaded.version, 'esg_overall_by_id', [record],
+                                         [{'success': True, 'prediction': prediction}])
+            return {'success': True, **record, 'prediction': prediction, 'model_version': loaded.version}, 200
+
+        # One gather and one predict call for every company found
+        predictions = loaded.predictor.predict(features.X[rows[found]]) if found.any() else []
+        BY_ID_STAGES['inference'].observe(time.perf_counter() - looked_up)
+        predictions = iter(np.asarray(predictions).tolist())
+        records, results = [], []
+        for i, error in enumerate(errors):
+            record = {'CompanyID': int(company_ids[i]), 'Year': int(years[i])}
+            if error is not None:
+                results.append({'index': i, 'success': False, 'error': error})
+            elif found[i]:
+                results.append({'index': i, **record, 'success': True, 'prediction': next(predictions)})
+            else:
+                results.append({'index': i, **record, 'success': False, 'error': 'No data for this company'})
+            records.append(record)
+        esg_store.record_predictions(MODEL_ESG_OVERALL, loaded.version, 'esg_overall_by_id', records, results)
+        succeeded = int(found.sum())
+        return {
+            'success': True,
+            'model_version': loaded.version,
+            'count': len(results),
+            'succeeded': succeeded,
+            'failed': len(results) - succeeded,
+            'results': results,
+        }, 200
+    except TimeoutError as e:
+        return {'success': False, 'error': str(e)}, 503
     except Exception as e:
         return {'success': False, 'error': str(e)}, 400
 
-# https://www.kaggle.com/code/nayanspatil/esg-financial-performance#Predicting-ESG_Overall
-if __name__ == "__main__":
-    df = pd.read_csv(
-        f'D:/projects/GreenCreditAI/ai/data/company_esg_financial_dataset.csv')
-    examine_data(df)
-    sample_input = {
-        "Industry": "Technology",
-        "Region": "Asia",
-        "Year": 2024,
-        "Revenue": 5000000,
-        "ProfitMargin": 12.5,
-        "MarketCap": 20000000,
-        "GrowthRate": 5.0,
-        "CarbonEmissions": 1200,
-        "WaterUsage": 300,
-        "EnergyConsumption": 1500
-    }
-
-    score = predict_esg_overall(model_dir="./trained_models")
-    print("Predicted ESG Overall Score:", score)
+def prediction_cache_stats():
+    """Hit, miss and eviction counters of this process's prediction cache."""
+    return {'success': True, 'cache': prediction_cache.stats()}, 200
+
+def clear_prediction_cache():
+    """Drop every prediction cached in this process."""
+    return {'success': True, 'cleared': prediction_cache.clear()}, 200
+
+def list_models():
+    """List the models registered for serving and the versions loaded in this process."""
+    return {'success': True, 'models': model_registry.describe()}, 200
@@ -7,12 +7,42 @@ ROUTE_PING = Route(
     method=METHOD_GET
 )
 
+ROUTE_METRICS = Route(
+    name='metrics',
+    path='/metrics',
+    method=METHOD_GET
+)
+
+ROUTE_HEALTHZ = Route(
+    name='healthz',
+    path='/healthz',
+    method=METHOD_GET
+)
+
+ROUTE_READYZ = Route(
+    name='readyz',
+    path='/readyz',
+    method=METHOD_GET
+)
+
 ROUTE_TRAIN_ESG_OVERALL = Route(
     name='train_esg_overall',
     path='/train/esg_overall',
     method=METHOD_POST
 )
 
+ROUTE_UPDATE_ESG_OVERALL = Route(
+    name='update_esg_overall',
+    path='/train/esg_overall/update',
+    method=METHOD_POST
+)
+
+ROUTE_TRAIN_BUNDLE = Route(
+    name='train_bundle',
+    path='/train/bundle',
+    method=METHOD_POST
+)
+
 ROUTE_TRAIN_MARKET_CAP = Route(
     name='train_market_cap',
     path='/train/market_cap',
@@ -23,4 +53,77 @@ ROUTE_PREDICT_ESG_OVERALL = Route(
     name='predict_esg_overall',
     path='/predict/esg_overall',
     method=METHOD_POST
-)
\ No newline at end of file
+)
+
+ROUTE_PREDICT_ESG = Route(
+    name='predict_esg',
+    path='/predict/esg',
+    method=METHOD_POST
+)
+
+ROUTE_PREDICT_ESG_OVERALL_BATCH = Route(
+    name='predict_esg_overall_batch',
+    path='/predict/esg_overall/batch',
+    method=METHOD_POST
+)
+
+ROUTE_PREDICT_ESG_OVERALL_CSV = Route(
+    name='predict_esg_overall_csv',
+    path='/predict/esg_overall/csv',
+    method=METHOD_POST
+)
+
+ROUTE_PREDICT_ESG_OVERALL_BY_ID = Route(
+    name='predict_esg_overall_by_id',
+    path='/predict/esg_overall/by-id',
+    method=METHOD_POST
+)
+
+ROUTE_EXPLAIN_ESG_OVERALL = Route(
+    name='explain_esg_overall',
+    path='/explain/esg_overall',
+    method=METHOD_POST
+)
+
+ROUTE_EXPLAIN_ESG_OVERALL_BATCH = Route(
+    name='explain_esg_overall_batch',
+    path='/explain/esg_overall/batch',
+    method=METHOD_POST
+)
+
+ROUTE_PREDICTION_CACHE = Route(
+    name='prediction_cache',
+    path='/predict/cache',
+    method=METHOD_GET
+)
+
+ROUTE_CLEAR_PREDICTION_CACHE = Route(
+    name='clear_prediction_cache',
+    path='/predict/cache',
+    method=METHOD_DELETE
+)
+
+ROUTE_MODELS = Route(
+    name='models',
+    path='/models',
+    method=METHOD_GET
+)
+
+
+ROUTE_JOBS = Route(
+    name='jobs',
+    path='/jobs',
+    method=METHOD_GET
+)
+
+ROUTE_JOB = Route(
+    name='job',
+    path='/jobs/<job_id>',
+    method=METHOD_GET
+)
+
+ROUTE_CANCEL_JOB = Route(
+    name='cancel_job',
+    path='/jobs/<job_id>',
+    method=METHOD_DELETE
+)
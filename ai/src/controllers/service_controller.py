@@ -1,6 +1,30 @@
+from flask import Response
+
+from src.services.warm_up import warm_up
+from src.utils.metrics import metrics
 from .app import App
 
 PING = 'ping'
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
 
 def ping():
     return {'msg': 'ping'}, 200
+
+def get_metrics():
+    """Metrics of this process in Prometheus text format."""
+    return Response(metrics.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+def healthz():
+    """Liveness: the process serves requests. Never loads anything."""
+    return {'success': True, 'status': 'alive'}, 200
+
+def readyz():
+    """
+    Readiness: 200 once the warm-up loaded and test-predicted the models,
+    503 with the warm-up status until then.
+    """
+    if not warm_up.ready:
+        # Servers started without run.serve warm up on the first probe.
+        warm_up.start()
+    status = warm_up.status()
+    return {'success': status['ready'], **status}, 200 if status['ready'] else 503
@@ -0,0 +1,526 @@
+import os
+import time
+from sklearn import preprocessing
+from sklearn.base import clone
+from sklearn.model_selection import KFold, train_test_split
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+from sklearn.metrics import mean_absolute_error, r2_score, mean_squared_error, root_mean_squared_error
+import numpy as np
+import pandas as pd
+import joblib
+from typing import Dict, Union
+
+from src.configs.load_config import Config
+from src.constants.model_features import (BUNDLE_TARGETS, ESG_FOREST_PARAMS, ESG_PILLARS,
+                                          MARKET_CAP_BOOSTING_PARAMS, MODEL_BUNDLE, MODEL_FILES, SEARCH_RANDOM,
+                                          TRAIN_FEATURES)
+from src.services.model_bundle import ModelBundle, fit_members, search_targets
+from src.services.model_registry import save_model
+from src.services.model_slimming import slim_model
+from src.services.preprocessing import IMPUTED_FEATURES, Preprocessor, load_preprocessor
+from src.services.search import make_search
+from src.services.trial_store import trial_store
+
+config = Config()
+
+def examine_data(df: pd.DataFrame) -> None:
+    print(df.head())
+    print(df.info())
+    print(df.describe())
+    print(df.isnull().sum())
+
+def _metrics(y_test, y_pred, cv_score: float = None) -> dict:
+    return {
+        'r2': float(r2_score(y_test, y_pred)),
+        'mse': float(mean_squared_error(y_test, y_pred)),
+        'rmse': float(root_mean_squared_error(y_test, y_pred)),
+        'mae': float(mean_absolute_error(y_test, y_pred)),
+        'cv_r2': float(cv_score) if cv_score is not None else None,
+    }
+
+def _slim(model_path: str, X, y, reference=None) -> dict:
+    """Write the slimmed copy of a saved forest; a failure never fails the training."""
+    try:
+        report = slim_model(model_path, X, y, max_r2_drop=config.model.slim_max_r2_drop, reference=reference)
+    except Exception as e:
+        print(f"[WARN] Could not slim {model_path}: {e}")
+        return {'error': str(e)}
+    original, slim, test_r2 = report['original'], report['slim'], report['test_r2']
+    print(f"[INFO] Slimmed model: {original['size_bytes'] / 1e6:.1f}MB -> {slim['size_bytes'] / 1e6:.1f}MB, "
+          f"{report['n_trees'][0]} -> {report['n_trees'][1]} trees, "
+          f"test r2 ({test_r2['model']} model) {test_r2['original']:.4f} -> {test_r2['slim']:.4f}")
+    return report
+
+def _trials(reuse_trials: bool) -> dict:
+    """Trial store arguments of make_search; see trial_store."""
+    return {'trials': trial_store if reuse_trials else None, 'warm_start': config.model.search_warm_start}
+
+def train_model_esg_overall(df: pd.DataFrame, model_dir: str = "./trained_models",
+                            n_jobs: int = -1, progress=None,
+                            search_mode: str = SEARCH_RANDOM, budget: dict = None,
+                            reuse_trials: bool = True) -> dict:
+    """
+    Train the ESG_Overall RandomForest and save it as model.joblib, with
+    its fitted preprocessing next to it, then write its slimmed copy
+    model.slim.npz (see model_slimming). The saved forest is refit on every
+    row, so the slimming cut is chosen and scored on the search's best
+    estimator, fitted without the holdout rows, and then applied to it.
+
+    Args:
+        df: training data with the columns of company_esg_financial_dataset.csv.
+        model_dir: directory the model is written to.
+        n_jobs: cores used by the hyperparameter search.
+        progress: optional callable receiving (cv_fits_done, cv_fits_total).
+        search_mode: "random" (50 candidates x 5 folds) or "halving".
+        budget: optional {"max_fits": int, "max_seconds": float} for the search.
+        reuse_trials: skip the candidates the trial store already scored
+            on the same training rows.
+
+    Returns:
+        dict with model_path, best_params, holdout metrics, search stats
+        and the slimming report.
+    """
+    print(df.head())
+
+    le = preprocessing.LabelEncoder()
+    df['NewCompanyName'] = le.fit_transform(df.CompanyName)
+
+    # Category tables, GrowthRate mean and feature order are fitted once and
+    # saved with the model, so serving encodes exactly like training.
+    preprocessor = Preprocessor.fit(df, TRAIN_FEATURES)
+    df_X = preprocessor.transform(df)
+
+    df_Y = df['ESG_Overall']
+    x_train, x_test, y_train, y_test = train_test_split(
+        df_X, df_Y, test_size=0.22, random_state=42)
+
+    print("Model training started.")
+    # Random Forest Regression
+    rf = RandomForestRegressor()
+    search = make_search(
+        estimator=rf,
+        param_distributions=ESG_FOREST_PARAMS,
+        mode=search_mode,
+        budget=budget,
+        n_iter=50,
+        cv=5,
+        verbose=2,
+        scoring='r2',
+        random_state=42,
+        n_jobs=n_jobs,
+        progress=progress,
+        target='ESG_Overall',
+        **_trials(reuse_trials)
+    )
+    
+    search.fit(x_train, y_train)
+    best_rf = search.best_estimator_
+
+    # Evaluate
+    y_pred = best_rf.predict(x_test)
+    r2 = r2_score(y_test, y_pred)
+    mse = mean_squared_error(y_test, y_pred)
+    rmse = root_mean_squared_error(y_test, y_pred)
+    mae = mean_absolute_error(y_test, y_pred)
+
+    print("Best Parameters:", search.best_params_)
+    print(f"R² Score: {r2:.2f}")
+    print(f"MSE: {mse:.2f}")
+    print(f"MAE: {mae:.2f}")
+    print(f"RMSE: {rmse:.2f}")
+
+    final_rf = RandomForestRegressor(**search.best_params_, random_state=42)
+    final_rf.fit(df_X, df_Y)
+    # Read by update_model_esg_overall: rows already seen and the holdout
+    # error incremental updates are gated against.
+    final_rf.training_info_ = {'rows': len(df), 'r2': float(r2), 'rmse': float(rmse),
+                               'trained_at': time.time(), 'updates': 0}
+
+    print("Saving the trained model...")
+    model_path = os.path.join(model_dir, "model.joblib")
+    save_model(final_rf, model_path, preprocessor)
+    print(f"[INFO] Saved model to {model_path}")
+    slim = _slim(model_path, x_test, y_test, reference=best_rf)
+
+    print("Model training completed.")
+    return {
+        'model_path': model_path,
+        'best_params': search.best_params_,
+        'metrics': _metrics(y_test, y_pred, search.best_score_),
+        'search': search.search_stats_,
+        'slim': slim,
+    }
+
+def update_model_esg_overall(df: pd.DataFrame, model_dir: str = "./trained_models",
+                             n_jobs: int = -1, progress=None,
+                             new_rows: int = None, since_year: int = None,
+                             n_new_trees: int = 50, replace_oldest: bool = False,
+                             max_rmse_increase: float = 0.2,
+                             search_mode: str = SEARCH_RANDOM, budget: dict = None,
+                             reuse_trials: bool = True) -> dict:
+    """
+    Update the saved ESG_Overall forest with new rows instead of re-running the search.
+
+    ``n_new_trees`` trees with the saved hyperparameters are grown (warm
+    start) on the new rows plus as many randomly sampled earlier rows, and
+    optionally replace the oldest trees. A quarter of the new rows is held
+    out: if the updated forest's RMSE on it exceeds the holdout RMSE of the
+    last full training by more than ``max_rmse_increase`` (a fraction),
+    the data has drifted and a full retrain (search included) runs
+    instead. RMSE rather than r2 is compared because a few hundred new
+    rows from a handful of companies have too little target variance for
+    r2 to be comparable. Unknown categories in the new rows also force a
+    full retrain.
+
+    Args:
+        df: the full dataset, new rows included.
+        new_rows: number of trailing rows of ``df`` that are new.
+        since_year: treat rows with Year >= since_year as new.
+            Without either, rows beyond those the model was trained on
+            are new.
+        n_new_trees: trees added by the update.
+        replace_oldest: drop as many of the oldest trees as were added.
+        max_rmse_increase: tolerated relative holdout RMSE increase
+            before falling back.
+        search_mode, budget, reuse_trials: search used by a fallback full retrain.
+
+    Returns:
+        dict with model_path, mode ("incremental" or "full"), the reason
+        for a fallback, holdout metrics and the number of trees.
+    """
+    model_path = os.path.join(model_dir, "model.joblib")
+
+    def full_retrain(reason: str) -> dict:
+        print(f"[INFO] Falling back to a full retrain: {reason}")
+        result = train_model_esg_overall(df, model_dir, n_jobs=n_jobs, progress=progress,
+                                         search_mode=search_mode, budget=budget, reuse_trials=reuse_trials)
+        return {**result, 'mode': 'full', 'reason': reason}
+
+    if not os.path.exists(model_path):
+        return full_retrain("no saved model")
+
+    started = time.perf_counter()
+    forest = joblib.load(model_path)
+    preprocessor = load_preprocessor(model_path)
+    info = getattr(forest, 'training_info_', {})
+
+    if since_year is not None:
+        is_new = (df['Year'] >= since_year).to_numpy()
+    elif new_rows is not None:
+        is_new = np.arange(len(df)) >= len(df) - new_rows
+    elif 'rows' in info:
+        is_new = np.arange(len(df)) >= info['rows']
+    else:
+        raise ValueError("Cannot tell which rows are new: pass new_rows or since_year")
+    if is_new.sum() < 4:
+        raise ValueError(f"Need at least 4 new rows for an incremental update, got {int(is_new.sum())}")
+
+    try:
+        X_new = preprocessor.transform(df[is_new])
+    except ValueError as e:
+        return full_retrain(f"new rows do not fit the saved preprocessing: {e}")
+    y_new = df['ESG_Overall'].to_numpy()[is_new]
+    x_update, x_holdout, y_update, y_holdout = train_test_split(
+        X_new, y_new, test_size=0.25, random_state=42)
+
+    # New trees also see a sample of earlier rows so they do not only model
+    # the latest filings.
+    old_index = np.flatnonzero(~is_new)
+    sample = np.random.default_rng(42).choice(old_index, size=min(len(old_index), len(x_update)), replace=False)
+    x_fit = np.concatenate([x_update, preprocessor.transform(df.iloc[np.sort(sample)])])
+    y_fit = np.concatenate([y_update, df['ESG_Overall'].to_numpy()[np.sort(sample)]])
+
+    baseline_rmse = root_mean_squared_error(y_holdout, forest.predict(x_holdout))
+    n_jobs_saved = forest.n_jobs
+    forest.set_params(warm_start=True, n_estimators=len(forest.estimators_) + n_new_trees, n_jobs=n_jobs)
+    forest.fit(x_fit, y_fit)
+    if replace_oldest:
+        forest.estimators_ = forest.estimators_[n_new_trees:]
+        forest.n_estimators = len(forest.estimators_)
+    forest.set_params(warm_start=False, n_jobs=n_jobs_saved)
+
+    y_pred = forest.predict(x_holdout)
+    metrics = _metrics(y_holdout, y_pred)
+    reference_rmse = info.get('rmse', baseline_rmse)
+    metrics.update({'baseline_rmse': float(baseline_rmse), 'reference_rmse': float(reference_rmse)})
+    print(f"[INFO] Holdout RMSE: previous model {baseline_rmse:.3f}, updated {metrics['rmse']:.3f}, "
+          f"reference {reference_rmse:.3f}")
+    if metrics['rmse'] > reference_rmse * (1 + max_rmse_increase):
+        return full_retrain(f"holdout rmse {metrics['rmse']:.3f} is more than {max_rmse_increase:.0%} "
+                            f"above the reference {reference_rmse:.3f}")
+
+    forest.training_info_ = {**info, 'rows': len(df), 'rmse': float(reference_rmse),
+                             'updated_at': time.time(), 'updates': info.get('updates', 0) + 1}
+    save_model(forest, model_path, preprocessor)
+    slim = _slim(model_path, x_holdout, y_holdout)
+    if progress is not None:
+        progress(1, 1)
+    print(f"[INFO] Updated model saved to {model_path} in {time.perf_counter() - started:.1f}s")
+    return {
+        'model_path': model_path,
+        'mode': 'incremental',
+        'new_rows': int(is_new.sum()),
+        'n_estimators': len(forest.estimators_),
+        'metrics': metrics,
+        'slim': slim,
+    }
+
+def train_model_bundle(df: pd.DataFrame, model_dir: str = "./trained_models",
+                       n_jobs: int = -1, progress=None,
+                       search_mode: str = SEARCH_RANDOM, budget: dict = None,
+                       multi_output: bool = True, max_r2_drop: float = 0.01,
+                       reuse_trials: bool = True) -> dict:
+    """
+    Train a model for every target of BUNDLE_TARGETS in one pass and save
+    them together as bundle.joblib.
+
+    The data is encoded once, with one preprocessing, and every target is
+    searched on the same holdout split and the same CV folds, the targets
+    running in parallel processes. ESG pillars use the ESG_Overall forest
+    grid, MarketCap the gradient boosting grid (without MarketCap as a
+    feature). With ``multi_output``, one multi-output forest with the
+    ESG_Overall parameters is also fitted on all pillars; it replaces the
+    per-pillar forests when no pillar's holdout r2 drops by more than
+    ``max_r2_drop``.
+
+    MarketCap is optional at serving time, since callers may not know a
+    value the bundle predicts: it is filled with the training mean when
+    missing. The MarketCap model never reads it; the pillar models use it
+    as a feature, so their predictions are more accurate when it is given.
+
+    Returns:
+        dict with model_path, the per-target best_params, metrics and
+        search stats, and whether the pillars share one forest.
+    """
+    started = time.perf_counter()
+    preprocessor = Preprocessor.fit(df, TRAIN_FEATURES, imputed=(*IMPUTED_FEATURES, *BUNDLE_TARGETS))
+    X = preprocessor.transform(df)
+    Y = df[BUNDLE_TARGETS].to_numpy(dtype=np.float64)
+    train_index, test_index = train_test_split(np.arange(len(X)), test_size=0.22, random_state=42)
+    folds = list(KFold(n_splits=5, shuffle=True, random_state=42).split(train_index))
+
+    all_columns = list(range(len(TRAIN_FEATURES)))
+    specs = []
+    for output, target in enumerate(BUNDLE_TARGETS):
+        if target in ESG_PILLARS:
+            specs.append({'target': target, 'output': output, 'columns': all_columns, 'n_iter': 50,
+                          'estimator': RandomForestRegressor(), 'params': ESG_FOREST_PARAMS})
+        else:
+            columns = [j for j, name in enumerate(TRAIN_FEATURES) if name != target]
+            specs.append({'target': target, 'output': output, 'columns': columns, 'n_iter': 50,
+                          'estimator': GradientBoostingRegressor(random_state=42),
+                          'params': MARKET_CAP_BOOSTING_PARAMS})
+    print(f"[INFO] Searching {len(specs)} targets on {len(train_index)} rows with shared folds")
+    searched = search_targets(X, Y, train_index, test_index, specs, folds, n_jobs=n_jobs,
+                              progress=progress, search_mode=search_mode, budget=budget,
+                              **_trials(reuse_trials))
+
+    targets = {}
+    members = []
+    for target, spec, result in zip(BUNDLE_TARGETS, specs, searched):
+        targets[target] = {
+            'best_params': result['best_params'],
+            'metrics': _metrics(Y[test_index, spec['output']], result['y_pred'], result['cv_score']),
+            'search': result['search'],
+        }
+        estimator = clone(spec['estimator']).set_params(**result['best_params'], random_state=42)
+        members.append((estimator, [spec['output']], spec['columns']))
+        print(f"[INFO] {target}: holdout r2 {targets[target]['metrics']['r2']:.3f}")
+
+    shared = None
+    if multi_output:
+        pillars = [BUNDLE_TARGETS.index(name) for name in ESG_PILLARS]
+        forest = RandomForestRegressor(**targets[ESG_PILLARS[0]]['best_params'], random_state=42, n_jobs=n_jobs)
+        forest.fit(X[train_index], Y[np.ix_(train_index, pillars)])
+        y_pred = forest.predict(X[test_index])
+        r2 = {name: float(r2_score(Y[test_index, output], y_pred[:, j]))
+              for j, (name, output) in enumerate(zip(ESG_PILLARS, pillars))}
+        drops = {name: targets[name]['metrics']['r2'] - r2[name] for name in ESG_PILLARS}
+        shared = {'r2': r2, 'used': max(drops.values()) <= max_r2_drop}
+        print(f"[INFO] Multi-output forest holdout r2 {r2}, "
+              f"{'replacing' if shared['used'] else 'keeping'} the per-pillar forests")
+        if shared['used']:
+            forest.set_params(n_jobs=None)
+            members = [(forest, pillars, all_columns)] + [m for m in members if m[1][0] not in pillars]
+
+    members = fit_members(X, Y, members, n_jobs=n_jobs)
+    bundle = ModelBundle(BUNDLE_TARGETS, TRAIN_FEATURES, members, {
+        'rows': len(df), 'trained_at': time.time(), 'multi_output': bool(shared and shared['used']),
+        'metrics': {target: info['metrics'] for target, info in targets.items()},
+    })
+    model_path = os.path.join(model_dir, MODEL_FILES[MODEL_BUNDLE])
+    save_model(bundle, model_path, preprocessor)
+    print(f"[INFO] Saved {len(members)} models for {len(BUNDLE_TARGETS)} targets to {model_path} "
+          f"in {time.perf_counter() - started:.1f}s")
+    return {
+        'model_path': model_path,
+        'targets': targets,
+        'multi_output': shared,
+    }
+
+def train_model_market_cap(df: pd.DataFrame, model_dir: str = "./trained_models",
+                           n_jobs: int = -1, progress=None,
+                           search_mode: str = SEARCH_RANDOM, budget: dict = None,
+                           reuse_trials: bool = True) -> dict:
+    """
+    Search GradientBoosting hyperparameters for MarketCap and report holdout metrics.
+
+    Args:
+        df: training data with the columns of company_esg_financial_dataset.csv.
+        model_dir: unused, the model is not saved yet.
+        n_jobs: cores used by the hyperparameter search.
+        progress: optional callable receiving (cv_fits_done, cv_fits_total).
+        search_mode: "random" (50 candidates x 5 folds) or "halving".
+        budget: optional {"max_fits": int, "max_seconds": float} for the search.
+        reuse_trials: skip the candidates the trial store already scored
+            on the same training rows.
+
+    Returns:
+        dict with best_params, holdout metrics and search stats.
+    """
+    print(df.head())
+    col = ['Industry', 'Region', 'Year', 'Revenue', 'ProfitMargin', 'GrowthRate',
+           'ESG_Overall', 'CarbonEmissions',  'WaterUsage', 'EnergyConsumption']
+
+    preprocessor = Preprocessor.fit(df, col)
+    df_X = preprocessor.transform(df)
+    df_Y = df['MarketCap']
+
+    x_train, x_test, y_train, y_test = train_test_split(
+        df_X, df_Y, test_size=.25, random_state=100)
+    x_train.shape, x_test.shape, y_train.shape, y_test.shape
+
+    gbr = GradientBoostingRegressor(random_state=42)
+
+    search = make_search(
+        gbr, param_distributions=MARKET_CAP_BOOSTING_PARAMS, mode=search_mode, budget=budget,
+        n_iter=50, cv=5, scoring='r2', n_jobs=n_jobs, verbose=2, random_state=42,
+        progress=progress, target='MarketCap', **_trials(reuse_trials)
+    )
+
+    search.fit(x_train, y_train)
+    best_gbr = search.best_estimator_
+    
+    y_pred = best_gbr.predict(x_test)  # or gbr.predict(X_test)
+
+    r2 = r2_score(y_test, y_pred)
+    mse = mean_squared_error(y_test, y_pred)
+    rmse = root_mean_squared_error(y_test, y_pred)
+    mae = mean_absolute_error(y_test, y_pred)
+    
+    print(f"R² Score: {r2:.4f}")
+    print(f"MSE: {mse:.4f}")
+    print(f"RMSE: {rmse:.4f}")
+    print(f"MAE: {mae:.4f}")
+    return {
+        'best_params': search.best_params_,
+        'metrics': _metrics(y_test, y_pred, search.best_score_),
+        'search': search.search_stats_,
+    }
+
+def train_model_esg_overall_on_co2_emission_and_revenue(df: pd.DataFrame, model_dir: str = "./trained_models",
+                                                        search_mode: str = SEARCH_RANDOM,
+                                                        budget: dict = None, reuse_trials: bool = True) -> dict:
+    """
+    Train a RandomForestRegressor model to predict ESG_Overall using only
+    Revenue and CarbonEmissions, so that inference aligns with predict_esg().
+    search_mode, budget and reuse_trials select the hyperparameter search (see make_search).
+
+    Returns:
+        dict with model_path, best_params, holdout metrics and search stats.
+    """
+    print("[INFO] Training dataset preview:")
+    print(df.head())
+
+    # Select only the features you want for prediction
+    features = ["Revenue", "CarbonEmissions"]
+    target = "ESG_Overall"
+
+    preprocessor = Preprocessor.fit(df, features)
+    df_X = preprocessor.transform(df)
+    df_Y = df[target].copy()
+
+    # Train-test split
+    x_train, x_test, y_train, y_test = train_test_split(
+        df_X, df_Y, test_size=0.22, random_state=42
+    )
+
+    print("[INFO] Model training started.")
+
+    # Base model
+    rf = RandomForestRegressor(random_state=42)
+
+    random_search = make_search(
+        estimator=rf,
+        param_distributions=ESG_FOREST_PARAMS,
+        mode=search_mode,
+        budget=budget,
+        n_iter=20,
+        cv=3,
+        verbose=1,
+        scoring="r2",
+        random_state=42,
+        n_jobs=-1,
+        target=target,
+        **_trials(reuse_trials)
+    )
+
+    random_search.fit(x_train, y_train)
+    best_rf = random_search.best_estimator_
+
+    # Evaluate
+    print("x_test shape:", x_test)
+    y_pred = best_rf.predict(x_test)
+    r2 = r2_score(y_test, y_pred)
+    mse = mean_squared_error(y_test, y_pred)
+    rmse = root_mean_squared_error(y_test, y_pred)
+    mae = mean_absolute_error(y_test, y_pred)
+
+    print("[INFO] Best Parameters:", random_search.best_params_)
+    print(f"[INFO] R² Score: {r2:.2f}")
+    print(f"[INFO] MSE: {mse:.2f}")
+    print(f"[INFO] MAE: {mae:.2f}")
+    print(f"[INFO] RMSE: {rmse:.2f}")
+
+    # Train final model on all data
+    final_rf = RandomForestRegressor(
+        **random_search.best_params_, random_state=42
+    )
+    final_rf.fit(df_X, df_Y)
+
+    # Save model
+    model_path = os.path.join(model_dir, "model.joblib")
+    save_model(final_rf, model_path, preprocessor)
+
+    print(f"[INFO] Saved model to {model_path}")
+    print("[INFO] Model training completed.")
+
+    return {
+        'model_path': model_path,
+        'best_params': random_search.best_params_,
+        'metrics': _metrics(y_test, y_pred, random_search.best_score_),
+        'search': random_search.search_stats_,
+    }
+
+# https://www.kaggle.com/code/nayanspatil/esg-financial-performance#Predicting-ESG_Overall
+if __name__ == "__main__":
+    df = pd.read_csv(
+        f'D:/projects/GreenCreditAI/ai/data/company_esg_financial_dataset.csv')
+    examine_data(df)
+    sample_input = {
+        "Industry": "Technology",
+        "Region": "Asia",
+        "Year": 2024,
+        "Revenue": 5000000,
+        "ProfitMargin": 12.5,
+        "MarketCap": 20000000,
+        "GrowthRate": 5.0,
+        "CarbonEmissions": 1200,
+        "WaterUsage": 300,
+        "EnergyConsumption": 1500
+    }
+
+    from src.controllers.model_controller import predict_esg_overall
+
+    score = predict_esg_overall()
+    print("Predicted ESG Overall Score:", score)
@@ -0,0 +1,24 @@
+import time
+
+from flask import Response, g, request
+
+from src.utils.metrics import REQUEST_SECONDS, REQUESTS_IN_FLIGHT
+
+
+def start_request_timer():
+    g.metrics_route = request.url_rule.endpoint if request.url_rule is not None else "unmatched"
+    g.metrics_started = time.perf_counter()
+    REQUESTS_IN_FLIGHT.labels(g.metrics_route).inc()
+
+
+def record_request(response: Response):
+    # The status code is kept as an int label value; it is only turned
+    # into text when /metrics is rendered.
+    REQUEST_SECONDS.labels(g.metrics_route, response.status_code).observe(time.perf_counter() - g.metrics_started)
+    return response
+
+
+def end_request(error=None):
+    route = g.get("metrics_route")
+    if route is not None:
+        REQUESTS_IN_FLIGHT.labels(route).dec()
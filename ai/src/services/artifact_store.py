@@ -0,0 +1,342 @@
+import hashlib
+import os
+import posixpath
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking
+    fcntl = None
+
+from src.configs.load_config import Config
+from src.utils.logger import logger
+from src.utils.metrics import ARTIFACT_DOWNLOAD_BYTES, ARTIFACT_FETCHES
+
+S3_SCHEME = "s3://"
+# Object metadata holding the SHA-256 of the content, set by ``upload``
+SHA256_METADATA = "sha256"
+
+
+def is_remote(path: str) -> bool:
+    return path.startswith(S3_SCHEME)
+
+
+def split_uri(uri: str) -> tuple[str, str]:
+    """s3://bucket/some/key -> ("bucket", "some/key")"""
+    bucket, _, key = uri[len(S3_SCHEME):].partition("/")
+    if not bucket or not key:
+        raise ValueError(f"Invalid S3 URI: {uri}")
+    return bucket, key
+
+
+def join_uri(base: str, *names: str) -> str:
+    return posixpath.join(base, *names) if is_remote(base) else os.path.join(base, *names)
+
+
+class ArtifactStore:
+    """
+    Model artifacts in an S3-compatible object store (AWS S3, MinIO),
+    read through a content-addressed local cache.
+
+    ``fetch(uri)`` makes one HEAD request; the object is only downloaded
+    when its content is not cached yet. Cache entries are named after the
+    SHA-256 ``upload`` stores in the object's metadata (or after the ETag
+    for objects uploaded by other means), so a version is downloaded once
+    per machine whatever URI it is read from.
+
+    Large objects are downloaded as ``part_size`` byte ranges on
+    ``max_concurrency`` threads, pinned to the ETag seen by HEAD. The
+    result is checked against the stored SHA-256, or the ETag when it is
+    a plain MD5, before it is renamed into the cache. Threads and
+    processes asking for the same version at the same time wait for one
+    download instead of starting their own.
+
+    Args:
+        cache_dir: Directory of the cache, shared by the processes of a host.
+        endpoint_url: S3 API endpoint; None for AWS. Credentials come from
+            the usual AWS environment variables or files.
+        part_size: Bytes per ranged GET of a download and per part of a
+            multipart upload.
+        max_concurrency: Parallel requests of one download or upload.
+        keep: Cached versions kept on disk; the least recently used ones
+            are removed after a download.
+        read_timeout: Seconds a request may wait for data from the store,
+            per read rather than per request, so it also bounds a stalled
+            download.
+    """
+
+    def __init__(self, cache_dir: str, endpoint_url: str | None = None, part_size: int = 8 << 20,
+                 max_concurrency: int = 8, keep: int = 4, read_timeout: float = 5.0):
+        self.cache_dir = cache_dir
+        self.endpoint_url = endpoint_url
+        self.part_size = part_size
+        self.max_concurrency = max_concurrency
+        self.keep = keep
+        self.read_timeout = read_timeout
+        self._client = None
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    @property
+    def client(self):
+        # boto3 is only imported by processes that use an object store.
+        if self._client is None:
+            import boto3
+            from botocore.config import Config as BotoConfig
+
+            # Short timeouts and few retries: a HEAD check runs on a request thread.
+            self._client = boto3.client("s3", endpoint_url=self.endpoint_url, config=BotoConfig(
+                max_pool_connections=max(10, self.max_concurrency), connect_timeout=3,
+                read_timeout=self.read_timeout, retries={"max_attempts": 2, "mode": "standard"}))
+        return self._client
+
+    def head(self, uri: str) -> dict:
+        """
+        Return the version of an object: {"etag", "size", "modified_ns", "sha256"}.
+
+        Raises:
+            FileNotFoundError: If there is no object at ``uri``.
+        """
+        from botocore.exceptions import ClientError
+
+        bucket, key = split_uri(uri)
+        try:
+            response = self.client.head_object(Bucket=bucket, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                raise FileNotFoundError(f"No object at {uri}")
+            raise
+        return {
+            "etag": response["ETag"].strip('"'),
+            "size": response["ContentLength"],
+            "modified_ns": int(response["LastModified"].timestamp() * 1e9),
+            "sha256": response.get("Metadata", {}).get(SHA256_METADATA),
+        }
+
+    def fetch(self, uri: str, version: dict | None = None) -> str:
+        """
+        Return the path of the cached copy of ``uri``, downloading it if
+        this version is not cached yet. The file keeps the object's name.
+
+        Raises:
+            FileNotFoundError: If there is no object at ``uri``.
+            ValueError: If the downloaded content fails its integrity check.
+        """
+        version = version or self.head(uri)
+        entry = os.path.join(self.cache_dir, _cache_key(version))
+        path = os.path.join(entry, posixpath.basename(split_uri(uri)[1]))
+        if os.path.exists(path):
+            ARTIFACT_FETCHES.labels("hit").inc()
+            os.utime(entry)
+            return path
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with self._key_lock(entry), _file_lock(f"{entry}.lock"):
+            if os.path.exists(path):
+                ARTIFACT_FETCHES.labels("shared").inc()
+                return path
+            started = time.perf_counter()
+            os.makedirs(entry, exist_ok=True)
+            tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+            try:
+                self._download(uri, version, tmp_path)
+                _verify(uri, version, tmp_path)
+                os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                if not os.listdir(entry):
+                    os.rmdir(entry)
+        ARTIFACT_FETCHES.labels("download").inc()
+        ARTIFACT_DOWNLOAD_BYTES.labels().inc(version["size"])
+        seconds = time.perf_counter() - started
+        logger.info(f"Downloaded {uri} ({version['size'] / 1e6:.1f}MB) in {seconds:.2f}s "
+                    f"({version['size'] / 1e6 / max(seconds, 1e-6):.0f}MB/s)")
+        self.prune()
+        return path
+
+    def upload(self, path: str, uri: str) -> dict:
+        """
+        Upload a local file with its SHA-256 in the object metadata, and
+        add it to the cache so this host never downloads it back.
+        """
+        from boto3.s3.transfer import TransferConfig
+
+        bucket, key = split_uri(uri)
+        sha256 = _file_sha256(path)
+        transfer = TransferConfig(multipart_threshold=self.part_size, multipart_chunksize=self.part_size,
+                                  max_concurrency=self.max_concurrency)
+        started = time.perf_counter()
+        self.client.upload_file(path, bucket, key, ExtraArgs={"Metadata": {SHA256_METADATA: sha256}},
+                                Config=transfer)
+        version = self.head(uri)
+        entry = os.path.join(self.cache_dir, _cache_key(version))
+        cached = os.path.join(entry, posixpath.basename(key))
+        if not os.path.exists(cached):
+            os.makedirs(entry, exist_ok=True)
+            tmp_path = f"{cached}.tmp-{os.getpid()}-{threading.get_ident()}"
+            shutil.copyfile(path, tmp_path)
+            os.replace(tmp_path, cached)
+        logger.info(f"Uploaded {path} to {uri} in {time.perf_counter() - started:.2f}s")
+        return version
+
+    @contextmanager
+    def staging_dir(self, uri: str, names: list[str]):
+        """
+        Local working copy of the directory ``uri`` for a process that
+        writes model files: the ``names`` that exist are fetched into a
+        temporary directory, and when the block exits cleanly every file
+        added or changed in it is uploaded. .json files go first so a
+        model is never visible before the preprocessing written with it.
+        """
+        staging = tempfile.mkdtemp(prefix="model-staging-")
+        try:
+            fetched = {}
+            for name in names:
+                try:
+                    cached = self.fetch(join_uri(uri, name))
+                except FileNotFoundError:
+                    continue
+                shutil.copyfile(cached, os.path.join(staging, name))
+                fetched[name] = _file_sha256(cached)
+            yield staging
+            changed = [entry.name for entry in os.scandir(staging)
+                       if entry.is_file() and _file_sha256(entry.path) != fetched.get(entry.name)]
+            for name in sorted(changed, key=lambda name: (not name.endswith(".json"), name)):
+                self.upload(os.path.join(staging, name), join_uri(uri, name))
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def prune(self) -> None:
+        """
+        Remove the least recently used cached versions beyond ``keep``.
+        A version another thread or process holds the lock of (it is being
+        downloaded) is left for a later prune.
+        """
+        try:
+            entries = [e for e in os.scandir(self.cache_dir) if e.is_dir()]
+        except FileNotFoundError:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+        for entry in entries[self.keep:]:
+            lock_path = f"{entry.path}.lock"
+            with _file_lock(lock_path, blocking=False) as locked:
+                if not locked:
+                    continue
+                # Models already loaded stay in memory; only the files go.
+                shutil.rmtree(entry.path, ignore_errors=True)
+                # Removed while held: a waiter on this file notices and locks the new one.
+                if os.path.exists(lock_path):
+                    os.remove(lock_path)
+
+    def _download(self, uri: str, version: dict, tmp_path: str) -> None:
+        bucket, key = split_uri(uri)
+        size = version["size"]
+        ranges = [(start, min(start + self.part_size, size) - 1) for start in range(0, size, self.part_size)]
+        with open(tmp_path, "wb") as f:
+            f.truncate(size)
+            fd = f.fileno()
+
+            def download_range(byte_range):
+                start, end = byte_range
+                # IfMatch fails the download if the object is replaced midway.
+                body = self.client.get_object(Bucket=bucket, Key=key, Range=f"bytes={start}-{end}",
+                                              IfMatch=f'"{version["etag"]}"')["Body"]
+                offset = start
+                for chunk in body.iter_chunks(1 << 20):
+                    os.pwrite(fd, chunk, offset)
+                    offset += len(chunk)
+                if offset != end + 1:
+                    raise ValueError(f"Short read of {uri} at bytes {start}-{end}")
+
+            if len(ranges) <= 1:
+                for byte_range in ranges:
+                    download_range(byte_range)
+            else:
+                with ThreadPoolExecutor(min(self.max_concurrency, len(ranges)),
+                                        thread_name_prefix="artifact-download") as pool:
+                    list(pool.map(download_range, ranges))
+
+    def _key_lock(self, entry: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(entry, threading.Lock())
+
+
+@contextmanager
+def _file_lock(path: str, blocking: bool = True):
+    """
+    Hold an exclusive lock on the file ``path``, yielding whether it was
+    acquired (always, unless ``blocking`` is False and another holder has
+    it). The holder may remove the file, so a lock taken on a file that
+    is no longer at ``path`` is dropped and taken again on the new one.
+    """
+    if fcntl is None:
+        yield True
+        return
+    while True:
+        with open(path, "a") as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                current = os.path.samestat(os.fstat(f.fileno()), os.stat(path))
+            except FileNotFoundError:
+                current = False
+            try:
+                if current:
+                    yield True
+                    return
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _cache_key(version: dict) -> str:
+    if version.get("sha256"):
+        return f"sha256-{version['sha256']}"
+    # Without a content hash the ETag identifies the version, per size.
+    return "etag-" + hashlib.sha256(f"{version['etag']}:{version['size']}".encode()).hexdigest()
+
+
+def _verify(uri: str, version: dict, path: str) -> None:
+    size = os.path.getsize(path)
+    if size != version["size"]:
+        raise ValueError(f"Integrity check failed for {uri}: {size} bytes, expected {version['size']}")
+    if version.get("sha256"):
+        digest, expected = _file_sha256(path), version["sha256"]
+    elif "-" not in version["etag"] and len(version["etag"]) == 32:
+        # A single-part upload's ETag is the MD5 of its content.
+        digest, expected = _file_digest(path, hashlib.md5()), version["etag"]
+    else:
+        logger.warning(f"No content hash for {uri} (multipart ETag); only its size was checked")
+        return
+    if digest != expected:
+        raise ValueError(f"Integrity check failed for {uri}: content hash {digest}, expected {expected}")
+
+
+def _file_sha256(path: str) -> str:
+    return _file_digest(path, hashlib.sha256())
+
+
+def _file_digest(path: str, digest, chunk_size: int = 1 << 20) -> str:
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+config = Config()
+artifact_store = ArtifactStore(
+    config.model.cache_dir,
+    endpoint_url=config.s3.endpoint_url,
+    part_size=config.s3.part_size,
+    max_concurrency=config.s3.max_concurrency,
+    keep=config.model.cache_keep,
+    read_timeout=config.s3.read_timeout,
+)
@@ -0,0 +1,187 @@
+import io
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.utils.logger import logger
+from src.utils.metrics import CSV_SCORED_ROWS
+
+FORMAT_CSV = "csv"
+FORMAT_NDJSON = "ndjson"
+CONTENT_TYPES = {FORMAT_CSV: "text/csv", FORMAT_NDJSON: "application/x-ndjson"}
+# Columns copied from each input row to its scored row, when the file has them
+ID_COLUMNS = ("CompanyID", "CompanyName", "Year")
+
+
+class CsvScoring:
+    """
+    Scores a CSV file chunk by chunk, producing the scored rows as text.
+
+    The file is parsed ``chunk_rows`` rows at a time; each chunk is
+    encoded and predicted with one vectorized call and written out before
+    the next one is read, so memory does not grow with the file. Iterating
+    yields the output (CSV, or NDJSON ending with a ``{"summary": ...}``
+    line) one chunk at a time.
+
+    Every output row holds the input row's ``index`` (0-based, header
+    excluded), its ID_COLUMNS, and its ``prediction`` or ``error``. Rows
+    that cannot be encoded only fail themselves. A line the CSV parser
+    cannot read ends the output with an error row (an ``{"error": ...}``
+    line in NDJSON), since the rows after it cannot be numbered.
+
+    ``progress(stats)`` is called after every chunk with the running
+    counts and the bytes read so far (of ``total_bytes`` when known).
+
+    Raises:
+        ValueError: On construction, if the file is empty or its header
+            lacks a feature of the preprocessing.
+    """
+
+    def __init__(self, stream, predictor, preprocessor, chunk_rows: int = 10000,
+                 output_format: str = FORMAT_CSV, progress=None, progress_lines: bool = False,
+                 total_bytes: int | None = None, stages: dict | None = None):
+        if output_format not in CONTENT_TYPES:
+            raise ValueError(f"Invalid format: {output_format}. Allowed: {list(CONTENT_TYPES)}")
+        self.predictor = predictor
+        self.preprocessor = preprocessor
+        self.output_format = output_format
+        self.progress = progress
+        self.progress_lines = progress_lines
+        self.stages = stages
+        self.content_type = CONTENT_TYPES[output_format]
+        self.stats = {"rows": 0, "succeeded": 0, "failed": 0, "chunks": 0, "bytes_read": 0,
+                      "bytes_total": total_bytes, "seconds": 0.0, "error": None}
+
+        self._started = time.perf_counter()
+        self._reader = _CountingReader(stream)
+        try:
+            self._chunks = pd.read_csv(io.BufferedReader(self._reader), chunksize=chunk_rows)
+            self._first = next(self._chunks)
+        except (pd.errors.EmptyDataError, StopIteration):
+            raise ValueError("Empty CSV file")
+        self._observe("parsing", self._started)
+        missing = [name for name in preprocessor.features if name not in self._first.columns]
+        if missing:
+            raise ValueError(f"Missing columns: {missing}")
+        self._id_columns = [name for name in ID_COLUMNS if name in self._first.columns]
+
+    def __iter__(self):
+        chunk, index = self._first, 0
+        self._first = None
+        try:
+            while chunk is not None:
+                yield self._score_chunk(chunk, index)
+                index += len(chunk)
+                self._report()
+                if self.progress_lines and self.output_format == FORMAT_NDJSON:
+                    yield json.dumps({"progress": dict(self.stats)}) + "\n"
+                started = time.perf_counter()
+                try:
+                    chunk = next(self._chunks, None)
+                except (pd.errors.ParserError, UnicodeDecodeError) as e:
+                    self.stats["error"] = f"Could not parse the CSV after row {index - 1}: {str(e).strip()}"
+                    yield self._error_row(self.stats["error"])
+                    break
+                self._observe("parsing", started)
+        finally:
+            self._chunks.close()
+            self._update()
+            logger.info(f"Scored CSV: {self.stats['rows']} rows ({self.stats['failed']} failed) "
+                        f"in {self.stats['seconds']:.3f}s")
+        if self.output_format == FORMAT_NDJSON:
+            yield json.dumps({"summary": self.stats}) + "\n"
+
+    def _score_chunk(self, chunk: pd.DataFrame, index: int) -> str:
+        started = time.perf_counter()
+        X, valid, errors = self.preprocessor.encode_frame(chunk)
+        encoded = self._observe("encoding", started)
+        predictions = np.full(len(chunk), np.nan)
+        if valid.any():
+            predictions[valid] = self.predictor.predict(X[valid])
+        predicted = self._observe("inference", encoded)
+
+        succeeded = int(valid.sum())
+        self.stats["rows"] += len(chunk)
+        self.stats["succeeded"] += succeeded
+        self.stats["failed"] += len(chunk) - succeeded
+        self.stats["chunks"] += 1
+        CSV_SCORED_ROWS.labels("succeeded").inc(succeeded)
+        CSV_SCORED_ROWS.labels("failed").inc(len(chunk) - succeeded)
+
+        ids = {name: _id_column(chunk[name]) for name in self._id_columns}
+        if self.output_format == FORMAT_CSV:
+            out = pd.DataFrame({"index": np.arange(index, index + len(chunk))})
+            for name, values in ids.items():
+                out[name] = values.reset_index(drop=True)
+            out["prediction"] = predictions
+            out["error"] = errors
+            text = out.to_csv(index=False, header=index == 0)
+        else:
+            ids = {name: values.astype(object).where(values.notna(), None).tolist() for name, values in ids.items()}
+            lines = []
+            for i, (error, prediction) in enumerate(zip(errors, predictions.tolist())):
+                row = {"index": index + i, **{name: values[i] for name, values in ids.items()}}
+                if error is None:
+                    row.update(success=True, prediction=prediction)
+                else:
+                    row.update(success=False, error=error)
+                lines.append(json.dumps(row, default=_json_default))
+            text = "\n".join(lines) + "\n"
+        self._observe("writing", predicted)
+        return text
+
+    def _error_row(self, error: str) -> str:
+        if self.output_format == FORMAT_NDJSON:
+            return json.dumps({"error": error}) + "\n"
+        row = pd.DataFrame({"index": [None], **{name: [None] for name in self._id_columns},
+                            "prediction": [None], "error": [error]})
+        return row.to_csv(index=False, header=self.stats["rows"] == 0)
+
+    def _update(self) -> None:
+        self.stats["bytes_read"] = self._reader.bytes_read
+        self.stats["seconds"] = round(time.perf_counter() - self._started, 3)
+
+    def _report(self) -> None:
+        self._update()
+        if self.progress is not None:
+            self.progress(dict(self.stats))
+
+    def _observe(self, stage: str, started: float) -> float:
+        now = time.perf_counter()
+        if self.stages is not None:
+            self.stages[stage].observe(now - started)
+        return now
+
+
+class _CountingReader(io.RawIOBase):
+    """Raw binary reader over a file-like object, counting the bytes read."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self.stream.read(len(buffer))
+        n = len(data)
+        buffer[:n] = data
+        self.bytes_read += n
+        return n
+
+
+def _id_column(values: pd.Series) -> pd.Series:
+    # A missing CompanyID or Year turns the column to float; keep whole numbers integers.
+    if values.dtype.kind == "f" and (values.dropna() % 1 == 0).all():
+        return values.astype("Int64")
+    return values
+
+
+def _json_default(value):
+    # numpy scalars of the ID columns
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
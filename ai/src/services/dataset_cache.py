@@ -0,0 +1,209 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+
+from src.utils.logger import logger
+
+FORMAT_VERSION = 1
+# Rows parsed at a time while converting; bounds peak memory on large CSVs.
+DEFAULT_CHUNK_ROWS = 200_000
+
+
+class DatasetCache:
+    """
+    Columnar, memory-mapped copies of CSV datasets.
+
+    A CSV is parsed once and stored as one ``.npy`` file per column in a
+    directory named after its content fingerprint. Numeric columns keep
+    their dtype; text columns (any column with text in some row) are
+    stored as small-int category codes plus a sorted category table.
+    Loading maps the files read-only, so every trainer shares the page
+    cache instead of holding its own parsed copy, and text columns come
+    back as pandas Categoricals without any Python string objects per row.
+
+    The source's (size, mtime) is remembered per path, so an unchanged
+    file is not even re-hashed. When the content changes, the cache is
+    rebuilt and the previous version removed.
+    """
+
+    def __init__(self, cache_dir: str, chunk_rows: int = DEFAULT_CHUNK_ROWS):
+        self.cache_dir = cache_dir
+        self.chunk_rows = chunk_rows
+
+    def load(self, source: str) -> pd.DataFrame:
+        """Return the dataset as a DataFrame backed by memory-mapped columns."""
+        directory = self.ensure(source)
+        manifest = _read_json(os.path.join(directory, "manifest.json"))
+        columns = {}
+        for i, column in enumerate(manifest["columns"]):
+            values = np.load(os.path.join(directory, f"{i}.npy"), mmap_mode="r")
+            if column["kind"] == "category":
+                values = pd.Categorical.from_codes(values, categories=column["categories"])
+            columns[column["name"]] = values
+        return pd.DataFrame(columns, copy=False)
+
+    def ensure(self, source: str) -> str:
+        """Build the columnar copy of ``source`` if needed and return its directory."""
+        source = os.path.abspath(source)
+        st = os.stat(source)
+        pointer_path = self._pointer_path(source)
+        pointer = _read_json(pointer_path) if os.path.exists(pointer_path) else None
+        if pointer and (pointer["size"], pointer["mtime_ns"]) == (st.st_size, st.st_mtime_ns):
+            directory = os.path.join(self.cache_dir, pointer["key"])
+            if os.path.exists(os.path.join(directory, "manifest.json")):
+                return directory
+
+        fingerprint = _file_sha256(source)
+        key = f"v{FORMAT_VERSION}-{fingerprint[:16]}"
+        directory = os.path.join(self.cache_dir, key)
+        if not os.path.exists(os.path.join(directory, "manifest.json")):
+            self._build(source, fingerprint, directory)
+        _write_json(pointer_path, {"source": source, "size": st.st_size, "mtime_ns": st.st_mtime_ns, "key": key})
+        if pointer and pointer["key"] != key:
+            # Processes still mapping the old files keep them until they unmap.
+            shutil.rmtree(os.path.join(self.cache_dir, pointer["key"]), ignore_errors=True)
+        return directory
+
+    def _build(self, source: str, fingerprint: str, directory: str) -> None:
+        logger.info(f"Converting {source} to a columnar dataset cache")
+        # Columns read as text. A column whose chunks disagree (numeric in
+        # some, text in others) is added and the conversion restarts, so it
+        # is categorical throughout, as it would be after one read_csv.
+        text_columns = set()
+        converted = None
+        while converted is None:
+            converted = self._convert(source, text_columns)
+        names, numeric, codes, tables = converted
+
+        tmp_dir = f"{directory}.tmp-{os.getpid()}-{threading.get_ident()}"
+        os.makedirs(tmp_dir, exist_ok=True)
+        columns = []
+        rows = 0
+        for i, name in enumerate(names):
+            if name in tables:
+                categories = sorted(tables[name])
+                # Remap first-seen codes to sorted category order, keeping -1 for missing.
+                order = np.empty(len(categories) + 1, dtype=np.int64)
+                order[[tables[name][value] for value in categories]] = np.arange(len(categories))
+                order[-1] = -1
+                values = order[np.concatenate(codes[name])].astype(_code_dtype(len(categories)))
+                columns.append({"name": name, "kind": "category", "dtype": str(values.dtype),
+                                "categories": categories})
+            else:
+                values = np.concatenate(numeric[name])
+                columns.append({"name": name, "kind": "numeric", "dtype": str(values.dtype)})
+            np.save(os.path.join(tmp_dir, f"{i}.npy"), values)
+            rows = len(values)
+        _write_json(os.path.join(tmp_dir, "manifest.json"), {
+            "format_version": FORMAT_VERSION,
+            "source": source,
+            "fingerprint": fingerprint,
+            "rows": rows,
+            "columns": columns,
+        })
+        try:
+            os.replace(tmp_dir, directory)
+        except OSError:
+            # Another process finished the same build first.
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        logger.info(f"Cached {rows} rows of {source} in {directory}")
+
+    def _convert(self, source: str, text_columns: set):
+        """
+        Parse ``source`` chunk by chunk into numeric arrays and category
+        codes. Returns None, after adding them to ``text_columns``, when
+        columns change between numeric and text from one chunk to the next.
+        """
+        numeric = {}
+        codes = {}
+        tables = {}
+        dtype = {name: str for name in text_columns}
+        for chunk in pd.read_csv(source, chunksize=self.chunk_rows, dtype=dtype):
+            mixed = [name for name in chunk.columns if name not in text_columns and (
+                (name in numeric and chunk[name].dtype == object) or
+                (name in tables and chunk[name].dtype != object))]
+            if mixed:
+                logger.info(f"Columns {mixed} of {source} mix numbers and text; reading them as text")
+                text_columns.update(mixed)
+                return None
+            for name in chunk.columns:
+                series = chunk[name]
+                if name in tables or (name not in numeric and series.dtype == object):
+                    table = tables.setdefault(name, {})
+                    local_codes, uniques = pd.factorize(series)
+                    mapping = np.array([table.setdefault(value, len(table)) for value in uniques] + [-1])
+                    codes.setdefault(name, []).append(mapping[local_codes])
+                else:
+                    numeric.setdefault(name, []).append(pd.to_numeric(series).to_numpy())
+        return list(chunk.columns), numeric, codes, tables
+
+    def _pointer_path(self, source: str) -> str:
+        return os.path.join(self.cache_dir, "sources", hashlib.sha1(source.encode("utf-8")).hexdigest()[:16] + ".json")
+
+
+def load_dataset(source: str, cache_dir: str | None = None) -> pd.DataFrame:
+    """
+    Load a training CSV through the columnar cache in ``cache_dir``, or
+    parse it directly when no cache directory is configured.
+    """
+    if not cache_dir:
+        return pd.read_csv(source)
+    return DatasetCache(cache_dir).load(source)
+
+
+def _code_dtype(n_categories: int):
+    # The smallest dtype pandas itself uses for these codes, so
+    # Categorical.from_codes keeps the mapped array instead of copying it.
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def _file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _read_json(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_json(path: str, data: dict) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+# Build (or refresh) the cache for a dataset ahead of training:
+#   python -m src.services.dataset_cache data/company_esg_financial_dataset.csv
+if __name__ == "__main__":
+    import sys
+    import time
+
+    from src.configs.load_config import Config
+
+    config = Config()
+    cache = DatasetCache(config.data.cache_dir or "./data/cache")
+    source = sys.argv[1] if len(sys.argv) > 1 else config.data.path
+
+    started = time.perf_counter()
+    pd.read_csv(source)
+    parse_seconds = time.perf_counter() - started
+    directory = cache.ensure(source)
+    started = time.perf_counter()
+    df = cache.load(source)
+    load_seconds = time.perf_counter() - started
+    print(f"[INFO] {directory}: {len(df)} rows, {len(df.columns)} columns")
+    print(f"[INFO] read_csv {parse_seconds * 1e3:.1f}ms, cached load {load_seconds * 1e3:.1f}ms")
@@ -0,0 +1,83 @@
+import json
+import time
+
+import numpy as np
+
+
+def parse_records(body: bytes, content_type: str | None) -> list:
+    """
+    Parse a batch request body into a list of records.
+
+    Accepts a JSON array, a JSON object with a ``records`` array, or
+    newline-delimited JSON (one record per line). NDJSON lines that fail
+    to parse are kept as their raw text so they surface as row errors
+    instead of failing the whole batch.
+    """
+    if content_type and "ndjson" in content_type:
+        records = []
+        for line in body.decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                records.append(line)
+        return records
+
+    payload = json.loads(body)
+    if isinstance(payload, dict):
+        payload = payload.get("records")
+    if not isinstance(payload, list):
+        raise ValueError("Expected a JSON array of records or an object with a 'records' array")
+    return payload
+
+
+def score_records(predictor, preprocessor, records: list, stages: dict | None = None) -> list[dict]:
+    """
+    Score a batch of records with one ``predictor.predict`` call, returning
+    one result dict per input row. ``stages`` may map "encoding" and
+    "inference" to histograms observing the time spent in each.
+    """
+    started = time.perf_counter()
+    X, valid, errors = preprocessor.encode_records(records)
+    encoded = time.perf_counter()
+    predictions = predictor.predict(X) if len(X) else np.empty(0)
+    if stages is not None:
+        stages["encoding"].observe(encoded - started)
+        stages["inference"].observe(time.perf_counter() - encoded)
+
+    results = []
+    predictions = iter(predictions.tolist())
+    for i, error in enumerate(errors):
+        if error is None:
+            results.append({"index": i, "success": True, "prediction": next(predictions)})
+        else:
+            results.append({"index": i, "success": False, "error": error})
+    return results
+
+
+def explain_records(explainer, preprocessor, records: list, stages: dict | None = None) -> tuple[float, list[dict]]:
+    """
+    Explain a batch of records with one ``explainer.explain`` call, like
+    ``score_records``: each valid row gets its prediction and the
+    contribution of every feature to it. Returns the bias the
+    contributions of every row add up from, and the per-row results.
+    """
+    started = time.perf_counter()
+    X, valid, errors = preprocessor.encode_records(records)
+    encoded = time.perf_counter()
+    predictions, bias, contributions = explainer.explain(X)
+    if stages is not None:
+        stages["encoding"].observe(encoded - started)
+        stages["inference"].observe(time.perf_counter() - encoded)
+
+    results = []
+    rows = zip(predictions.tolist(), contributions.tolist())
+    for i, error in enumerate(errors):
+        if error is None:
+            prediction, values = next(rows)
+            results.append({"index": i, "success": True, "prediction": prediction,
+                            "contributions": dict(zip(preprocessor.features, values))})
+        else:
+            results.append({"index": i, "success": False, "error": error})
+    return bias, results
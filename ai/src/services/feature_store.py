@@ -0,0 +1,301 @@
+import glob
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.configs.load_config import Config
+from src.services.dataset_cache import DatasetCache, _read_json, _write_json
+from src.utils.logger import logger
+
+FORMAT_VERSION = 1
+# Keys pack (CompanyID, Year) into one int64: the company in the high bits.
+YEAR_BITS = 16
+_YEAR_MASK = (1 << YEAR_BITS) - 1
+# Year value meaning "the company's latest year"
+LATEST_YEAR = -1
+
+
+class CompanyFeatures:
+    """
+    Encoded feature rows of one dataset version, for one preprocessing.
+
+    ``X`` holds one float32 row per (CompanyID, Year), ready for
+    ``predict``. ``keys`` are the packed (CompanyID, Year) of the rows in
+    ascending order and are looked up through a pandas hash index.
+    ``row_hashes`` are hashes of the raw feature values each row was
+    encoded from, used to reuse unchanged rows when the dataset changes.
+    """
+
+    def __init__(self, fingerprint: str, dataset_key: str, keys: np.ndarray, X: np.ndarray,
+                 row_hashes: np.ndarray, directory: str | None = None):
+        self.fingerprint = fingerprint
+        self.dataset_key = dataset_key
+        self.keys = keys
+        self.X = X
+        self.row_hashes = row_hashes
+        self.directory = directory
+        self.index = pd.Index(keys)
+        # Build the hash table now rather than on the first request.
+        self.index.get_indexer(keys[:1])
+        self._companies = keys >> YEAR_BITS
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def lookup(self, company_ids: np.ndarray, years: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Return the row of every (CompanyID, Year) pair, -1 for unknown
+        pairs, and the years resolved. A year of LATEST_YEAR selects the
+        company's latest year.
+        """
+        years = years.copy()
+        latest = years == LATEST_YEAR
+        if latest.any() and len(self.keys):
+            last = np.searchsorted(self._companies, company_ids[latest], side="right") - 1
+            found = (last >= 0) & (self._companies[np.maximum(last, 0)] == company_ids[latest])
+            years[latest] = np.where(found, self.keys[np.maximum(last, 0)] & _YEAR_MASK, LATEST_YEAR)
+        rows = self.index.get_indexer(pack_keys(company_ids, years))
+        rows[years == LATEST_YEAR] = -1
+        return rows, years
+
+    def describe(self) -> dict:
+        return {
+            "preprocessing": self.fingerprint,
+            "dataset": self.dataset_key,
+            "rows": len(self),
+            "companies": int(len(np.unique(self._companies))),
+            "directory": self.directory,
+        }
+
+
+class FeatureStore:
+    """
+    Precomputed model input for every company of the training dataset.
+
+    Rows are encoded with the serving model's preprocessing, once per
+    (preprocessing, dataset version), and saved as memory-mapped ``.npy``
+    files under ``cache_dir/features`` so restarted and forked processes
+    share them instead of encoding again. Without a cache directory they
+    are kept in memory only.
+
+    The dataset is checked at most once per ``check_interval`` seconds.
+    When it changed, rows whose (CompanyID, Year) and raw feature values
+    are unchanged are copied from the previous version and only new or
+    edited rows are encoded. Meanwhile the other threads keep serving the
+    previous version; after a model change they wait, since the old rows
+    were encoded for another preprocessing.
+    """
+
+    def __init__(self, data_path: str, cache_dir: str | None = None, check_interval: float = 5.0):
+        self.data_path = data_path
+        self.cache_dir = cache_dir
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._current = None
+        self._checked_at = 0.0
+
+    def get(self, preprocessor) -> CompanyFeatures:
+        """
+        Return the encoded rows of the current dataset for ``preprocessor``,
+        building them if needed.
+
+        Raises:
+            FileNotFoundError: If the dataset does not exist.
+        """
+        current = self._current
+        if (current is not None and current.fingerprint == preprocessor.fingerprint
+                and time.monotonic() - self._checked_at < self.check_interval):
+            return current
+        return self._check(preprocessor, current)
+
+    def describe(self) -> dict:
+        current = self._current
+        return current.describe() if current is not None else {"rows": 0}
+
+    def _check(self, preprocessor, current: CompanyFeatures | None) -> CompanyFeatures:
+        usable = current is not None and current.fingerprint == preprocessor.fingerprint
+        if usable:
+            # Another thread is already building the new version.
+            if not self._lock.acquire(blocking=False):
+                return current
+        else:
+            self._lock.acquire()
+        try:
+            dataset_key = self._dataset_key()
+            current = self._current
+            if (current is None or current.fingerprint != preprocessor.fingerprint
+                    or current.dataset_key != dataset_key):
+                self._current = self._load(preprocessor, dataset_key, current)
+            self._checked_at = time.monotonic()
+            return self._current
+        finally:
+            self._lock.release()
+
+    def _dataset_key(self) -> str:
+        if self.cache_dir:
+            return os.path.basename(DatasetCache(self.cache_dir).ensure(self.data_path))
+        st = os.stat(self.data_path)
+        return f"{st.st_size}-{st.st_mtime_ns}"
+
+    def _load(self, preprocessor, dataset_key: str, current: CompanyFeatures | None) -> CompanyFeatures:
+        directory = self._directory(preprocessor.fingerprint, dataset_key)
+        if directory and os.path.exists(os.path.join(directory, "manifest.json")):
+            return _read(directory)
+
+        previous = current if current is not None and current.fingerprint == preprocessor.fingerprint else None
+        if previous is None and directory:
+            previous = self._latest_on_disk(preprocessor.fingerprint)
+        df = DatasetCache(self.cache_dir).load(self.data_path) if self.cache_dir else pd.read_csv(self.data_path)
+        features, stats = _encode(preprocessor, dataset_key, df, previous)
+        logger.info(f"Feature store: {stats['rows']} rows for preprocessing {preprocessor.fingerprint} "
+                    f"({stats['reused']} reused, {stats['encoded']} encoded, {stats['skipped']} skipped) "
+                    f"in {stats['seconds']:.3f}s")
+        if not directory:
+            return features
+        _write(features, directory, stats)
+        for stale in glob.glob(os.path.join(self.cache_dir, "features", f"{preprocessor.fingerprint}-*")):
+            if stale != directory and ".tmp-" not in stale:
+                # Processes still mapping the old files keep them until they unmap.
+                shutil.rmtree(stale, ignore_errors=True)
+        return _read(directory)
+
+    def _latest_on_disk(self, fingerprint: str) -> CompanyFeatures | None:
+        manifests = [path for path in glob.glob(os.path.join(self.cache_dir, "features", f"{fingerprint}-*",
+                                                             "manifest.json"))
+                     if ".tmp-" not in path]
+        if not manifests:
+            return None
+        return _read(os.path.dirname(max(manifests, key=os.path.getmtime)))
+
+    def _directory(self, fingerprint: str, dataset_key: str) -> str | None:
+        if not self.cache_dir:
+            return None
+        return os.path.join(self.cache_dir, "features", f"{fingerprint}-{dataset_key}")
+
+
+def pack_keys(company_ids: np.ndarray, years: np.ndarray) -> np.ndarray:
+    """Pack (CompanyID, Year) pairs into the int64 keys of the index."""
+    return (company_ids.astype(np.int64) << YEAR_BITS) | (years.astype(np.int64) & _YEAR_MASK)
+
+
+def parse_ids(items: list) -> tuple[np.ndarray, np.ndarray, list]:
+    """
+    Parse company references: {"CompanyID": 1, "Year": 2020}, [1, 2020],
+    or a bare CompanyID for the latest year.
+
+    Returns:
+        company_ids, years (LATEST_YEAR when omitted) and a list with an
+        error message or None per item. Items with an error keep the
+        placeholders 0 and LATEST_YEAR and must not be looked up.
+    """
+    company_ids = np.zeros(len(items), dtype=np.int64)
+    years = np.full(len(items), LATEST_YEAR, dtype=np.int64)
+    errors = [None] * len(items)
+    for i, item in enumerate(items):
+        if isinstance(item, dict):
+            company_id, year = item.get("CompanyID"), item.get("Year")
+        elif isinstance(item, (list, tuple)) and len(item) in (1, 2):
+            company_id, year = item[0], item[1] if len(item) == 2 else None
+        else:
+            company_id, year = item, None
+        try:
+            company_id = _as_int(company_id, "CompanyID")
+            if year is not None:
+                year = _as_int(year, "Year")
+                if not 0 <= year <= _YEAR_MASK:
+                    raise ValueError(f"Invalid Year: {year}")
+                years[i] = year
+            company_ids[i] = company_id
+        except ValueError as e:
+            errors[i] = str(e)
+    return company_ids, years, errors
+
+
+def _as_int(value, name: str) -> int:
+    if isinstance(value, bool) or value is None:
+        raise ValueError(f"Invalid {name}: {value}")
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid {name}: {str(value)[:100]}")
+    if not number.is_integer() or abs(number) >= 1 << (62 - YEAR_BITS):
+        raise ValueError(f"Invalid {name}: {value}")
+    return int(number)
+
+
+def _encode(preprocessor, dataset_key: str, df: pd.DataFrame,
+            previous: CompanyFeatures | None) -> tuple[CompanyFeatures, dict]:
+    started = time.perf_counter()
+    company_ids = pd.to_numeric(df["CompanyID"], errors="coerce").to_numpy(dtype=np.float64)
+    years = pd.to_numeric(df["Year"], errors="coerce").to_numpy(dtype=np.float64)
+    identified = np.flatnonzero(~np.isnan(company_ids) & ~np.isnan(years))
+    keys = pack_keys(company_ids[identified], years[identified])
+
+    # A (CompanyID, Year) listed twice keeps its last row, like a re-filed report.
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    last = np.append(keys[1:] != keys[:-1], True)
+    keys = keys[last]
+    frame = df[preprocessor.features].iloc[identified[order[last]]]
+    row_hashes = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+    X = np.empty((len(keys), len(preprocessor.features)), dtype=np.float32)
+    keep = np.zeros(len(keys), dtype=bool)
+    if previous is not None:
+        positions = previous.index.get_indexer(keys)
+        keep = positions >= 0
+        keep[keep] = previous.row_hashes[positions[keep]] == row_hashes[keep]
+        X[keep] = previous.X[positions[keep]]
+    reused = int(keep.sum())
+
+    changed = np.flatnonzero(~keep)
+    if len(changed):
+        encoded, valid, _ = preprocessor.encode_frame(frame.iloc[changed])
+        X[changed[valid]] = encoded[valid]
+        keep[changed[valid]] = True
+
+    features = CompanyFeatures(preprocessor.fingerprint, dataset_key, keys[keep], X[keep], row_hashes[keep])
+    stats = {
+        "rows": len(features),
+        "reused": reused,
+        "encoded": len(features) - reused,
+        # Rows without an id, duplicates, and rows this preprocessing cannot encode
+        "skipped": len(df) - len(features),
+        "seconds": time.perf_counter() - started,
+    }
+    return features, stats
+
+
+def _write(features: CompanyFeatures, directory: str, stats: dict) -> None:
+    tmp_dir = f"{directory}.tmp-{os.getpid()}-{threading.get_ident()}"
+    os.makedirs(tmp_dir, exist_ok=True)
+    np.save(os.path.join(tmp_dir, "keys.npy"), features.keys)
+    np.save(os.path.join(tmp_dir, "X.npy"), features.X)
+    np.save(os.path.join(tmp_dir, "row_hashes.npy"), features.row_hashes)
+    _write_json(os.path.join(tmp_dir, "manifest.json"), {
+        "format_version": FORMAT_VERSION,
+        "preprocessing": features.fingerprint,
+        "dataset": features.dataset_key,
+        **stats,
+    })
+    try:
+        os.replace(tmp_dir, directory)
+    except OSError:
+        # Another process finished the same build first.
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _read(directory: str) -> CompanyFeatures:
+    manifest = _read_json(os.path.join(directory, "manifest.json"))
+    arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+              for name in ("keys", "X", "row_hashes")}
+    return CompanyFeatures(manifest["preprocessing"], manifest["dataset"], arrays["keys"], arrays["X"],
+                           arrays["row_hashes"], directory)
+
+
+config = Config()
+feature_store = FeatureStore(config.data.path, config.data.cache_dir, config.data.check_interval)
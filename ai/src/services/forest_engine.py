@@ -0,0 +1,518 @@
+import json
+import os
+import sys
+import threading
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# Rows evaluated together on the multi-row path; bounds the size of the
+# (n_trees, n_rows) working arrays.
+DEFAULT_CHUNK_ROWS = 256
+# Version of the .npz layout written by CompiledForest.save
+FORMAT_VERSION = 1
+
+
+class SklearnPredictor:
+    """Predicts with the estimator's own ``predict``."""
+
+    engine = "sklearn"
+
+    def __init__(self, model):
+        self.model = model
+        self.feature_names = getattr(model, "feature_names_in_", None)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        if self.feature_names is not None:
+            X = pd.DataFrame(X, columns=self.feature_names, copy=False)
+        return self.model.predict(X)
+
+
+class BundlePredictor:
+    """
+    Serves a ModelBundle: every member has its own predictor, and their
+    outputs are gathered into one (n_rows, n_targets) array.
+    """
+
+    def __init__(self, members: list, n_targets: int, n_features: int):
+        self.members = [(predictor, outputs, None if columns == list(range(n_features)) else columns)
+                        for predictor, outputs, columns in members]
+        self.n_targets = n_targets
+        engines = {predictor.engine for predictor, _, _ in members}
+        self.engine = engines.pop() if len(engines) == 1 else "mixed"
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        out = np.empty((len(X), self.n_targets))
+        for predictor, outputs, columns in self.members:
+            predictions = predictor.predict(X if columns is None else X[:, columns])
+            out[:, outputs] = predictions.reshape(len(X), len(outputs))
+        return out
+
+
+class CompiledForest:
+    """
+    A fitted regression forest flattened into contiguous NumPy arrays.
+
+    All trees share one node table. Each node stores its split feature,
+    threshold, which child missing values go to and the global indices of
+    its children; leaves point to themselves, so every row can be walked
+    ``max_depth`` levels for all trees at once without branching.
+
+    Predictions are bit-identical to ``RandomForestRegressor.predict``: the
+    input is cast to float32 like sklearn does, and per-tree outputs are
+    summed in estimator order before dividing by the number of trees.
+    """
+
+    engine = "compiled"
+
+    def __init__(self, feature, threshold, missing_left, children, value, roots,
+                 max_depth, n_features, chunk_rows=DEFAULT_CHUNK_ROWS, max_rows=None, fallback=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.missing_left = missing_left
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.n_features = n_features
+        self.n_trees = len(roots)
+        self.chunk_rows = chunk_rows
+        # Batches larger than max_rows are handed to the fallback predictor:
+        # sklearn's Cython traversal wins once per-call overhead is amortized.
+        self.max_rows = max_rows
+        self.fallback = fallback
+        self.metadata = {}
+        self._path_gains = None
+
+    @classmethod
+    def from_sklearn(cls, forest, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> "CompiledForest":
+        """Flatten the trees of a fitted RandomForestRegressor/ExtraTreesRegressor."""
+        trees = [estimator.tree_ for estimator in forest.estimators_]
+        counts = np.array([tree.node_count for tree in trees])
+        offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        n_nodes = int(counts.sum())
+
+        feature = np.empty(n_nodes, dtype=np.intp)
+        threshold = np.empty(n_nodes, dtype=np.float64)
+        missing_left = np.zeros(n_nodes, dtype=bool)
+        # children[2 * i] is the right child of node i, children[2 * i + 1]
+        # the left one, so the next node is children[2 * node + go_left].
+        children = np.empty(2 * n_nodes, dtype=np.intp)
+        value = np.empty((n_nodes, forest.n_outputs_), dtype=np.float64)
+
+        for tree, offset in zip(trees, offsets):
+            nodes = slice(offset, offset + tree.node_count)
+            local = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+            left = np.where(is_leaf, local, tree.children_left) + offset
+            right = np.where(is_leaf, local, tree.children_right) + offset
+
+            feature[nodes] = np.where(is_leaf, 0, tree.feature)
+            threshold[nodes] = np.where(is_leaf, 0.0, tree.threshold)
+            if hasattr(tree, "missing_go_to_left"):
+                missing_left[nodes] = tree.missing_go_to_left.astype(bool)
+            children[2 * offset:2 * (offset + tree.node_count):2] = right
+            children[2 * offset + 1:2 * (offset + tree.node_count):2] = left
+            value[nodes] = tree.value[:, :, 0]
+
+        if forest.n_outputs_ == 1:
+            value = value[:, 0]
+        return cls(
+            feature=feature,
+            threshold=threshold,
+            missing_left=missing_left,
+            children=children,
+            value=np.ascontiguousarray(value),
+            roots=offsets.astype(np.intp),
+            max_depth=max(tree.max_depth for tree in trees),
+            n_features=forest.n_features_in_,
+            chunk_rows=chunk_rows,
+        )
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Predict for a 2D array of rows whose columns follow the training feature order."""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected input of shape (n, {self.n_features}), got {X.shape}")
+        if len(X) == 1:
+            return self.predict_one(X[0])[np.newaxis]
+        if self.fallback is not None and self.max_rows is not None and len(X) > self.max_rows:
+            return self.fallback.predict(X)
+        out = [self._predict_chunk(X[start:start + self.chunk_rows])
+               for start in range(0, len(X), self.chunk_rows)]
+        return np.concatenate(out) if out else np.empty((0,) + self.value.shape[1:])
+
+    def predict_one(self, x: np.ndarray):
+        """Predict a single row by walking all trees level by level."""
+        x = np.asarray(x, dtype=np.float32)
+        has_nan = np.isnan(x).any()
+        node = self.roots
+        for _ in range(self.max_depth):
+            x_node = x[self.feature[node]]
+            go_left = x_node <= self.threshold[node]
+            if has_nan:
+                go_left |= np.isnan(x_node) & self.missing_left[node]
+            node = self.children[2 * node + go_left]
+        return np.cumsum(self.value[node], axis=0)[-1] / self.n_trees
+
+    def leaves(self, X: np.ndarray) -> np.ndarray:
+        """Return the global leaf index reached by every row in every tree, shape (n_trees, n_rows)."""
+        X = np.asarray(X, dtype=np.float32)
+        n_rows = len(X)
+        has_nan = np.isnan(X).any()
+        flat = X.ravel()
+        leaf = np.repeat(self.roots, n_rows)
+        # Only (tree, row) pairs still at an internal node are walked further.
+        active = np.arange(leaf.size)
+        node = leaf.copy()
+        row_offset = np.tile(np.arange(n_rows) * self.n_features, self.n_trees)
+        for _ in range(self.max_depth):
+            x_node = flat[row_offset + self.feature[node]]
+            go_left = x_node <= self.threshold[node]
+            if has_nan:
+                go_left |= np.isnan(x_node) & self.missing_left[node]
+            child = self.children[2 * node + go_left]
+            moved = child != node
+            active, node, row_offset = active[moved], child[moved], row_offset[moved]
+            if not len(active):
+                break
+            leaf[active] = node
+        return leaf.reshape(self.n_trees, n_rows)
+
+    def explain(self, X: np.ndarray) -> tuple[np.ndarray, float, np.ndarray]:
+        """
+        Decision-path contributions of every feature to the prediction of
+        each row.
+
+        Each split a row goes through moves the tree's output from the
+        node's value to the child's; the change is credited to the split
+        feature. Averaged over the trees, ``bias + contributions.sum(1)``
+        is the prediction (up to float rounding), ``bias`` being the mean
+        root value: the training target mean. All trees and rows are
+        walked together as in ``leaves``.
+
+        Returns:
+            (predictions, bias, contributions of shape (n_rows, n_features)),
+            the predictions identical to ``predict``.
+
+        Raises:
+            ValueError: If the forest has several outputs, or was compacted
+                without the values of its internal nodes.
+        """
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected input of shape (n, {self.n_features}), got {X.shape}")
+        bias = float(np.cumsum(self.value[self.roots])[-1] / self.n_trees)
+        predictions, contributions = [], []
+        for start in range(0, len(X), self.chunk_rows):
+            chunk_predictions, chunk_contributions = self._explain_chunk(X[start:start + self.chunk_rows])
+            predictions.append(chunk_predictions)
+            contributions.append(chunk_contributions)
+        if not predictions:
+            return np.empty(0), bias, np.empty((0, self.n_features))
+        return np.concatenate(predictions), bias, np.concatenate(contributions)
+
+    @property
+    def explainable(self) -> bool:
+        """Whether ``explain`` can be used: one output and the values of internal nodes kept."""
+        nodes = np.arange(len(self.feature))
+        internal = self.children[2 * nodes] != nodes
+        return self.value.ndim == 1 and (not internal.any() or bool(self.value[internal].any()))
+
+    def _explain_chunk(self, X: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        gain, split_feature = self._gains()
+        n_rows = len(X)
+        has_nan = np.isnan(X).any()
+        flat = X.ravel()
+        leaf = np.repeat(self.roots, n_rows)
+        active = np.arange(leaf.size)
+        node = leaf.copy()
+        row = np.tile(np.arange(n_rows), self.n_trees)
+        totals = np.zeros(n_rows * self.n_features)
+        for _ in range(self.max_depth):
+            x_node = flat[row * self.n_features + self.feature[node]]
+            go_left = x_node <= self.threshold[node]
+            if has_nan:
+                go_left |= np.isnan(x_node) & self.missing_left[node]
+            child = self.children[2 * node + go_left]
+            moved = child != node
+            active, node, row = active[moved], child[moved], row[moved]
+            if not len(active):
+                break
+            leaf[active] = node
+            # One weighted bincount credits every (row, split feature) pair of this level.
+            totals += np.bincount(row * self.n_features + split_feature[node], weights=gain[node],
+                                  minlength=totals.size)
+        predictions = np.cumsum(self.value[leaf.reshape(self.n_trees, n_rows)], axis=0)[-1] / self.n_trees
+        return predictions, totals.reshape(n_rows, self.n_features) / self.n_trees
+
+    def _gains(self) -> tuple[np.ndarray, np.ndarray]:
+        """Per node: its value minus its parent's, and the parent's split feature (roots: 0)."""
+        if self._path_gains is None:
+            if not self.explainable:
+                raise ValueError("Only single-output forests that keep their internal node values "
+                                 "can be explained; slimmed forests cannot")
+            nodes = np.arange(len(self.feature))
+            parents = nodes[self.children[2 * nodes] != nodes]
+            gain = np.zeros(len(nodes))
+            split_feature = np.zeros(len(nodes), dtype=np.intp)
+            for side in (0, 1):
+                child = self.children[2 * parents + side]
+                gain[child] = self.value[child] - self.value[parents]
+                split_feature[child] = self.feature[parents]
+            self._path_gains = gain, split_feature
+        return self._path_gains
+
+    def _predict_chunk(self, X: np.ndarray) -> np.ndarray:
+        # cumsum along the tree axis adds tree outputs sequentially, in the
+        # same order sklearn accumulates them.
+        return np.cumsum(self.value[self.leaves(X)], axis=0)[-1] / self.n_trees
+
+    def verify(self, forest, X: np.ndarray | None = None, n_probe: int = 256, seed: int = 0) -> bool:
+        """
+        Check that predictions are bit-identical to the sklearn forest.
+
+        Args:
+            forest: The forest this engine was compiled from.
+            X: Rows to compare on. Defaults to probe rows placed on and
+                around the split thresholds of the forest.
+            n_probe: Number of probe rows to generate when X is None.
+
+        Returns:
+            True if both the single-row and multi-row paths match exactly.
+        """
+        if X is None:
+            X = self.probe_rows(n_probe, seed)
+        X = np.asarray(X, dtype=np.float32)
+        expected = _sequential_predict(forest, X)
+        if not np.array_equal(self.predict(X), expected):
+            return False
+        return all(np.array_equal(self.predict_one(X[i]), expected[i]) for i in range(min(len(X), 32)))
+
+    def truncated(self, n_trees: int | None = None, max_depth: int | None = None) -> "CompiledForest":
+        """
+        Return a forest keeping only the first ``n_trees`` trees, cut at
+        ``max_depth``: nodes at that depth become leaves predicting the
+        mean their subtree was grown from. Unreachable nodes are dropped.
+        """
+        n_trees = self.n_trees if n_trees is None else min(n_trees, self.n_trees)
+        max_depth = self.max_depth if max_depth is None else min(max_depth, self.max_depth)
+        roots = self.roots[:n_trees]
+        children = self.children.copy()
+
+        reachable = np.zeros(len(self.feature), dtype=bool)
+        frontier = roots
+        for depth in range(max_depth + 1):
+            reachable[frontier] = True
+            if depth == max_depth:
+                children[2 * frontier] = frontier
+                children[2 * frontier + 1] = frontier
+                break
+            following = np.concatenate((children[2 * frontier], children[2 * frontier + 1]))
+            frontier = np.unique(following[~reachable[following]])
+            if not len(frontier):
+                break
+
+        keep = np.flatnonzero(reachable)
+        new_index = np.cumsum(reachable) - 1
+        is_leaf = children[2 * keep] == keep
+        return CompiledForest(
+            feature=np.where(is_leaf, 0, self.feature[keep]).astype(self.feature.dtype),
+            threshold=np.where(is_leaf, 0, self.threshold[keep]).astype(self.threshold.dtype),
+            missing_left=self.missing_left[keep],
+            children=new_index[children.reshape(-1, 2)[keep]].ravel().astype(self.children.dtype),
+            value=self.value[keep],
+            roots=new_index[roots].astype(self.roots.dtype),
+            max_depth=max_depth,
+            n_features=self.n_features,
+            chunk_rows=self.chunk_rows,
+        )
+
+    def compacted(self) -> "CompiledForest":
+        """
+        Return the same forest in the smallest exact dtypes: float32
+        thresholds, int32 node indices, the narrowest int for features.
+
+        Thresholds are rounded down to float32, so ``x <= threshold`` is
+        unchanged for every float32 input and predictions stay identical.
+        Internal nodes' values, never read, are zeroed so they compress away.
+        """
+        threshold = self.threshold.astype(np.float32)
+        above = threshold.astype(np.float64) > self.threshold
+        threshold[above] = np.nextafter(threshold[above], np.float32(-np.inf))
+        index_dtype = np.int32 if len(self.feature) < np.iinfo(np.int32).max // 2 else np.intp
+        is_leaf = self.children[2 * np.arange(len(self.feature))] == np.arange(len(self.feature))
+        value = np.where(is_leaf if self.value.ndim == 1 else is_leaf[:, np.newaxis], self.value, 0.0)
+        return CompiledForest(
+            feature=self.feature.astype(np.min_scalar_type(max(self.n_features - 1, 0))),
+            threshold=threshold,
+            missing_left=self.missing_left,
+            children=self.children.astype(index_dtype),
+            value=value,
+            roots=self.roots.astype(index_dtype),
+            max_depth=self.max_depth,
+            n_features=self.n_features,
+            chunk_rows=self.chunk_rows,
+        )
+
+    @property
+    def n_features_in_(self) -> int:
+        return self.n_features
+
+    @property
+    def n_bytes(self) -> int:
+        """Memory held by the node arrays."""
+        return sum(a.nbytes for a in (self.feature, self.threshold, self.missing_left, self.children,
+                                      self.value, self.roots))
+
+    def save(self, path: str, metadata: dict | None = None) -> str:
+        """Atomically write the node arrays to a compressed ``.npz`` file."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        meta = {"format_version": FORMAT_VERSION, "max_depth": int(self.max_depth),
+                "n_features": int(self.n_features), "metadata": metadata or {}}
+        tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.savez_compressed(f, feature=self.feature, threshold=self.threshold,
+                                    missing_left=self.missing_left, children=self.children,
+                                    value=self.value, roots=self.roots, meta=np.array(json.dumps(meta)))
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return path
+
+    @classmethod
+    def load(cls, path: str, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> "CompiledForest":
+        """Load a forest written by ``save``; its metadata is kept in ``metadata``."""
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta["format_version"] != FORMAT_VERSION:
+                raise ValueError(f"Unsupported forest format {meta['format_version']} in {path}")
+            forest = cls(feature=data["feature"], threshold=data["threshold"], missing_left=data["missing_left"],
+                         children=data["children"], value=data["value"], roots=data["roots"],
+                         max_depth=meta["max_depth"], n_features=meta["n_features"], chunk_rows=chunk_rows)
+        forest.metadata = meta["metadata"]
+        return forest
+
+    def probe_rows(self, n_rows: int, seed: int = 0) -> np.ndarray:
+        """
+        Generate rows whose values sit on, just below and just above split
+        thresholds, with some missing values to exercise the NaN paths.
+        """
+        rng = np.random.default_rng(seed)
+        internal = self.children[2 * np.arange(len(self.feature)) + 1] != np.arange(len(self.feature))
+        X = rng.standard_normal((n_rows, self.n_features)).astype(np.float32)
+        for j in range(self.n_features):
+            # Splits learned on missing values only have an infinite threshold.
+            thresholds = self.threshold[internal & (self.feature == j)]
+            thresholds = thresholds[np.isfinite(thresholds)]
+            if len(thresholds) == 0:
+                continue
+            picked = rng.choice(thresholds, size=n_rows).astype(np.float32)
+            nudge = rng.integers(-1, 2, size=n_rows)
+            picked = np.where(nudge < 0, np.nextafter(picked, np.float32(-np.inf)), picked)
+            picked = np.where(nudge > 0, np.nextafter(picked, np.float32(np.inf)), picked)
+            X[:, j] = picked
+        X[rng.random(X.shape) < 0.05] = np.nan
+        return X
+
+
+def compile_predictor(model, engine: str, max_rows: int | None = None, chunk_rows: int = DEFAULT_CHUNK_ROWS):
+    """
+    Build the predictor used to serve a model.
+
+    With ``engine="compiled"``, regression forests are flattened into a
+    CompiledForest and checked against sklearn on probe rows; anything
+    else, or a forest that fails the check, is served by sklearn. Each
+    member of a ModelBundle gets its own predictor.
+
+    Args:
+        model: The fitted estimator.
+        engine: "sklearn" or "compiled".
+        max_rows: Batches above this size are predicted by sklearn.
+        chunk_rows: Rows walked together on the compiled multi-row path.
+    """
+    if _is_bundle(model):
+        members = [(compile_predictor(estimator, engine, max_rows, chunk_rows), outputs, columns)
+                   for estimator, outputs, columns in model.members]
+        return BundlePredictor(members, len(model.targets), model.n_features_in_)
+    sklearn_predictor = SklearnPredictor(model)
+    if engine == CompiledForest.engine and _is_regression_forest(model):
+        compiled = CompiledForest.from_sklearn(model, chunk_rows=chunk_rows)
+        if compiled.verify(model):
+            compiled.max_rows = max_rows
+            compiled.fallback = sklearn_predictor
+            return compiled
+        from src.utils.logger import logger
+        logger.warning("Compiled forest does not match sklearn predictions; serving with sklearn")
+    return sklearn_predictor
+
+
+def compile_explainer(model, predictor=None) -> CompiledForest:
+    """
+    Return the CompiledForest whose ``explain`` explains ``model``: its
+    predictor when that is one, else the forest compiled anew.
+
+    Raises:
+        ValueError: If the model is not a regression forest that can be explained.
+    """
+    if isinstance(predictor, CompiledForest) and predictor.explainable:
+        return predictor
+    if isinstance(model, CompiledForest) and model.explainable:
+        return model
+    if _is_regression_forest(model) and model.n_outputs_ == 1:
+        return CompiledForest.from_sklearn(model)
+    raise ValueError(f"Cannot explain a {type(model).__name__}: only single-output regression forests "
+                     f"with their internal node values can be explained")
+
+
+def _is_bundle(model) -> bool:
+    from src.services.model_bundle import ModelBundle
+    return isinstance(model, ModelBundle)
+
+
+def _is_regression_forest(model) -> bool:
+    from sklearn.ensemble import ExtraTreesRegressor, RandomForestRegressor
+    return isinstance(model, (RandomForestRegressor, ExtraTreesRegressor))
+
+
+def _sequential_predict(forest, X: np.ndarray) -> np.ndarray:
+    """Forest prediction with tree outputs accumulated in estimator order, as sklearn does with n_jobs=None."""
+    if forest.n_jobs in (None, 1):
+        with warnings.catch_warnings():
+            # Probe rows are plain arrays; the feature-name check is irrelevant here.
+            warnings.simplefilter("ignore", UserWarning)
+            return forest.predict(X)
+    out = np.zeros((len(X), forest.n_outputs_) if forest.n_outputs_ > 1 else len(X))
+    for estimator in forest.estimators_:
+        out += estimator.predict(X, check_input=False)
+    return out / len(forest.estimators_)
+
+
+# Compare the compiled engine with sklearn on a trained model and the dataset:
+#   python -m src.services.forest_engine trained_models/model.joblib data/company_esg_financial_dataset.csv
+if __name__ == "__main__":
+    import joblib
+    from src.services.preprocessing import load_preprocessor
+
+    forest = joblib.load(sys.argv[1])
+    compiled = CompiledForest.from_sklearn(forest)
+    df = pd.read_csv(sys.argv[2])
+    X, _, _ = load_preprocessor(sys.argv[1]).encode_records(df.to_dict("records"))
+
+    print(f"[INFO] Trees: {compiled.n_trees}, nodes: {len(compiled.feature)}, max depth: {compiled.max_depth}")
+    print(f"[INFO] Identical on dataset rows: {compiled.verify(forest, X)}")
+    print(f"[INFO] Identical on probe rows: {compiled.verify(forest)}")
+
+    for name, predict in (("sklearn", SklearnPredictor(forest).predict), ("compiled", compiled.predict)):
+        started = time.perf_counter()
+        for i in range(200):
+            predict(X[i:i + 1])
+        single = (time.perf_counter() - started) / 200
+        started = time.perf_counter()
+        predict(X)
+        batch = time.perf_counter() - started
+        print(f"[INFO] {name}: single row {single * 1e6:.0f}us, {len(X)} rows {batch * 1e3:.1f}ms")
@@ -0,0 +1,504 @@
+import importlib
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single serving process, no cross-process locking
+    fcntl = None
+
+from src.configs.load_config import Config
+from src.constants.model_features import MODEL_BUNDLE, MODEL_ESG_OVERALL, MODEL_FILES
+from src.services.artifact_store import artifact_store, is_remote, join_uri
+from src.stores.esg import esg_store
+from src.utils.logger import logger
+from src.utils.metrics import TRAINING_CV_FITS, TRAINING_JOB_SECONDS, TRAINING_JOBS
+
+# Job kind -> (module, trainer function, registry model refreshed on success)
+TRAINERS = {
+    "esg_overall": ("src.controllers.train_controller", "train_model_esg_overall", MODEL_ESG_OVERALL),
+    "esg_overall_update": ("src.controllers.train_controller", "update_model_esg_overall", MODEL_ESG_OVERALL),
+    "market_cap": ("src.controllers.train_controller", "train_model_market_cap", None),
+    "bundle": ("src.controllers.train_controller", "train_model_bundle", MODEL_BUNDLE),
+}
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+# Directory containing the src package; training processes run from here.
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class JobRunner:
+    """
+    Runs training jobs in the background.
+
+    Submitted jobs wait in a queue served by ``max_workers`` threads. Each
+    job runs in its own ``python -m src.services.job_runner`` process
+    limited to ``core_budget`` cores, so training never holds a Flask
+    request thread and never takes every core away from prediction
+    traffic. The process reports CV progress and its result as JSON lines
+    on stdout; its own output goes to stderr.
+
+    The queue is the job table itself: a JSON file that every change
+    rewrites under a file lock. Several processes can therefore share one
+    history: any of them can submit, list, poll or cancel a job, while only
+    those with ``execute`` set claim queued jobs and run them, at most
+    ``max_workers`` at a time across all of them. A process holds a lock on
+    its own owner file while alive; running jobs whose owner's lock is free
+    died with it and are marked failed.
+    """
+
+    def __init__(self, history_path: str, data_path: str, model_dir: str,
+                 max_workers: int = 1, core_budget: int = 1, history_limit: int = 200,
+                 data_cache_dir: str | None = None, execute: bool = True, refresh_models: bool = True,
+                 poll_seconds: float = 1.0):
+        self.history_path = history_path
+        self.data_path = data_path
+        self.data_cache_dir = data_cache_dir
+        self.model_dir = model_dir
+        self.max_workers = max_workers
+        self.core_budget = core_budget
+        self.history_limit = history_limit
+        # Whether this process runs queued jobs or only submits and reads them
+        self.execute = execute
+        # Whether to reload the registry's model when a job replaces it
+        self.refresh_models = refresh_models
+        self.poll_seconds = poll_seconds
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._processes = {}
+        self._wake = threading.Event()
+        self._started = False
+        self._token = None
+        self._owner_file = None
+
+    def submit(self, kind: str, params: dict | None = None) -> dict:
+        """Queue a training job and return its record."""
+        if kind not in TRAINERS:
+            raise ValueError(f"Unknown job kind: {kind}. Allowed: {list(TRAINERS)}")
+        self._ensure_started()
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "status": QUEUED,
+            "params": params or {},
+            "owner": None,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "progress": {"fits_done": 0, "fits_total": None},
+            "metrics": None,
+            "result": None,
+            "error": None,
+        }
+        with self._transaction():
+            self._jobs[job["id"]] = job
+            snapshot = dict(job)
+        self._wake.set()
+        logger.info(f"Queued {kind} training job {job['id']}")
+        return snapshot
+
+    def get(self, job_id: str) -> dict | None:
+        self._ensure_started()
+        with self._transaction(write=False):
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def list(self) -> list[dict]:
+        self._ensure_started()
+        with self._transaction(write=False):
+            return [dict(job) for job in reversed(self._jobs.values())]
+
+    def cancel(self, job_id: str) -> dict | None:
+        """Cancel a queued or running job. Finished jobs are returned unchanged."""
+        self._ensure_started()
+        with self._transaction():
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            cancelled = job["status"] in (QUEUED, RUNNING)
+            if cancelled:
+                was_running = job["status"] == RUNNING
+                job["status"] = CANCELLED
+                job["finished_at"] = time.time()
+                _record_finished(job)
+                process = self._processes.get(job_id)
+                if process is not None:
+                    if process.poll() is None:
+                        process.terminate()
+                elif was_running and job.get("pid"):
+                    # Started by another process; its runner thread sees the
+                    # training process exit and leaves the status alone.
+                    _terminate(job["pid"])
+            snapshot = dict(job)
+        if cancelled:
+            _persist_training_run(snapshot)
+        return snapshot
+
+    def _ensure_started(self) -> None:
+        # Threads and the owner lock are set up lazily so importing this
+        # module (e.g. in a pre-fork parent) has no side effects.
+        if self._started:
+            return
+        with self._lock:
+            if self._started:
+                return
+            if self.execute:
+                self._token = uuid.uuid4().hex
+                self._owner_file = _hold_owner_lock(self._owner_path(self._token))
+                for i in range(self.max_workers):
+                    threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True).start()
+            self._started = True
+
+    def run_forever(self) -> None:
+        """Run queued jobs in this process until it is stopped."""
+        self.execute = True
+        self._ensure_started()
+        try:
+            while True:
+                time.sleep(3600)
+        finally:
+            with self._lock:
+                processes = list(self._processes.values())
+            for process in processes:
+                if process.poll() is None:
+                    process.terminate()
+
+    def _work(self) -> None:
+        while True:
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+            try:
+                claimed = self._claim()
+            except Exception as e:
+                logger.error(f"Could not read the training job queue: {e}")
+                continue
+            if claimed is None:
+                continue
+            job_id, process = claimed
+            # Another job may be waiting for the next free slot.
+            self._wake.set()
+            try:
+                job = self._run(job_id, process)
+            except Exception as e:
+                logger.error(f"Training job {job_id} crashed: {e}")
+                self._finish(job_id, FAILED, error=str(e))
+                continue
+            if job is not None and self.refresh_models:
+                self._refresh_model(job)
+
+    def _claim(self):
+        """Start the oldest queued job if a slot is free and return (job id, process)."""
+        with self._transaction():
+            jobs = self._jobs.values()
+            if sum(job["status"] == RUNNING for job in jobs) >= self.max_workers:
+                return None
+            job = next((job for job in jobs if job["status"] == QUEUED), None)
+            if job is None:
+                return None
+            process = subprocess.Popen(
+                self._command(job), cwd=PROJECT_ROOT, env=_limited_env(self.core_budget),
+                stdout=subprocess.PIPE, text=True,
+            )
+            job["status"] = RUNNING
+            job["owner"] = self._token
+            job["started_at"] = time.time()
+            job["pid"] = process.pid
+            self._processes[job["id"]] = process
+            return job["id"], process
+
+    def _run(self, job_id: str, process: subprocess.Popen) -> dict | None:
+        kind = self._jobs[job_id]["kind"]
+
+        outcome = None
+        cv_fits = TRAINING_CV_FITS.labels(kind)
+        fits_done = 0
+        try:
+            for line in process.stdout:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    event = None
+                if not isinstance(event, dict) or "event" not in event:
+                    # e.g. a native library writing to stdout before the
+                    # training process redirected it
+                    logger.warning(f"Training job {job_id} wrote a line that is not an event: {line.strip()[:200]}")
+                    continue
+                if event["event"] == "progress":
+                    cv_fits.inc(max(0, event["done"] - fits_done))
+                    fits_done = event["done"]
+                    self._update(job_id, progress={"fits_done": event["done"], "fits_total": event["total"]})
+                elif event["event"] == "result":
+                    outcome = (SUCCEEDED, {"result": event["result"], "metrics": event["result"].get("metrics")})
+                else:
+                    outcome = (FAILED, {"error": event.get("error")})
+        finally:
+            process.wait()
+            with self._lock:
+                self._processes.pop(job_id, None)
+        if outcome is None:
+            outcome = (FAILED, {"error": f"Training process exited with code {process.returncode}"})
+        return self._finish(job_id, outcome[0], **outcome[1])
+
+    def _command(self, job: dict):
+        return [
+            sys.executable, "-m", "src.services.job_runner",
+            json.dumps({
+                "kind": job["kind"],
+                "trainer": TRAINERS[job["kind"]][:2],
+                "params": job["params"],
+                "data_path": os.path.abspath(self.data_path),
+                "data_cache_dir": os.path.abspath(self.data_cache_dir) if self.data_cache_dir else None,
+                "model_dir": self.model_dir if is_remote(self.model_dir) else os.path.abspath(self.model_dir),
+                "n_jobs": self.core_budget,
+            }),
+        ]
+
+    def _refresh_model(self, job: dict) -> None:
+        model_name = TRAINERS[job["kind"]][2]
+        if job["status"] == SUCCEEDED and model_name is not None:
+            from src.services.model_registry import model_registry
+            model_registry.refresh(model_name)
+
+    def _update(self, job_id: str, **fields) -> None:
+        with self._transaction():
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] != RUNNING:
+                return
+            job.update(fields)
+
+    def _finish(self, job_id: str, status: str, **fields) -> dict | None:
+        with self._transaction():
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] == CANCELLED:
+                return None
+            job.update(fields)
+            job["status"] = status
+            job["finished_at"] = time.time()
+            if job["started_at"] is not None:
+                job["duration_seconds"] = round(job["finished_at"] - job["started_at"], 3)
+            _record_finished(job)
+            snapshot = dict(job)
+        logger.info(f"Training job {job_id} {status}")
+        _persist_training_run(snapshot)
+        return snapshot
+
+    @contextmanager
+    def _transaction(self, write: bool = True):
+        """
+        Reload the job table under the thread and file locks, let the
+        caller read or change it, and write it back. Read-only
+        transactions only write when jobs of dead owners were marked failed.
+        """
+        with self._lock, _file_lock(f"{self.history_path}.lock"):
+            changed = self._reload()
+            yield
+            if write or changed:
+                self._persist()
+
+    def _reload(self) -> bool:
+        """Load the job table from disk and fail the running jobs of dead owners."""
+        jobs = []
+        if os.path.exists(self.history_path):
+            with open(self.history_path) as f:
+                jobs = json.load(f)
+        self._jobs = {job["id"]: job for job in jobs}
+
+        changed = False
+        alive = {}
+        for job in self._jobs.values():
+            if job["status"] != RUNNING:
+                continue
+            owner = job.get("owner")
+            if owner not in alive:
+                alive[owner] = self._owner_alive(owner)
+            if not alive[owner]:
+                # Its process died with the serving process that ran it.
+                job["status"] = FAILED
+                job["error"] = "Interrupted by service restart"
+                job["finished_at"] = job["finished_at"] or time.time()
+                changed = True
+        return changed
+
+    def _persist(self) -> None:
+        """Write the job table to disk. Must be called inside a transaction."""
+        finished = [job_id for job_id, job in self._jobs.items() if job["status"] in FINISHED]
+        for job_id in finished[:max(0, len(self._jobs) - self.history_limit)]:
+            del self._jobs[job_id]
+
+        os.makedirs(os.path.dirname(self.history_path) or ".", exist_ok=True)
+        tmp_path = f"{self.history_path}.tmp-{os.getpid()}"
+        with open(tmp_path, "w") as f:
+            json.dump(list(self._jobs.values()), f, default=str)
+        os.replace(tmp_path, self.history_path)
+
+    def _owner_path(self, token: str) -> str:
+        return os.path.join(f"{self.history_path}.owners", f"{token}.lock")
+
+    def _owner_alive(self, token: str | None) -> bool:
+        if token is None or token == self._token:
+            return token is not None
+        path = self._owner_path(token)
+        if fcntl is None or not os.path.exists(path):
+            return False
+        with open(path, "a") as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return True
+        os.remove(path)
+        return False
+
+
+def run_training(kind: str, params: dict, data_path: str, model_dir: str, n_jobs: int, emit,
+                 data_cache_dir: str | None = None, trainer: tuple[str, str] | None = None) -> None:
+    """
+    Load the data, run a trainer and report progress and the result through ``emit(dict)``.
+
+    With an s3:// ``model_dir`` the trainer works in a local staging
+    directory holding the current models, and what it writes is uploaded
+    when it succeeds. ``trainer`` is the (module, function) to run; it
+    defaults to the one ``TRAINERS`` registers for ``kind``.
+    """
+    from threadpoolctl import threadpool_limits
+
+    from src.services.dataset_cache import load_dataset
+
+    module_name, function_name = trainer or TRAINERS[kind][:2]
+    trainer = getattr(importlib.import_module(module_name), function_name)
+
+    def progress(done: int, total: int) -> None:
+        emit({"event": "progress", "done": done, "total": total})
+
+    try:
+        with threadpool_limits(limits=n_jobs):
+            df = load_dataset(data_path, data_cache_dir)
+            if is_remote(model_dir):
+                with artifact_store.staging_dir(model_dir, _model_file_names()) as staging:
+                    result = trainer(df, model_dir=staging, n_jobs=n_jobs, progress=progress, **params)
+                result = _staged_to_remote(result, staging, model_dir)
+            else:
+                result = trainer(df, model_dir=model_dir, n_jobs=n_jobs, progress=progress, **params)
+        emit({"event": "result", "result": result})
+    except Exception as e:
+        emit({"event": "error", "error": f"{type(e).__name__}: {e}"})
+
+
+def _model_file_names() -> list[str]:
+    """The model files trainers read back (updates) and their preprocessing."""
+    from src.services.preprocessing import preprocessor_path
+
+    return [name for file in MODEL_FILES.values() for name in (file, preprocessor_path(file))]
+
+
+def _staged_to_remote(value, staging: str, uri: str):
+    """Replace the staging paths in a trainer result by the URIs the files were uploaded to."""
+    if isinstance(value, dict):
+        return {key: _staged_to_remote(item, staging, uri) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_staged_to_remote(item, staging, uri) for item in value]
+    if isinstance(value, str) and value.startswith(staging + os.sep):
+        return join_uri(uri, os.path.relpath(value, staging))
+    return value
+
+
+def _record_finished(job: dict) -> None:
+    TRAINING_JOBS.labels(job["kind"], job["status"]).inc()
+    if job["started_at"] is not None:
+        TRAINING_JOB_SECONDS.labels(job["kind"], job["status"]).observe(job["finished_at"] - job["started_at"])
+
+
+def _persist_training_run(job: dict) -> None:
+    if not esg_store.enabled:
+        return
+    model_path = (job.get("result") or {}).get("model_path")
+    model_version = None
+    if job["status"] == SUCCEEDED and model_path and is_remote(model_path):
+        model_version = (artifact_store.head(model_path)["sha256"] or "")[:12] or None
+    elif job["status"] == SUCCEEDED and model_path and os.path.exists(model_path):
+        from src.services.model_registry import file_sha256
+        model_version = file_sha256(model_path)[:12]
+    esg_store.record_training_run(job, TRAINERS[job["kind"]][2], model_version)
+
+
+@contextmanager
+def _file_lock(path: str):
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _hold_owner_lock(path: str):
+    """Create and lock the owner file of this process; the lock is released when it exits."""
+    if fcntl is None:
+        return None
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    f = open(path, "a")
+    fcntl.flock(f, fcntl.LOCK_EX)
+    return f
+
+
+def _terminate(pid: int) -> None:
+    try:
+        os.kill(pid, signal.SIGTERM)
+    except ProcessLookupError:
+        pass
+
+
+def _limited_env(n_jobs: int) -> dict:
+    env = dict(os.environ)
+    for name in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "LOKY_MAX_CPU_COUNT"):
+        env[name] = str(n_jobs)
+    return env
+
+
+def _json_default(value):
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+config = Config()
+job_runner = JobRunner(
+    history_path=config.job.history_path,
+    data_path=config.data.path,
+    model_dir=config.model.dir,
+    max_workers=config.job.max_workers,
+    core_budget=config.job.core_budget,
+    history_limit=config.job.history_limit,
+    data_cache_dir=config.data.cache_dir,
+)
+
+
+if __name__ == "__main__":
+    # Training process started by JobRunner: events go to the original
+    # stdout, everything the trainer prints goes to stderr.
+    events = os.fdopen(os.dup(sys.stdout.fileno()), "w")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    def emit(event: dict) -> None:
+        events.write(json.dumps(event, default=_json_default) + "\n")
+        events.flush()
+
+    args = json.loads(sys.argv[1])
+    run_training(args["kind"], args["params"], args["data_path"], args["model_dir"], args["n_jobs"], emit,
+                 data_cache_dir=args.get("data_cache_dir"), trainer=args.get("trainer"))
@@ -0,0 +1,122 @@
+import concurrent.futures
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from src.configs.load_config import Config
+from src.constants.model_features import MODEL_BUNDLE, MODEL_ESG_OVERALL
+from src.utils.metrics import MICRO_BATCH_ROWS, MICRO_BATCH_WAIT_SECONDS
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-row predictions into one vectorized call.
+
+    Callers pass an encoded row and the predictor of the model version they
+    resolved. One dispatcher thread takes the oldest waiting row plus the
+    rows queued behind it, up to ``max_rows``, and runs a single
+    ``predict`` per model version in the batch. When the previous batch
+    held more than one row (the service is under concurrent load) it also
+    waits up to ``window_seconds`` for more rows; a lone request is
+    dispatched right away. Callers wait at most ``timeout_seconds``; rows
+    whose caller gave up are skipped.
+    """
+
+    def __init__(self, name: str, window_seconds: float = 0.002, max_rows: int = 64,
+                 timeout_seconds: float = 1.0):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.max_rows = max_rows
+        self.timeout_seconds = timeout_seconds
+        self._lock = threading.Lock()
+        self._queue = queue.SimpleQueue()
+        self._pid = None
+        self._batch_rows = MICRO_BATCH_ROWS.labels(name)
+        self._wait_seconds = MICRO_BATCH_WAIT_SECONDS.labels(name)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_rows > 1
+
+    def predict(self, predictor, X: np.ndarray) -> float | list:
+        """
+        Predict one encoded row (shape (1, n_features)) with ``predictor``:
+        a float, or a list of floats for a multi-output predictor.
+
+        Raises:
+            TimeoutError: If no result arrived within ``timeout_seconds``.
+        """
+        if not self.enabled:
+            return predictor.predict(X)[0].tolist()
+        self._ensure_started()
+        future = concurrent.futures.Future()
+        self._queue.put((predictor, X, future, time.perf_counter()))
+        try:
+            return future.result(self.timeout_seconds)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise TimeoutError(f"No prediction within {self.timeout_seconds}s, the service is overloaded")
+
+    def _ensure_started(self) -> None:
+        # Started lazily, and again in a forked child: threads do not survive fork.
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.SimpleQueue()
+            threading.Thread(target=self._run, name=f"micro-batcher-{self.name}", daemon=True).start()
+            self._pid = os.getpid()
+
+    def _run(self) -> None:
+        pending = self._queue
+        last_rows = 1
+        while True:
+            batch = [pending.get()]
+            deadline = time.perf_counter() + self.window_seconds if last_rows > 1 else 0.0
+            while len(batch) < self.max_rows:
+                remaining = deadline - time.perf_counter()
+                try:
+                    batch.append(pending.get(timeout=remaining) if remaining > 0 else pending.get_nowait())
+                except queue.Empty:
+                    break
+            last_rows = len(batch)
+            self._dispatch(batch)
+
+    def _dispatch(self, batch: list) -> None:
+        started = time.perf_counter()
+        groups = {}
+        for predictor, X, future, queued_at in batch:
+            if not future.set_running_or_notify_cancel():
+                continue
+            self._wait_seconds.observe(started - queued_at)
+            groups.setdefault(id(predictor), (predictor, []))[1].append((X, future))
+
+        for predictor, items in groups.values():
+            self._batch_rows.observe(len(items))
+            try:
+                predictions = predictor.predict(np.vstack([X for X, _ in items]))
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+            for (_, future), prediction in zip(items, predictions):
+                future.set_result(prediction.tolist())
+
+
+config = Config()
+micro_batcher = MicroBatcher(
+    MODEL_ESG_OVERALL,
+    window_seconds=config.micro_batch.window_ms / 1e3,
+    max_rows=config.micro_batch.max_rows,
+    timeout_seconds=config.micro_batch.timeout_seconds,
+)
+bundle_micro_batcher = MicroBatcher(
+    MODEL_BUNDLE,
+    window_seconds=config.micro_batch.window_ms / 1e3,
+    max_rows=config.micro_batch.max_rows,
+    timeout_seconds=config.micro_batch.timeout_seconds,
+)
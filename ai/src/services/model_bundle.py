@@ -0,0 +1,120 @@
+import numpy as np
+
+from src.constants.model_features import SEARCH_RANDOM
+
+
+class ModelBundle:
+    """
+    Several fitted regressors saved and served as one model.
+
+    ``predict(X)`` returns one column per name in ``targets``. Each member
+    is an ``(estimator, outputs, columns)`` triple: the estimator predicts
+    the targets at positions ``outputs`` (several for a multi-output
+    forest) from the encoded input columns at positions ``columns``.
+
+    Attributes:
+        targets (list): Output names, in column order.
+        features (list): Encoded input features, in column order.
+        members (list): The (estimator, outputs, columns) triples.
+        training_info_ (dict): Metrics and parameters of the training run.
+    """
+
+    def __init__(self, targets: list, features: list, members: list, training_info: dict | None = None):
+        self.targets = list(targets)
+        self.features = list(features)
+        self.members = [(estimator, list(outputs), list(columns)) for estimator, outputs, columns in members]
+        self.n_features_in_ = len(self.features)
+        self.training_info_ = training_info or {}
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        X = np.asarray(X)
+        out = np.empty((len(X), len(self.targets)))
+        for estimator, outputs, columns in self.members:
+            out[:, outputs] = estimator.predict(X[:, columns]).reshape(len(X), len(outputs))
+        return out
+
+
+def search_targets(X: np.ndarray, Y: np.ndarray, train_index: np.ndarray, test_index: np.ndarray,
+                   specs: list, folds: list, n_jobs: int = -1, progress=None,
+                   search_mode: str = SEARCH_RANDOM, budget: dict | None = None,
+                   trials=None, warm_start: int = 0) -> list[dict]:
+    """
+    Run the hyperparameter search of several targets in parallel processes.
+
+    Every search sees the same training rows and the same CV ``folds``
+    (index pairs into ``train_index``). Cores are split between the
+    targets, and ``progress(fits_done, fits_total)`` is reported as each
+    target finishes.
+
+    Args:
+        X: encoded features of every row.
+        Y: one column per target.
+        specs: one dict per target with "target" (its name), "output"
+            (column of Y), "columns" (columns of X), "estimator", "params"
+            and "n_iter".
+        trials, warm_start: optional TrialStore of the candidates already
+            scored, and earlier best candidates to try first (see make_search).
+
+    Returns:
+        One dict per spec, in order, with best_params, cv_score, search
+        stats and the holdout predictions of the best estimator.
+    """
+    # Training dependencies are imported here: serving processes load
+    # bundles through this module and never train.
+    from joblib import Parallel, delayed, effective_n_jobs
+
+    from src.services.search import make_search, planned_fits
+
+    n_jobs = effective_n_jobs(n_jobs)
+    n_parallel = max(1, min(len(specs), n_jobs))
+    searches = [
+        make_search(spec["estimator"], spec["params"], mode=search_mode, budget=budget,
+                    n_iter=spec["n_iter"], cv=folds, scoring="r2", random_state=42, verbose=1,
+                    n_jobs=max(1, n_jobs // n_parallel), trials=trials, target=spec["target"],
+                    warm_start=warm_start)
+        for spec in specs
+    ]
+    total = sum(planned_fits(search) for search in searches)
+    done = 0
+    if progress is not None:
+        progress(done, total)
+
+    results = [None] * len(specs)
+    jobs = (delayed(_search_target)(i, search, X[:, spec["columns"]], Y[:, spec["output"]], train_index, test_index)
+            for i, (spec, search) in enumerate(zip(specs, searches)))
+    for i, result in Parallel(n_jobs=n_parallel, return_as="generator_unordered")(jobs):
+        results[i] = result
+        done += result["search"]["fits"]
+        if progress is not None:
+            progress(done, max(total, done))
+    return results
+
+
+def fit_members(X: np.ndarray, Y: np.ndarray, members: list, n_jobs: int = -1) -> list:
+    """Fit ``(estimator, outputs, columns)`` members on every row, in parallel processes."""
+    from joblib import Parallel, delayed, effective_n_jobs
+
+    n_jobs = effective_n_jobs(n_jobs)
+    n_parallel = max(1, min(len(members), n_jobs))
+    fitted = Parallel(n_jobs=n_parallel)(
+        delayed(_fit_member)(estimator, X[:, columns], Y[:, outputs])
+        for estimator, outputs, columns in members)
+    return [(estimator, outputs, columns) for estimator, (_, outputs, columns) in zip(fitted, members)]
+
+
+def _search_target(i: int, search, X: np.ndarray, y: np.ndarray, train_index: np.ndarray,
+                   test_index: np.ndarray) -> tuple[int, dict]:
+    search.fit(X[train_index], y[train_index])
+    return i, {
+        "best_params": search.best_params_,
+        "cv_score": float(search.best_score_),
+        "search": search.search_stats_,
+        "y_pred": search.best_estimator_.predict(X[test_index]),
+    }
+
+
+def _fit_member(estimator, X: np.ndarray, y: np.ndarray):
+    from sklearn.base import clone
+
+    estimator = clone(estimator)
+    return estimator.fit(X, y[:, 0] if y.shape[1] == 1 else y)
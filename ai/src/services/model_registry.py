@@ -0,0 +1,286 @@
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import joblib
+
+from src.configs.load_config import Config
+from src.constants.model_features import MODEL_FILES, SLIM_MODEL_FILES
+from src.services.artifact_store import artifact_store, is_remote, join_uri
+from src.services.forest_engine import CompiledForest, compile_explainer, compile_predictor
+from src.services.preprocessing import load_preprocessor, preprocessor_path
+from src.utils.logger import logger
+from src.utils.metrics import MODEL_LOAD_SECONDS, MODEL_LOADS
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    """Return the hex SHA-256 digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def save_model(model, path: str, preprocessor=None) -> str:
+    """
+    Atomically write a model with joblib.
+
+    The model is dumped to a temporary file in the same directory and then
+    renamed over ``path``, so a registry polling the file never sees a
+    partially written artifact. The preprocessing fitted with the model is
+    written next to it first, so it is in place when the model changes.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if preprocessor is not None:
+        preprocessor.save(preprocessor_path(path))
+    tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    try:
+        joblib.dump(model, tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+
+class LoadedModel:
+    """
+    An immutable snapshot of a model held in memory.
+
+    Attributes:
+        name (str): Registry name of the model.
+        path (str): File (or s3:// URI) the model was loaded from.
+        model: The deserialized estimator.
+        predictor: Object whose ``predict(X)`` serves the model (sklearn or
+            the compiled forest engine).
+        preprocessor: The Preprocessor turning records into model input.
+        version (str): Short content hash identifying this artifact.
+        sha256 (str): Full content hash of the artifact.
+        signature (tuple): (mtime_ns, size) of the file when it was loaded,
+            plus the ETag for an object store artifact.
+        loaded_at (float): Unix time the model was loaded.
+        load_seconds (float): Time spent hashing and deserializing the file.
+        explainer: CompiledForest explaining the model's predictions, built
+            on first use (see ``compile_explainer``).
+    """
+
+    def __init__(self, name, path, model, predictor, preprocessor, sha256, signature, loaded_at, load_seconds):
+        self.name = name
+        self.path = path
+        self.model = model
+        self.predictor = predictor
+        self.preprocessor = preprocessor
+        self.sha256 = sha256
+        self.version = sha256[:12]
+        self.signature = signature
+        self.loaded_at = loaded_at
+        self.load_seconds = load_seconds
+        self._explainer = None
+
+    @property
+    def explainer(self):
+        # Built by the first /explain request; a concurrent one at worst builds it twice.
+        if self._explainer is None:
+            self._explainer = compile_explainer(self.model, self.predictor)
+        return self._explainer
+
+    def describe(self) -> dict:
+        mtime_ns, size = self.signature[:2]
+        return {
+            "name": self.name,
+            "status": "loaded",
+            "path": self.path,
+            "version": self.version,
+            "sha256": self.sha256,
+            "size_bytes": size,
+            "modified_at": _isoformat(mtime_ns / 1e9),
+            "loaded_at": _isoformat(self.loaded_at),
+            "load_seconds": round(self.load_seconds, 4),
+            "model_type": type(self.model).__name__,
+            "engine": self.predictor.engine,
+            "features": self.preprocessor.features,
+            "preprocessing": self.preprocessor.fingerprint,
+        }
+
+
+class ModelRegistry:
+    """
+    Loads each registered model once per process and hot-reloads it when
+    the file on disk changes.
+
+    Requests only pay a ``stat()`` of the model file, at most once per
+    ``check_interval`` seconds. When the file's mtime or size changes, a
+    single thread reloads it while the others keep serving the previous
+    version; the new version then replaces the old one in one reference
+    assignment.
+
+    ``model_dir`` may also be an s3:// URI. Models are then checked with a
+    HEAD request every ``remote_check_interval`` seconds and loaded from
+    the local cache of the artifact store, so only a changed model is
+    downloaded.
+    """
+
+    def __init__(self, model_dir: str, check_interval: float = 1.0,
+                 engine: str = "sklearn", engine_max_rows: int | None = None,
+                 remote_check_interval: float = 30.0):
+        self.model_dir = model_dir
+        self.check_interval = check_interval
+        self.remote_check_interval = remote_check_interval
+        self.engine = engine
+        self.engine_max_rows = engine_max_rows
+        self._files = {}
+        self._locks = {}
+        self._entries = {}
+        self._checked_at = {}
+
+    def register(self, name: str, filename: str) -> None:
+        """Register a model file (relative to ``model_dir``) under a name."""
+        self._files[name] = filename
+        self._locks[name] = threading.Lock()
+
+    @property
+    def interval(self) -> float:
+        """Seconds between checks of a model for a new version."""
+        return self.remote_check_interval if is_remote(self.model_dir) else self.check_interval
+
+    def path(self, name: str) -> str:
+        """Return the on-disk path (or s3:// URI) of a registered model."""
+        if name not in self._files:
+            raise KeyError(f"Unknown model: {name}")
+        return join_uri(self.model_dir, self._files[name])
+
+    def signature(self, name: str) -> tuple:
+        """
+        Return what identifies the current version of a model file.
+
+        Raises:
+            FileNotFoundError: If the model has never been trained.
+        """
+        return _version(self.path(name))[0]
+
+    def get(self, name: str) -> LoadedModel:
+        """
+        Return the current version of a model, loading it if needed.
+
+        Raises:
+            KeyError: If the model name is not registered.
+            FileNotFoundError: If the model has never been trained.
+        """
+        entry = self._entries.get(name)
+        if entry is not None and time.monotonic() - self._checked_at[name] < self.interval:
+            return entry
+        if entry is not None and is_remote(self.model_dir):
+            # One request pays for the HEAD; the others keep the loaded version meanwhile.
+            self._checked_at[name] = time.monotonic()
+        return self._check(name, entry)
+
+    def refresh(self, name: str) -> LoadedModel:
+        """Check the model file right away, reloading it if it changed."""
+        return self._check(name, self._entries.get(name))
+
+    def describe(self) -> list[dict]:
+        """Describe every registered model and the version currently loaded."""
+        models = []
+        for name in self._files:
+            entry = self._entries.get(name)
+            if entry is not None:
+                models.append(entry.describe())
+            else:
+                models.append({"name": name, "status": "not_loaded", "path": self.path(name)})
+        return models
+
+    def _check(self, name: str, entry: LoadedModel | None) -> LoadedModel:
+        path = self.path(name)
+        try:
+            signature, version = _version(path)
+        except FileNotFoundError:
+            if entry is not None:
+                # Keep serving what we have rather than failing every request.
+                self._checked_at[name] = time.monotonic()
+                return entry
+            raise FileNotFoundError(f"Model not found at {path}. Train it first.")
+        except Exception as e:
+            if entry is None or not is_remote(path):
+                raise
+            logger.warning(f"Could not check {path} for a new version: {e}")
+            self._checked_at[name] = time.monotonic()
+            return entry
+
+        if entry is not None and entry.signature == signature:
+            self._checked_at[name] = time.monotonic()
+            return entry
+
+        lock = self._locks[name]
+        if entry is not None:
+            # Another thread is already loading the new version: keep
+            # answering with the current one instead of piling up reloads.
+            if not lock.acquire(blocking=False):
+                return entry
+        else:
+            lock.acquire()
+        try:
+            current = self._entries.get(name)
+            if current is not None and current is not entry and current.signature == signature:
+                return current
+            loaded = self._load(name, path, signature, version)
+            self._entries[name] = loaded
+            self._checked_at[name] = time.monotonic()
+            return loaded
+        finally:
+            lock.release()
+
+    def _load(self, name: str, path: str, signature: tuple, version: dict | None = None) -> LoadedModel:
+        started = time.perf_counter()
+        local_path = artifact_store.fetch(path, version) if version is not None else path
+        sha256 = file_sha256(local_path)
+        preprocessor = load_preprocessor(path)
+        if path.endswith(".npz"):
+            # A slimmed forest is already compiled and served without sklearn.
+            model = CompiledForest.load(local_path)
+        else:
+            model = joblib.load(local_path)
+        n_features = getattr(model, "n_features_in_", len(preprocessor.features))
+        if n_features != len(preprocessor.features):
+            raise ValueError(f"Model {name} expects {n_features} features, "
+                             f"its preprocessing produces {len(preprocessor.features)}")
+        if isinstance(model, CompiledForest):
+            predictor = model
+        else:
+            predictor = compile_predictor(model, self.engine, max_rows=self.engine_max_rows)
+        load_seconds = time.perf_counter() - started
+        MODEL_LOAD_SECONDS.labels(name).observe(load_seconds)
+        MODEL_LOADS.labels(name).inc()
+        loaded = LoadedModel(name, path, model, predictor, preprocessor, sha256, signature,
+                             time.time(), load_seconds)
+        logger.info(f"Loaded model {name} version {loaded.version} ({predictor.engine}) in {load_seconds:.3f}s")
+        return loaded
+
+
+def _version(path: str) -> tuple[tuple, dict | None]:
+    """(signature, object version) of a model file; the version is None for a local file."""
+    if is_remote(path):
+        version = artifact_store.head(path)
+        return (version["modified_ns"], version["size"], version["etag"]), version
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size), None
+
+
+def _isoformat(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
+
+
+config = Config()
+model_registry = ModelRegistry(
+    config.model.dir,
+    config.model.check_interval,
+    engine=config.model.engine,
+    engine_max_rows=config.model.engine_max_rows,
+    remote_check_interval=config.model.remote_check_interval,
+)
+for _name, _filename in MODEL_FILES.items():
+    if config.model.artifact == "slim":
+        _filename = SLIM_MODEL_FILES.get(_name, _filename)
+    model_registry.register(_name, _filename)
@@ -0,0 +1,199 @@
+import os
+import time
+
+import joblib
+import numpy as np
+from sklearn.metrics import r2_score
+from sklearn.model_selection import train_test_split
+
+from src.services.forest_engine import CompiledForest, SklearnPredictor
+from src.services.model_registry import file_sha256
+from src.services.preprocessing import load_preprocessor, preprocessor_path
+
+# model.joblib -> model.slim.npz
+SLIM_SUFFIX = ".slim.npz"
+
+
+def slim_path(model_path: str) -> str:
+    """Return where the slimmed artifact of a model is written."""
+    return os.path.splitext(model_path)[0] + SLIM_SUFFIX
+
+
+def slim_forest(forest: CompiledForest, X: np.ndarray, y: np.ndarray, max_r2_drop: float = 0.0,
+                drop_trees: bool = True, prune_depth: bool = True) -> tuple[CompiledForest, dict]:
+    """
+    Shrink a compiled forest while its r2 on (X, y) stays within
+    ``max_r2_drop`` of the full forest.
+
+    The fewest leading trees that meet the floor are kept, then the
+    smallest depth (binary search, falling back to the full depth if the
+    result misses the floor). The result is stored in compact dtypes.
+
+    Returns:
+        The slimmed forest and a summary of what was kept. Its ``cut``
+        holds the ``truncated`` arguments (None where nothing was cut), so
+        the same cut can be applied to another forest. Its ``selection_*``
+        scores are on the (X, y) the cut was chosen on, so they are
+        optimistic; measure the slimmed forest on other rows.
+    """
+    X = np.asarray(X, dtype=np.float32)
+    tree_sums = np.cumsum(forest.value[forest.leaves(X)], axis=0)
+    baseline = r2_score(y, tree_sums[-1] / forest.n_trees)
+    floor = baseline - max_r2_drop
+
+    n_trees = forest.n_trees
+    if drop_trees:
+        n_trees = next(k for k in range(1, forest.n_trees + 1) if r2_score(y, tree_sums[k - 1] / k) >= floor)
+    kept = forest.truncated(n_trees)
+
+    max_depth = None
+    if prune_depth:
+        low, high = 1, kept.max_depth
+        while low < high:
+            depth = (low + high) // 2
+            if r2_score(y, kept.truncated(max_depth=depth).predict(X)) >= floor:
+                high = depth
+            else:
+                low = depth + 1
+        max_depth = low if low < kept.max_depth else None
+    slim = kept.truncated(max_depth=max_depth).compacted()
+    r2 = r2_score(y, slim.predict(X))
+    if r2 < floor:
+        slim = kept.compacted()
+        max_depth = None
+        r2 = r2_score(y, slim.predict(X))
+
+    return slim, {
+        "max_r2_drop": max_r2_drop,
+        "selection_baseline_r2": float(baseline),
+        "selection_r2": float(r2),
+        "cut": {"n_trees": n_trees if n_trees < forest.n_trees else None, "max_depth": max_depth},
+        **_shape(forest, slim),
+    }
+
+
+def slim_model(model_path: str, X: np.ndarray, y: np.ndarray, max_r2_drop: float = 0.005,
+               drop_trees: bool = True, prune_depth: bool = True, n_latency_rows: int = 200,
+               test_size: float = 0.5, reference=None) -> dict:
+    """
+    Write the slimmed artifact of a saved forest next to it and compare both.
+
+    The holdout rows (X, y) are split in two: the cut is chosen with
+    ``slim_forest`` on the selection rows, and r2 before and after the cut
+    is reported on the other ``test_size`` of the rows. Both must be rows
+    the judged forest never saw. A model refit on every row, holdout
+    included, has seen them, so pass as ``reference`` the same estimator
+    fitted without them (e.g. the search's best estimator, fitted on the
+    training split): the cut is chosen and scored on the reference, then
+    applied to the saved forest. The slimmed forest is saved as a
+    compressed ``.npz`` (float32 thresholds, int32 node indices) with a
+    copy of its preprocessing, servable with MODEL_ARTIFACT=slim.
+
+    Returns:
+        dict with the artifact path, what was kept, ``test_r2`` (of the
+        reference when given, else of the saved forest) before and after
+        the cut, and for the original and slimmed model: file size, memory
+        of the node arrays, load time and single-row and batch predict
+        latency.
+
+    Raises:
+        ValueError: If there are too few rows to both select and test.
+    """
+    X = np.asarray(X, dtype=np.float32)
+    y = np.asarray(y)
+    if len(X) < 4:
+        raise ValueError(f"Need at least 4 holdout rows to slim a model, got {len(X)}")
+    x_select, x_test, y_select, y_test = train_test_split(X, y, test_size=test_size, random_state=42)
+    started = time.perf_counter()
+    model = joblib.load(model_path)
+    original = {"load_seconds": time.perf_counter() - started, "size_bytes": os.path.getsize(model_path),
+                "memory_bytes": _tree_bytes(model)}
+
+    compiled = CompiledForest.from_sklearn(model)
+    judged = compiled if reference is None else CompiledForest.from_sklearn(reference)
+    judged_slim, info = slim_forest(judged, x_select, y_select, max_r2_drop, drop_trees, prune_depth)
+    slim = judged_slim if reference is None else compiled.truncated(**info["cut"]).compacted()
+    info.update({**_shape(compiled, slim), "selection_rows": len(x_select), "test_rows": len(x_test)})
+    test_r2 = {
+        "model": "saved" if reference is None else "reference",
+        "original": float(r2_score(y_test, judged.predict(x_test))),
+        "slim": float(r2_score(y_test, judged_slim.predict(x_test))),
+    }
+    path = slim.save(slim_path(model_path), {"source_sha256": file_sha256(model_path), **info, "test_r2": test_r2})
+    load_preprocessor(model_path).save(preprocessor_path(path))
+
+    started = time.perf_counter()
+    slim = CompiledForest.load(path)
+    slimmed = {"load_seconds": time.perf_counter() - started, "size_bytes": os.path.getsize(path),
+               "memory_bytes": slim.n_bytes}
+
+    rows = X[:n_latency_rows]
+    for report, predictor in ((original, SklearnPredictor(model)), (slimmed, slim)):
+        report.update(_latency(predictor, rows))
+    return {"path": path, **info, "test_r2": test_r2, "original": original, "slim": slimmed}
+
+
+def _shape(forest: CompiledForest, slim: CompiledForest) -> dict:
+    return {
+        "n_trees": [forest.n_trees, slim.n_trees],
+        "max_depth": [forest.max_depth, slim.max_depth],
+        "nodes": [len(forest.feature), len(slim.feature)],
+    }
+
+
+def _latency(predictor, X: np.ndarray) -> dict:
+    timings = []
+    for i in range(len(X)):
+        started = time.perf_counter()
+        predictor.predict(X[i:i + 1])
+        timings.append(time.perf_counter() - started)
+    started = time.perf_counter()
+    predictor.predict(X)
+    return {
+        "predict_one_p50_ms": float(np.percentile(timings, 50) * 1e3),
+        "predict_one_p99_ms": float(np.percentile(timings, 99) * 1e3),
+        "predict_batch_ms": (time.perf_counter() - started) * 1e3,
+        "batch_rows": len(X),
+    }
+
+
+def _tree_bytes(forest) -> int:
+    total = 0
+    for estimator in forest.estimators_:
+        state = estimator.tree_.__getstate__()
+        total += state["nodes"].nbytes + state["values"].nbytes
+    return total
+
+
+# Slim a trained forest and print the size/latency/r2 report, using the
+# training holdout rows of the dataset:
+#   python -m src.services.model_slimming [trained_models/model.joblib] [--max-r2-drop 0.005]
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    from sklearn.base import clone
+
+    from src.configs.load_config import Config
+    from src.services.dataset_cache import load_dataset
+
+    config = Config()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("model_path", nargs="?", default=os.path.join(config.model.dir, "model.joblib"))
+    parser.add_argument("--data", default=config.data.path)
+    parser.add_argument("--target", default="ESG_Overall")
+    parser.add_argument("--max-r2-drop", type=float, default=0.005)
+    parser.add_argument("--keep-trees", action="store_true", help="do not drop trees")
+    parser.add_argument("--keep-depth", action="store_true", help="do not prune depth")
+    args = parser.parse_args()
+
+    df = load_dataset(args.data, config.data.cache_dir)
+    X = load_preprocessor(args.model_path).transform(df)
+    x_train, x_test, y_train, y_test = train_test_split(X, df[args.target].to_numpy(), test_size=0.22,
+                                                        random_state=42)
+    # The saved model was refit on every row, holdout included: judge the
+    # cut on the same estimator fitted on the training split only.
+    reference = clone(joblib.load(args.model_path)).fit(x_train, y_train)
+    report = slim_model(args.model_path, x_test, y_test, args.max_r2_drop,
+                        drop_trees=not args.keep_trees, prune_depth=not args.keep_depth, reference=reference)
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,185 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from src.configs.load_config import Config
+from src.utils.logger import logger
+
+
+class PredictionCache:
+    """
+    LRU/TTL cache of single predictions keyed by (model, version, encoded row).
+
+    Keys use the float32 row produced by the model's preprocessing, so
+    requests that only differ in key order, number formatting or an omitted
+    imputed feature share an entry. The entries of the ``max_versions``
+    most recently seen versions of a model are kept, so requests still
+    served by the previous version during a reload or a rollback keep their
+    hits; the entries of a version pushed out of that list are dropped.
+    Every entry also expires after ``ttl_seconds``. At most ``max_entries``
+    are kept, the least recently used one being evicted first.
+
+    With a ``redis_url``, local misses are looked up in a shared Redis (or
+    Redis-protocol compatible) server, so several worker processes share
+    hits. Entries there are namespaced by model version and expire with the
+    same TTL. Backend errors are counted and treated as misses.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 3600.0, max_versions: int = 2,
+                 redis_url: str | None = None, prefix: str = "esg:prediction"):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_versions = max(1, max_versions)
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._counters = dict.fromkeys(
+            ("hits", "misses", "evictions", "expirations", "invalidations",
+             "backend_hits", "backend_errors"), 0)
+        self._backend = _connect(redis_url) if redis_url and self.enabled else None
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, name: str, version: str, X: np.ndarray):
+        """Return the cached prediction for an encoded row, or None."""
+        if not self.enabled:
+            return None
+        key = (name, version, X.tobytes())
+        now = time.monotonic()
+        with self._lock:
+            self._observe(name, version)
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._counters["hits"] += 1
+                    return value
+                del self._entries[key]
+                self._counters["expirations"] += 1
+
+        value = self._backend_get(key) if self._backend is not None else None
+        with self._lock:
+            if value is None:
+                self._counters["misses"] += 1
+                return None
+            self._counters["hits"] += 1
+            self._counters["backend_hits"] += 1
+            self._store(key, value, now)
+        return value
+
+    def put(self, name: str, version: str, X: np.ndarray, value) -> None:
+        """Cache the prediction for an encoded row."""
+        if not self.enabled:
+            return
+        key = (name, version, X.tobytes())
+        with self._lock:
+            self._observe(name, version)
+            self._store(key, value, time.monotonic())
+        if self._backend is not None:
+            self._backend_set(key, value)
+
+    def clear(self) -> int:
+        """Drop every local entry and return how many there were."""
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            return count
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            versions = {name: list(seen) for name, seen in self._versions.items()}
+            size = len(self._entries)
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            "enabled": self.enabled,
+            "size": size,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "backend": "redis" if self._backend is not None else None,
+            "hit_rate": round(counters["hits"] / lookups, 4) if lookups else None,
+            "model_versions": versions,
+            **counters,
+        }
+
+    def _observe(self, name: str, version: str) -> None:
+        """
+        Mark a version of a model as recently seen and drop the entries of
+        the versions pushed out of the ``max_versions`` most recent ones.
+        Must be called with the lock held.
+        """
+        seen = self._versions.setdefault(name, OrderedDict())
+        if version in seen:
+            seen.move_to_end(version)
+            return
+        seen[version] = None
+        dropped = set()
+        while len(seen) > self.max_versions:
+            dropped.add(seen.popitem(last=False)[0])
+        if not dropped:
+            return
+        stale = [key for key in self._entries if key[0] == name and key[1] in dropped]
+        for key in stale:
+            del self._entries[key]
+        self._counters["invalidations"] += len(stale)
+
+    def _store(self, key: tuple, value, now: float) -> None:
+        """Insert an entry, evicting the least recently used ones. Must be called with the lock held."""
+        self._entries[key] = (now + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def _backend_key(self, key: tuple) -> str:
+        name, version, row = key
+        return f"{self.prefix}:{name}:{version}:{hashlib.blake2b(row, digest_size=16).hexdigest()}"
+
+    def _backend_get(self, key: tuple):
+        try:
+            raw = self._backend.get(self._backend_key(key))
+        except Exception as e:
+            self._backend_error(e)
+            return None
+        return json.loads(raw) if raw is not None else None
+
+    def _backend_set(self, key: tuple, value) -> None:
+        try:
+            self._backend.set(self._backend_key(key), json.dumps(value), ex=max(1, int(self.ttl_seconds)))
+        except Exception as e:
+            self._backend_error(e)
+
+    def _backend_error(self, error: Exception) -> None:
+        with self._lock:
+            self._counters["backend_errors"] += 1
+            first = self._counters["backend_errors"] == 1
+        if first:
+            logger.warning(f"Prediction cache backend unavailable, serving from the local cache: {error}")
+
+
+def _connect(redis_url: str):
+    try:
+        import redis
+    except ImportError:
+        logger.warning("PREDICTION_CACHE_REDIS_URL is set but the redis package is not installed; "
+                       "using the in-process prediction cache only")
+        return None
+    # Short timeouts: a slow cache must never cost more than the prediction it saves.
+    return redis.Redis.from_url(redis_url, socket_timeout=0.05, socket_connect_timeout=0.05)
+
+
+config = Config()
+prediction_cache = PredictionCache(
+    max_entries=config.cache.max_entries,
+    ttl_seconds=config.cache.ttl_seconds,
+    max_versions=config.cache.max_versions,
+    redis_url=config.cache.redis_url,
+)
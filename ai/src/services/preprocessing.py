@@ -0,0 +1,250 @@
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from src.constants.model_features import ALLOWED_INDUSTRIES, ALLOWED_REGIONS, TRAIN_FEATURES
+from src.services.artifact_store import artifact_store, is_remote
+from src.utils.logger import logger
+
+CATEGORICAL_FEATURES = ("Industry", "Region")
+# Features whose missing values are filled with the training mean
+IMPUTED_FEATURES = ("GrowthRate",)
+
+# model.joblib -> model.preprocessing.json
+PREPROCESSOR_SUFFIX = ".preprocessing.json"
+FORMAT_VERSION = 1
+
+
+class Preprocessor:
+    """
+    Fitted feature preprocessing shared by training and serving.
+
+    Holds the feature order, the category table of every categorical feature
+    and the fill value of every imputed feature. Category codes follow the
+    sorted order LabelEncoder uses, so the codes seen at serving time are
+    the ones the model was trained on.
+
+    Two encoders produce the same float32 matrix:
+        encode(record): one dict, plain Python, for single predictions.
+        encode_records(records) / transform(df): vectorized with pandas,
+            for batches and training.
+    """
+
+    def __init__(self, features: list, categories: dict, fill_values: dict):
+        self.features = list(features)
+        self.categories = {name: list(values) for name, values in categories.items()}
+        self.fill_values = {name: float(value) for name, value in fill_values.items()}
+        self._codes = {name: {value: code for code, value in enumerate(values)}
+                       for name, values in self.categories.items()}
+        self._indexes = {name: pd.Index(values) for name, values in self.categories.items()}
+        self._plan = [(name, self._codes.get(name), self.fill_values.get(name)) for name in self.features]
+        self.fingerprint = hashlib.sha256(
+            json.dumps(self.to_dict(), sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+    @classmethod
+    def fit(cls, df: pd.DataFrame, features: list = TRAIN_FEATURES,
+            categorical=CATEGORICAL_FEATURES, imputed=IMPUTED_FEATURES) -> "Preprocessor":
+        """Learn category tables and imputation values from training data."""
+        categories = {name: sorted(df[name].dropna().unique().tolist())
+                      for name in features if name in categorical}
+        fill_values = {name: float(df[name].mean()) for name in features if name in imputed}
+        return cls(features, categories, fill_values)
+
+    @classmethod
+    def legacy(cls) -> "Preprocessor":
+        """
+        Preprocessing for models saved without an artifact: sorted allowed
+        categories (what LabelEncoder produced on the bundled dataset) and
+        GrowthRate filled with 0.0, as serving used to do.
+        """
+        return cls(TRAIN_FEATURES,
+                   {"Industry": sorted(ALLOWED_INDUSTRIES), "Region": sorted(ALLOWED_REGIONS)},
+                   {"GrowthRate": 0.0})
+
+    def encode(self, record: dict) -> np.ndarray:
+        """
+        Encode a single record into a (1, n_features) float32 array.
+
+        Raises:
+            ValueError: If the record is not a dict, a category is unknown
+                or a required numeric feature is missing.
+        """
+        if not isinstance(record, dict):
+            raise ValueError(f"Invalid record: expected an object, got {str(record)[:100]}")
+        row = []
+        missing = []
+        for name, codes, fill in self._plan:
+            value = record.get(name)
+            if codes is not None:
+                try:
+                    code = codes.get(value)
+                except TypeError:
+                    code = None
+                if code is None:
+                    raise ValueError(f"Invalid {name}: {value}. Allowed: {self.categories[name]}")
+                row.append(code)
+                continue
+            number = _to_float(value)
+            if number != number:
+                if fill is None:
+                    missing.append(name)
+                number = fill
+            row.append(number)
+        if missing:
+            raise ValueError(f"Missing or non-numeric features: {missing}")
+        return np.array([row], dtype=np.float32)
+
+    def encode_records(self, records: list) -> tuple[np.ndarray, np.ndarray, list]:
+        """
+        Validate and encode a batch of records in one vectorized pass.
+
+        Returns:
+            X: float32 array of shape (n_valid, n_features).
+            valid: boolean mask of shape (n,) marking rows present in X.
+            errors: list of length n with an error message or None per row.
+        """
+        is_dict = np.fromiter((isinstance(r, dict) for r in records), dtype=bool, count=len(records))
+        df = pd.DataFrame.from_records(
+            [r if ok else {} for r, ok in zip(records, is_dict)],
+            columns=self.features,
+        )
+        X, valid, errors = self._encode_frame(df)
+        for i in np.flatnonzero(~is_dict):
+            errors[i] = f"Invalid record: expected an object, got {str(records[i])[:100]}"
+        valid &= is_dict
+        return X[valid], valid, errors
+
+    def encode_frame(self, df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray, list]:
+        """
+        Encode the feature columns of a frame without failing on bad rows.
+
+        Unlike encode_records, X keeps one row per input row; rows outside
+        ``valid`` hold meaningless values.
+        """
+        return self._encode_frame(df[self.features])
+
+    def transform(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Encode a training frame into a float32 array.
+
+        Raises:
+            ValueError: If any row has an unknown category or a missing
+                required value.
+        """
+        X, valid, errors = self._encode_frame(df[self.features])
+        if not valid.all():
+            first = int(np.flatnonzero(~valid)[0])
+            raise ValueError(f"{int((~valid).sum())} invalid rows, first at {first}: {errors[first]}")
+        return X
+
+    def to_dict(self) -> dict:
+        return {
+            "format_version": FORMAT_VERSION,
+            "features": self.features,
+            "categories": self.categories,
+            "fill_values": self.fill_values,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Preprocessor":
+        if data.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported preprocessing format: {data.get('format_version')}")
+        return cls(data["features"], data["categories"], data["fill_values"])
+
+    def save(self, path: str) -> str:
+        """Atomically write the preprocessing artifact as JSON."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(self.to_dict(), f, indent=2)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "Preprocessor":
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    def _encode_frame(self, df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray, list]:
+        n = len(df)
+        X = np.empty((n, len(self.features)), dtype=np.float32)
+        invalid = {}
+        missing = {}
+        for j, name in enumerate(self.features):
+            if name in self._indexes:
+                codes = _category_codes(self._indexes[name], df[name])
+                X[:, j] = codes
+                if (codes < 0).any():
+                    invalid[name] = codes < 0
+                continue
+            column = _numeric_column(df[name])
+            nan = np.isnan(column)
+            if name in self.fill_values:
+                column[nan] = self.fill_values[name]
+            elif nan.any():
+                missing[name] = nan
+            X[:, j] = column
+
+        valid = np.ones(n, dtype=bool)
+        for bad in (*invalid.values(), *missing.values()):
+            valid &= ~bad
+        errors = [None] * n
+        for i in np.flatnonzero(~valid):
+            errors[i] = self._row_error(df.iloc[i], [f for f, bad in invalid.items() if bad[i]],
+                                        [f for f, bad in missing.items() if bad[i]])
+        return X, valid, errors
+
+    def _row_error(self, row: pd.Series, invalid: list, missing: list) -> str:
+        if invalid:
+            name = invalid[0]
+            return f"Invalid {name}: {row[name]}. Allowed: {self.categories[name]}"
+        return f"Missing or non-numeric features: {missing}"
+
+
+def preprocessor_path(model_path: str) -> str:
+    """Path of the preprocessing artifact saved next to a model file."""
+    return os.path.splitext(model_path)[0] + PREPROCESSOR_SUFFIX
+
+
+def load_preprocessor(model_path: str) -> Preprocessor:
+    """Load the preprocessing saved with a model, or the legacy one if there is none."""
+    path = preprocessor_path(model_path)
+    if is_remote(path):
+        try:
+            return Preprocessor.load(artifact_store.fetch(path))
+        except FileNotFoundError:
+            pass
+    elif os.path.exists(path):
+        return Preprocessor.load(path)
+    logger.warning(f"No preprocessing artifact at {path}; using legacy preprocessing")
+    return Preprocessor.legacy()
+
+
+def _category_codes(index: pd.Index, values: pd.Series) -> np.ndarray:
+    try:
+        return index.get_indexer(values)
+    except TypeError:
+        # Unhashable values (lists, objects) can never match a category.
+        return index.get_indexer(values.map(lambda v: v if isinstance(v, str) else None))
+
+
+def _numeric_column(values: pd.Series) -> np.ndarray:
+    try:
+        return pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64)
+    except TypeError:
+        return values.map(_to_float).to_numpy(dtype=np.float64)
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
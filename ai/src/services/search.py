@@ -0,0 +1,395 @@
+import importlib
+import time
+from math import ceil, floor, log
+
+import numpy as np
+from joblib import effective_n_jobs
+from sklearn.base import clone
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.metrics import check_scoring
+from sklearn.model_selection import HalvingRandomSearchCV, ParameterSampler, RandomizedSearchCV, check_cv
+
+from src.constants.model_features import SEARCH_HALVING, SEARCH_MODES, SEARCH_RANDOM  # noqa: F401
+from src.services.trial_store import estimator_key, fingerprint, params_key
+
+
+class _BudgetExhausted(Exception):
+    pass
+
+
+class _ProgressMixin:
+    """Progress reporting and wall-clock budget shared by the search classes."""
+
+    def _start(self, total: int) -> None:
+        self._started_at = time.perf_counter()
+        self._fits_done = 0
+        self._fits_total = total
+        self.search_stats_ = {"mode": self.search_mode, "fits": 0, "seconds": 0.0, "stopped_early": False}
+        self._report()
+
+    def _done(self, fits: int) -> None:
+        self._fits_done += fits
+        self.search_stats_["fits"] = self._fits_done
+        self.search_stats_["seconds"] = round(time.perf_counter() - self._started_at, 3)
+        self._report()
+
+    def _out_of_time(self) -> bool:
+        if self.max_seconds is None or time.perf_counter() - self._started_at < self.max_seconds:
+            return False
+        self.search_stats_["stopped_early"] = True
+        return True
+
+    def _report(self) -> None:
+        if self.progress is not None:
+            self.progress(self._fits_done, self._fits_total)
+
+
+class ProgressRandomizedSearchCV(_ProgressMixin, RandomizedSearchCV):
+    """
+    RandomizedSearchCV that evaluates its candidates in chunks and reports
+    progress after each chunk.
+
+    Candidates, CV splits and the selected best parameters are the same as
+    with RandomizedSearchCV; only the order of dispatch is chunked so that
+    ``progress(fits_done, fits_total)`` can be called between chunks, and
+    so that no new chunk starts once ``max_seconds`` have elapsed.
+
+    With a TrialStore as ``trials``, candidates already cross-validated on
+    the same data, folds and estimator are not fitted again: their stored
+    fold scores join ``cv_results_`` as if they had just been computed,
+    and each chunk of new scores is stored as soon as it is done. The
+    ``warm_start`` best candidates of earlier searches of ``target`` on
+    other data replace the last sampled ones. When every candidate is
+    stored, only the refit of the best one runs.
+
+    Args:
+        progress: Optional callable receiving (fits_done, fits_total).
+        chunk_size: Candidates evaluated per chunk. Defaults to the number
+            of parallel jobs, so every worker stays busy within a chunk.
+        max_seconds: Optional wall-clock budget for the search.
+        trials: Optional TrialStore; needs a single string scoring.
+        target: Name the trials are stored under, e.g. the predicted column.
+        warm_start: Number of earlier best candidates to try first.
+
+    The other parameters are RandomizedSearchCV's. They are all listed so
+    that ``get_params`` and ``clone`` see them.
+    """
+
+    search_mode = SEARCH_RANDOM
+
+    def __init__(self, estimator, param_distributions, *, n_iter=10, scoring=None, n_jobs=None, refit=True,
+                 cv=None, verbose=0, pre_dispatch="2*n_jobs", random_state=None, error_score=np.nan,
+                 return_train_score=False, progress=None, chunk_size=None, max_seconds=None, trials=None,
+                 target=None, warm_start=0):
+        super().__init__(estimator, param_distributions, n_iter=n_iter, scoring=scoring, n_jobs=n_jobs,
+                         refit=refit, cv=cv, verbose=verbose, pre_dispatch=pre_dispatch,
+                         random_state=random_state, error_score=error_score,
+                         return_train_score=return_train_score)
+        self.progress = progress
+        self.chunk_size = chunk_size
+        self.max_seconds = max_seconds
+        self.trials = trials
+        self.target = target
+        self.warm_start = warm_start
+
+    def fit(self, X, y=None, **params):
+        self._pending = list(ParameterSampler(self.param_distributions, self.n_iter, random_state=self.random_state))
+        self._stored = []
+        self._warm_started = 0
+        self._trial_key = None
+        if self.trials is not None and isinstance(self.scoring, str) and not self.return_train_score:
+            self._plan_trials(X, y)
+            if not self._pending:
+                return self._fit_from_trials(X, y, **params)
+        return super().fit(X, y, **params)
+
+    def _run_search(self, evaluate_candidates):
+        candidates = self._pending
+        n_splits = check_cv(self.cv).get_n_splits()
+        chunk_size = self.chunk_size or max(1, effective_n_jobs(self.n_jobs))
+
+        self._start(len(candidates) * n_splits)
+        self._report_trials()
+        for start in range(0, len(candidates), chunk_size):
+            if start and self._out_of_time():
+                break
+            chunk = candidates[start:start + chunk_size]
+            results = evaluate_candidates(chunk)
+            self._save_trials(results, len(chunk), n_splits)
+            self._done(len(chunk) * n_splits)
+
+    def _plan_trials(self, X, y) -> None:
+        folds = list(check_cv(self.cv).split(X, y))
+        self._trial_key = (fingerprint(X, y, folds), self.target or type(self.estimator).__name__,
+                           estimator_key(self.estimator, self.param_distributions, self.scoring))
+        self._test_sizes = [len(test) for _, test in folds]
+        candidates = self._pending
+        if self.warm_start:
+            seeds = [p for p in self.trials.best_params(*self._trial_key[1:], self._trial_key[0], self.warm_start)
+                     if _in_space(p, self.param_distributions)]
+            sampled = {params_key(p) for p in candidates}
+            self._warm_started = sum(params_key(p) not in sampled for p in seeds)
+            candidates = list({params_key(p): p for p in seeds + candidates}.values())[:self.n_iter]
+        stored = self.trials.lookup(*self._trial_key, candidates)
+        self._stored = [(p, stored[params_key(p)]) for p in candidates if params_key(p) in stored]
+        self._pending = [p for p in candidates if params_key(p) not in stored]
+
+    def _save_trials(self, results: dict, n_new: int, n_splits: int) -> None:
+        if self._trial_key is None:
+            return
+        scores = [results[f"split{k}_test_score"][-n_new:] for k in range(n_splits)]
+        fit_seconds = results["mean_fit_time"][-n_new:] * n_splits
+        self.trials.save(*self._trial_key, [
+            (params, [float(fold[i]) for fold in scores], float(fit_seconds[i]))
+            for i, params in enumerate(results["params"][-n_new:])
+        ])
+
+    # _format_results and _fit_from_trials build on private BaseSearchCV
+    # methods, which is why scikit-learn is pinned to a minor version in
+    # pyproject.toml; test_search checks a rerun from stored trials gives the
+    # same cv_results_ as the search that stored them.
+    def _format_results(self, candidate_params, n_splits, out, more_results=None):
+        # Stored candidates come first, one entry per fold like _fit_and_score's.
+        if self._stored:
+            candidate_params = [params for params, _ in self._stored] + list(candidate_params)
+            out = [{"fit_error": None, "test_scores": score, "n_test_samples": size, "fit_time": 0.0,
+                    "score_time": 0.0}
+                   for _, scores in self._stored for score, size in zip(scores, self._test_sizes)] + list(out)
+        return super()._format_results(candidate_params, n_splits, out, more_results)
+
+    def _fit_from_trials(self, X, y=None, **params):
+        # What BaseSearchCV.fit sets, for a single scoring, without any CV fit.
+        n_splits = len(self._test_sizes)
+        self._start(0)
+        self._report_trials()
+        results = self._format_results([], n_splits, [])
+        self.multimetric_ = False
+        self.best_index_ = self._select_best_index(self.refit, "score", results)
+        self.best_score_ = results["mean_test_score"][self.best_index_]
+        self.best_params_ = results["params"][self.best_index_]
+        if self.refit:
+            started = time.time()
+            self.best_estimator_ = clone(self.estimator).set_params(**clone(self.best_params_, safe=False))
+            self.best_estimator_.fit(X, y, **params)
+            self.refit_time_ = time.time() - started
+            if hasattr(self.best_estimator_, "feature_names_in_"):
+                self.feature_names_in_ = self.best_estimator_.feature_names_in_
+        self.scorer_ = check_scoring(self.estimator, scoring=self.scoring)
+        self.cv_results_ = results
+        self.n_splits_ = n_splits
+        self._done(0)
+        return self
+
+    def _report_trials(self) -> None:
+        self.search_stats_["stored_trials"] = len(self._stored)
+        self.search_stats_["warm_started"] = self._warm_started
+
+
+class ProgressHalvingRandomSearchCV(_ProgressMixin, HalvingRandomSearchCV):
+    """
+    HalvingRandomSearchCV (successive halving) with progress reporting and
+    a wall-clock budget.
+
+    Every rung evaluates the surviving candidates with ``factor`` times more
+    resource (trees or samples) than the previous one and keeps the best
+    1/factor. When ``max_seconds`` runs out, no new rung is started and the
+    best candidate of the last completed rung wins.
+
+    The other parameters are HalvingRandomSearchCV's. They are all listed so
+    that ``get_params`` and ``clone`` see them.
+    """
+
+    search_mode = SEARCH_HALVING
+
+    def __init__(self, estimator, param_distributions, *, n_candidates="exhaust", factor=3, resource="n_samples",
+                 max_resources="auto", min_resources="smallest", aggressive_elimination=False, cv=5, scoring=None,
+                 refit=True, error_score=np.nan, return_train_score=True, random_state=None, n_jobs=None,
+                 verbose=0, progress=None, max_seconds=None):
+        super().__init__(estimator, param_distributions, n_candidates=n_candidates, factor=factor,
+                         resource=resource, max_resources=max_resources, min_resources=min_resources,
+                         aggressive_elimination=aggressive_elimination, cv=cv, scoring=scoring, refit=refit,
+                         error_score=error_score, return_train_score=return_train_score,
+                         random_state=random_state, n_jobs=n_jobs, verbose=verbose)
+        self.progress = progress
+        self.max_seconds = max_seconds
+
+    def _run_search(self, evaluate_candidates):
+        n_splits = check_cv(self.cv).get_n_splits()
+        min_floor = 2 * n_splits if self.resource == "n_samples" else 1
+        rungs = halving_rungs(self.n_candidates, self.factor, self.max_resources_, min_floor)
+
+        def evaluate(candidate_params, cv=None, more_results=None):
+            if self._fits_done and self._out_of_time():
+                raise _BudgetExhausted()
+            results = evaluate_candidates(candidate_params, cv, more_results=more_results)
+            self._done(len(candidate_params) * n_splits)
+            return results
+
+        self._start(sum(rungs) * n_splits)
+        try:
+            super()._run_search(evaluate)
+        except _BudgetExhausted:
+            pass
+
+
+def halving_rungs(n_candidates: int, factor: float, max_resources: int | None = None,
+                  min_floor: int = 1) -> list[int]:
+    """
+    Number of candidates evaluated at each rung, mirroring how
+    BaseSuccessiveHalving plans its iterations with min_resources="exhaust".
+    ``max_resources=None`` means the resource never limits the rungs.
+    """
+    n_required = 1 + floor(log(n_candidates, factor))
+    n_rungs = n_required
+    if max_resources is not None:
+        min_resources = max(min_floor, max_resources // factor ** (n_required - 1))
+        n_rungs = min(n_rungs, 1 + floor(log(max_resources // min_resources, factor)))
+    rungs = []
+    for _ in range(n_rungs):
+        rungs.append(n_candidates)
+        n_candidates = ceil(n_candidates / factor)
+    return rungs
+
+
+def make_search(estimator, param_distributions: dict, *, mode: str = SEARCH_RANDOM, budget: dict | None = None,
+                n_iter: int = 50, cv: int = 5, factor: int = 3, progress=None, trials=None,
+                target: str | None = None, warm_start: int = 0, **kwargs):
+    """
+    Build the hyperparameter search used by the trainers.
+
+    Args:
+        estimator: Base estimator to tune.
+        param_distributions: Parameter lists to sample from.
+        mode: "random" for RandomizedSearchCV with ``n_iter`` candidates,
+            or "halving" for successive halving over the same number of
+            candidates, using ``n_estimators`` as the resource when it is
+            searched (and the number of training samples otherwise).
+        budget: Optional {"max_fits": int, "max_seconds": float}. max_fits
+            caps the number of CV fits by sampling fewer candidates and
+            must allow at least one candidate (one fit per fold);
+            max_seconds stops the search from starting new work.
+        n_iter: Number of candidates sampled.
+        cv: Number of CV folds.
+        factor: Halving rate between rungs.
+        progress: Optional callable receiving (fits_done, fits_total).
+        trials: Optional TrialStore of candidates already evaluated, used
+            by the random search (see ProgressRandomizedSearchCV).
+        target: Name the trials are stored under.
+        warm_start: Best earlier candidates of ``target`` tried first.
+        **kwargs: scoring, random_state, n_jobs, verbose, ...
+
+    Returns:
+        An unfitted search object. After ``fit`` its ``search_stats_``
+        holds the mode, CV fits run, wall time and whether the budget
+        stopped it early, plus, with ``trials``, the number of candidates
+        reused from the store and of warm-start candidates.
+    """
+    budget = budget or {}
+    max_fits = budget.get("max_fits")
+    max_seconds = budget.get("max_seconds")
+    n_splits = check_cv(cv).get_n_splits()
+    if max_fits is not None and int(max_fits) < n_splits:
+        # A single candidate already takes one fit per fold
+        raise ValueError(f"budget.max_fits must be at least the number of CV folds ({n_splits}), got {max_fits}")
+
+    if mode == SEARCH_RANDOM:
+        if max_fits is not None:
+            n_iter = min(n_iter, int(max_fits) // n_splits)
+        return ProgressRandomizedSearchCV(
+            estimator, param_distributions, n_iter=n_iter, cv=cv, progress=progress,
+            max_seconds=max_seconds, trials=trials, target=target, warm_start=warm_start, **kwargs)
+
+    if mode == SEARCH_HALVING:
+        params = dict(param_distributions)
+        if "n_estimators" in params:
+            resource, max_resources = "n_estimators", max(params.pop("n_estimators"))
+        else:
+            resource, max_resources = "n_samples", "auto"
+        planned_max = max_resources if resource == "n_estimators" else None
+        n_candidates = n_iter
+        if max_fits is not None:
+            while n_candidates > 1 and sum(halving_rungs(n_candidates, factor, planned_max)) * n_splits > max_fits:
+                n_candidates -= 1
+        return ProgressHalvingRandomSearchCV(
+            estimator, params, n_candidates=n_candidates, resource=resource,
+            max_resources=max_resources, min_resources="exhaust", factor=factor, cv=cv,
+            progress=progress, max_seconds=max_seconds, **kwargs)
+
+    raise ValueError(f"Unknown search mode: {mode}. Allowed: {list(SEARCH_MODES)}")
+
+
+def _in_space(params: dict, param_distributions: dict) -> bool:
+    """Whether a stored candidate could have been sampled from ``param_distributions``."""
+    return set(params) == set(param_distributions) and all(
+        hasattr(param_distributions[name], "rvs") or value in param_distributions[name]
+        for name, value in params.items())
+
+
+def planned_fits(search) -> int:
+    """CV fits an unfitted search from make_search will run at most."""
+    n_splits = check_cv(search.cv).get_n_splits()
+    if isinstance(search, ProgressHalvingRandomSearchCV):
+        max_resources = search.max_resources if search.resource == "n_estimators" else None
+        return sum(halving_rungs(search.n_candidates, search.factor, max_resources)) * n_splits
+    return search.n_iter * n_splits
+
+
+# Job kinds whose trainers take search_mode and reuse_trials and return
+# search stats, metrics and best_params, which compare_search_modes needs.
+COMPARABLE_TRAINERS = ("esg_overall", "market_cap")
+
+
+def compare_search_modes(trainer, df, n_jobs: int = -1, budget: dict | None = None) -> dict:
+    """
+    Run a trainer with the exhaustive random search and with successive
+    halving, and report the time saved and the score difference.
+
+    Models are written to temporary directories, so the served model is
+    left untouched, and the trial store is not used, so both searches fit
+    every candidate.
+    """
+    import tempfile
+
+    runs = {}
+    for mode in (SEARCH_RANDOM, SEARCH_HALVING):
+        with tempfile.TemporaryDirectory() as model_dir:
+            result = trainer(df.copy(), model_dir=model_dir, n_jobs=n_jobs, search_mode=mode,
+                             budget=budget if mode == SEARCH_HALVING else None, reuse_trials=False)
+        runs[mode] = {"search": result["search"], "metrics": result["metrics"], "best_params": result["best_params"]}
+
+    random_run, halving_run = runs[SEARCH_RANDOM], runs[SEARCH_HALVING]
+    saved = random_run["search"]["seconds"] - halving_run["search"]["seconds"]
+    return {
+        **runs,
+        "time_saved_seconds": round(saved, 3),
+        "time_saved_pct": round(100 * saved / random_run["search"]["seconds"], 1),
+        "cv_r2_diff": halving_run["metrics"]["cv_r2"] - random_run["metrics"]["cv_r2"],
+        "holdout_r2_diff": halving_run["metrics"]["r2"] - random_run["metrics"]["r2"],
+    }
+
+
+# Compare the search modes of a trainer on the bundled dataset:
+#   python -m src.services.search esg_overall [--max-fits N] [--max-seconds S] [--n-jobs J]
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    from src.configs.load_config import Config
+    from src.services.dataset_cache import load_dataset
+    from src.services.job_runner import TRAINERS
+
+    parser = argparse.ArgumentParser(
+        description="Run a trainer with the random and the halving search and compare time and scores.")
+    parser.add_argument("trainer", choices=COMPARABLE_TRAINERS)
+    parser.add_argument("--data", default="data/company_esg_financial_dataset.csv")
+    parser.add_argument("--max-fits", type=int)
+    parser.add_argument("--max-seconds", type=float)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    args = parser.parse_args()
+
+    module_name, function_name, _ = TRAINERS[args.trainer]
+    trainer = getattr(importlib.import_module(module_name), function_name)
+    budget = {k: v for k, v in (("max_fits", args.max_fits), ("max_seconds", args.max_seconds)) if v is not None}
+    df = load_dataset(args.data, Config().data.cache_dir)
+    report = compare_search_modes(trainer, df, n_jobs=args.n_jobs, budget=budget or None)
+    print(json.dumps(report, indent=2, default=str))
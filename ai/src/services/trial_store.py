@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from src.configs.load_config import Config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trials (
+    fingerprint TEXT NOT NULL,
+    target TEXT NOT NULL,
+    estimator TEXT NOT NULL,
+    params TEXT NOT NULL,
+    fold_scores TEXT NOT NULL,
+    mean_score REAL,
+    fit_seconds REAL NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (fingerprint, target, estimator, params)
+)
+"""
+
+
+class TrialStore:
+    """
+    SQLite file of the hyperparameter candidates already cross-validated.
+
+    A trial is one candidate of a search: its parameters and per-fold test
+    scores, keyed by the target, the estimator (class and fixed
+    parameters, see ``estimator_key``) and the fingerprint of the training
+    data and CV folds (see ``fingerprint``). A search looks its candidates
+    up before fitting anything, so a candidate is evaluated once per
+    dataset, and writes each chunk of new trials as soon as it is scored,
+    so a search killed midway resumes where it stopped.
+
+    Every call opens its own connection, so the store can be pickled into
+    the worker processes of a bundle search; WAL mode lets them write to
+    the same file.
+    """
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        self.path = path
+        self.timeout = timeout
+        self._ready = False
+
+    def lookup(self, fingerprint: str, target: str, estimator: str, params: list[dict]) -> dict:
+        """Return {params_key: fold_scores} for the given candidates already evaluated."""
+        keys = [params_key(p) for p in params]
+        found = {}
+        with self._connect() as conn:
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT params, fold_scores FROM trials WHERE fingerprint = ? AND target = ? "
+                    f"AND estimator = ? AND params IN ({','.join('?' * len(batch))})",
+                    (fingerprint, target, estimator, *batch))
+                found.update((key, json.loads(scores)) for key, scores in rows)
+        return found
+
+    def save(self, fingerprint: str, target: str, estimator: str, trials: list[tuple[dict, list, float]]) -> None:
+        """Record (params, fold_scores, fit_seconds) trials; a candidate seen again replaces its row."""
+        now = time.time()
+        rows = [(fingerprint, target, estimator, params_key(params), json.dumps(scores),
+                 _mean(scores), seconds, now) for params, scores, seconds in trials]
+        with self._connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO trials VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def best_params(self, target: str, estimator: str, exclude_fingerprint: str | None = None,
+                    limit: int = 10) -> list[dict]:
+        """
+        Best distinct candidates of earlier searches on other data, by
+        their best mean CV score, to try first in a new search.
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT params FROM trials WHERE target = ? AND estimator = ? AND fingerprint != ? "
+                "AND mean_score IS NOT NULL GROUP BY params ORDER BY MAX(mean_score) DESC, params LIMIT ?",
+                (target, estimator, exclude_fingerprint or "", limit))
+            return [json.loads(key) for key, in rows]
+
+    def stats(self) -> dict:
+        """Trial counts per target and estimator class."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT target, estimator, COUNT(*), COUNT(DISTINCT fingerprint), SUM(fit_seconds) "
+                "FROM trials GROUP BY target, estimator ORDER BY target")
+            return {
+                "path": self.path,
+                "searches": [
+                    {"target": target, "estimator": json.loads(estimator)["class"], "trials": trials,
+                     "datasets": datasets, "fit_seconds": round(seconds, 1)}
+                    for target, estimator, trials, datasets, seconds in rows
+                ],
+            }
+
+    @contextmanager
+    def _connect(self):
+        if not self._ready:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=self.timeout)
+        try:
+            if not self._ready:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(SCHEMA)
+                self._ready = True
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+
+def fingerprint(X, y, folds) -> str:
+    """SHA-256 of the training arrays and the (train, test) index pairs of the CV folds."""
+    digest = hashlib.sha256()
+    for values in (X, y, *(index for fold in folds for index in fold)):
+        values = np.ascontiguousarray(values)
+        digest.update(f"{values.dtype.str}{values.shape}".encode())
+        digest.update(values.tobytes())
+    return digest.hexdigest()
+
+
+def estimator_key(estimator, searched, scoring) -> str:
+    """Class, scoring and fixed parameters of the estimator, leaving out the searched ones."""
+    fixed = {name: value for name, value in estimator.get_params(deep=False).items() if name not in searched}
+    return json.dumps({"class": type(estimator).__name__, "scoring": scoring, "params": fixed},
+                      sort_keys=True, default=str)
+
+
+def params_key(params: dict) -> str:
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+def _mean(scores: list) -> float | None:
+    mean = float(np.mean(scores))
+    return mean if np.isfinite(mean) else None
+
+
+config = Config()
+trial_store = TrialStore(config.model.trials_path) if config.model.trials_path else None
@@ -0,0 +1,144 @@
+import threading
+import time
+
+from src.constants.model_features import MODEL_ESG_OVERALL, MODEL_FILES
+from src.utils.logger import logger
+
+# Models the service cannot be ready without
+REQUIRED_MODELS = (MODEL_ESG_OVERALL,)
+
+PENDING = "pending"
+RUNNING = "running"
+READY = "ready"
+FAILED = "failed"
+
+
+class WarmUp:
+    """
+    Readiness of the serving process.
+
+    The app starts without its models; the warm-up then runs, in order:
+        handlers: import the lazily registered route handlers.
+        models: load every model of MODEL_FILES into the registry.
+        predict: encode and predict a probe record with each model.
+        feature_store: encode the dataset for the by-id endpoints.
+
+    The process is ready once all of them succeeded. A required model that
+    is missing, or any model that fails to load or predict, fails the
+    warm-up; an optional model that is missing and the feature store only
+    log a warning. A failed warm-up can be started again.
+    """
+
+    def __init__(self, required: tuple = REQUIRED_MODELS):
+        self.required = tuple(required)
+        self.handlers = []
+        self.state = PENDING
+        self.error = None
+        self.steps = {}
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.state == READY
+
+    def run(self) -> bool:
+        """Warm up in the calling thread, unless it is done or running; returns whether ready."""
+        if self._claim():
+            self._run()
+        return self.ready
+
+    def start(self) -> None:
+        """Warm up in a background thread, unless it is done or running."""
+        if self._claim():
+            threading.Thread(target=self._run, name="warm-up", daemon=True).start()
+
+    def status(self) -> dict:
+        return {
+            "state": self.state,
+            "ready": self.ready,
+            "error": self.error,
+            "steps": dict(self.steps),
+            "seconds": round(sum(self.steps.values()), 6),
+        }
+
+    def _claim(self) -> bool:
+        with self._lock:
+            if self.state not in (PENDING, FAILED):
+                return False
+            self.state = RUNNING
+            return True
+
+    def _run(self) -> None:
+        # The error of a failed attempt is kept until the retry finishes.
+        self.steps = {}
+        try:
+            self._step("handlers", self._import_handlers)
+            loaded = self._step("models", self._load_models)
+            self._step("predict", _probe, loaded)
+            if MODEL_ESG_OVERALL in loaded:
+                self._step("feature_store", _build_feature_store, loaded[MODEL_ESG_OVERALL])
+        except Exception as e:
+            self.error = str(e)
+            self.state = FAILED
+            logger.error(f"Warm-up failed: {e}")
+            return
+        self.error = None
+        self.state = READY
+        logger.info(f"Warm-up done in {sum(self.steps.values()):.3f}s: "
+                    + ", ".join(f"{name} {seconds:.3f}s" for name, seconds in self.steps.items()))
+
+    def _step(self, name: str, function, *args):
+        started = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            self.steps[name] = round(time.perf_counter() - started, 6)
+
+    def _import_handlers(self) -> None:
+        for handler in self.handlers:
+            handler.resolve()
+
+    def _load_models(self) -> dict:
+        from src.services.model_registry import model_registry
+
+        loaded = {}
+        for name in MODEL_FILES:
+            try:
+                loaded[name] = model_registry.get(name)
+            except FileNotFoundError as e:
+                if name in self.required:
+                    raise
+                logger.warning(f"Starting without model {name}: {e}")
+            except Exception as e:
+                raise RuntimeError(f"Model {name} failed to load: {e}") from e
+        return loaded
+
+
+def probe_record(preprocessor) -> dict:
+    """A valid record for ``preprocessor``: its first category or 0.0 for every feature."""
+    return {name: preprocessor.categories[name][0] if name in preprocessor.categories else 0.0
+            for name in preprocessor.features}
+
+
+def _probe(loaded: dict) -> None:
+    import numpy as np
+
+    for name, model in loaded.items():
+        try:
+            prediction = model.predictor.predict(model.preprocessor.encode(probe_record(model.preprocessor)))
+        except Exception as e:
+            raise RuntimeError(f"Model {name} failed to predict: {e}") from e
+        if not np.isfinite(prediction).all():
+            raise RuntimeError(f"Model {name} predicted {prediction} for the probe record")
+
+
+def _build_feature_store(model) -> None:
+    from src.services.feature_store import feature_store
+
+    try:
+        feature_store.get(model.preprocessor)
+    except Exception as e:
+        logger.warning(f"Feature store not built, the by-id endpoints build it on first use: {e}")
+
+
+warm_up = WarmUp()
@@ -0,0 +1,251 @@
+import atexit
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from functools import partial
+
+from pymongo import ASCENDING, DESCENDING
+
+from ..configs.load_config import Config
+from ..constants.model_features import TRAIN_FEATURES
+from ..utils.logger import logger
+from ..utils.metrics import STORE_DOCUMENTS, STORE_PENDING, STORE_WRITE_SECONDS
+from .store import Store
+
+PREDICTIONS = "predictions"
+TRAINING_RUNS = "training_runs"
+
+INDEXES = {
+    PREDICTIONS: [
+        [("company_id", ASCENDING), ("year", ASCENDING)],
+        [("model", ASCENDING), ("model_version", ASCENDING)],
+        [("created_at", DESCENDING)],
+    ],
+    TRAINING_RUNS: [
+        [("model", ASCENDING), ("finished_at", DESCENDING)],
+        [("model_version", ASCENDING)],
+    ],
+}
+
+
+class EsgStore:
+    """
+    Write-behind persistence of predictions and training runs.
+
+    Callers only append to an in-memory queue, so a write never adds
+    latency to a request: documents are even built from the request data
+    later, by a writer thread that drains the queue every
+    ``flush_interval`` seconds (or as soon as ``batch_size`` documents are
+    waiting) and writes each collection with ``insert_many`` calls of up to
+    ``batch_size`` documents.
+
+    At most ``queue_size`` documents wait at a time, including the ones
+    being written. When MongoDB is slow or down, new documents are dropped
+    and counted instead of piling up; a batch that fails to write is
+    counted and dropped too. Without a store, nothing is recorded.
+    """
+
+    def __init__(self, store: Store | None, queue_size: int = 50000, batch_size: int = 1000,
+                 flush_interval: float = 0.5):
+        self.store = store
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._items = deque()
+        self._pending = 0
+        self._pid = None
+        self._indexed = False
+        self._failing = False
+        self._counters = dict.fromkeys(("queued", "written", "dropped", "failed"), 0)
+
+    @property
+    def enabled(self) -> bool:
+        return self.store is not None
+
+    def record_predictions(self, model: str, version: str, endpoint: str, records: list, results: list,
+                           cached: bool = False) -> bool:
+        """
+        Queue one document per successful prediction. ``results`` are the
+        per-row result dicts returned to the client, in ``records`` order.
+        Returns False if the documents were dropped.
+        """
+        if not self.enabled:
+            return True
+        build = partial(_prediction_documents, model, version, endpoint, records, results, cached,
+                        datetime.now(timezone.utc))
+        return self._enqueue(PREDICTIONS, len(records), build)
+
+    def record_training_run(self, job: dict, model: str | None = None, model_version: str | None = None) -> bool:
+        """Queue the metadata and metrics of a finished training job."""
+        if not self.enabled:
+            return True
+        build = partial(_training_run_document, dict(job), model, model_version)
+        return self._enqueue(TRAINING_RUNS, 1, build)
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until every queued document has been written or dropped."""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            self._changed.notify_all()
+            while self._pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._changed.wait(remaining)
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"enabled": self.enabled, "pending": self._pending, "queue_size": self.queue_size,
+                    **self._counters}
+
+    def _enqueue(self, collection: str, count: int, build) -> bool:
+        if count == 0:
+            return True
+        self._ensure_started()
+        with self._lock:
+            if self._pending + count > self.queue_size:
+                self._counters["dropped"] += count
+                STORE_DOCUMENTS.labels(collection, "dropped").inc(count)
+                return False
+            self._items.append((collection, count, build))
+            self._pending += count
+            self._counters["queued"] += count
+            if self._pending >= self.batch_size:
+                self._changed.notify_all()
+        STORE_PENDING.labels().inc(count)
+        return True
+
+    def _ensure_started(self) -> None:
+        # Started lazily, and again in a forked child: threads do not survive fork.
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._items.clear()
+            self._pending = 0
+            threading.Thread(target=self._run, name="esg-store-writer", daemon=True).start()
+            atexit.register(self.flush)
+            self._pid = os.getpid()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if not self._items or self._pending < self.batch_size:
+                    self._changed.wait(self.flush_interval)
+                items = list(self._items)
+                self._items.clear()
+            if not items:
+                continue
+            try:
+                self._write(items)
+            except Exception as e:
+                logger.error(f"ESG store writer failed: {e}")
+            count = sum(item[1] for item in items)
+            STORE_PENDING.labels().dec(count)
+            with self._lock:
+                self._pending -= count
+                self._changed.notify_all()
+
+    def _write(self, items: list) -> None:
+        documents = {}
+        for collection, count, build in items:
+            try:
+                documents.setdefault(collection, []).extend(build())
+            except Exception as e:
+                logger.error(f"Could not build {collection} documents: {e}")
+                self._count(collection, "failed", count)
+        self._ensure_indexes()
+
+        database = self.store.database
+        for collection, docs in documents.items():
+            for start in range(0, len(docs), self.batch_size):
+                batch = docs[start:start + self.batch_size]
+                started = time.perf_counter()
+                try:
+                    database[collection].insert_many(batch, ordered=False)
+                except Exception as e:
+                    self._count(collection, "failed", len(batch))
+                    if not self._failing:
+                        logger.warning(f"Could not write {collection} to MongoDB, dropping documents: {e}")
+                    self._failing = True
+                    continue
+                STORE_WRITE_SECONDS.labels(collection).observe(time.perf_counter() - started)
+                self._count(collection, "written", len(batch))
+                if self._failing:
+                    logger.info("MongoDB writes recovered")
+                self._failing = False
+
+    def _ensure_indexes(self) -> None:
+        if self._indexed:
+            return
+        try:
+            for collection, indexes in INDEXES.items():
+                for keys in indexes:
+                    self.store.database[collection].create_index(keys)
+            self._indexed = True
+        except Exception as e:
+            logger.warning(f"Could not create MongoDB indexes, retrying with the next batch: {e}")
+
+    def _count(self, collection: str, outcome: str, count: int) -> None:
+        with self._lock:
+            self._counters[outcome] += count
+        STORE_DOCUMENTS.labels(collection, outcome).inc(count)
+
+
+def _prediction_documents(model, version, endpoint, records, results, cached, created_at) -> list[dict]:
+    documents = []
+    for record, result in zip(records, results):
+        if not result.get("success"):
+            continue
+        documents.append({
+            "model": model,
+            "model_version": version,
+            "endpoint": endpoint,
+            "company_id": record.get("CompanyID"),
+            "company_name": record.get("CompanyName"),
+            "year": record.get("Year"),
+            "features": {name: record.get(name) for name in TRAIN_FEATURES},
+            "prediction": result["prediction"],
+            "cached": cached,
+            "created_at": created_at,
+        })
+    return documents
+
+
+def _training_run_document(job, model, model_version) -> list[dict]:
+    result = job.get("result") or {}
+    return [{
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "model": model,
+        "model_version": model_version,
+        "status": job["status"],
+        "params": job.get("params"),
+        "metrics": job.get("metrics"),
+        "best_params": result.get("best_params"),
+        "mode": result.get("mode"),
+        "error": job.get("error"),
+        "created_at": _datetime(job.get("created_at")),
+        "started_at": _datetime(job.get("started_at")),
+        "finished_at": _datetime(job.get("finished_at")),
+        "duration_seconds": job.get("duration_seconds"),
+    }]
+
+
+def _datetime(timestamp: float | None):
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc) if timestamp is not None else None
+
+
+config = Config()
+esg_store = EsgStore(
+    Store(config) if config.mongodb.host else None,
+    queue_size=config.mongodb.queue_size,
+    batch_size=config.mongodb.batch_size,
+    flush_interval=config.mongodb.flush_interval,
+)
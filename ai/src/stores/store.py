@@ -2,16 +2,34 @@ from pymongo import MongoClient
 from ..configs.load_config import Config
 
 class Store:
-    def __init__(self, config: Config):
-        try:
-            client = MongoClient(
-                host=config.mongodb.host,
-                port=int(config.mongodb.port),
-                username=config.mongodb.username,
-                password=config.mongodb.password
-            )
-        except Exception as e:
-            print("Error when create connection to MongoDB", e)
-            raise e
+    """
+    A pooled MongoDB connection.
 
+    The client holds at most ``max_pool_size`` connections and only
+    connects on first use, so a Store can be created in a pre-fork parent
+    and used by its workers. ``client`` replaces the MongoClient, e.g. with
+    a ``mongomock.MongoClient()`` in tests.
+    """
+
+    def __init__(self, config: Config, client=None):
+        if client is None:
+            try:
+                client = MongoClient(
+                    host=config.mongodb.host,
+                    port=int(config.mongodb.port),
+                    username=config.mongodb.username,
+                    password=config.mongodb.password,
+                    maxPoolSize=config.mongodb.max_pool_size,
+                    minPoolSize=config.mongodb.min_pool_size,
+                    connect=False,
+                )
+            except Exception as e:
+                print("Error when create connection to MongoDB", e)
+                raise e
+
+        self.client = client
         self.__database__ = client.get_database(config.mongodb.database)
+
+    @property
+    def database(self):
+        return self.__database__
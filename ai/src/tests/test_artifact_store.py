@@ -0,0 +1,166 @@
+import os
+import threading
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from src.services import artifact_store as artifact_store_module
+from src.services.artifact_store import ArtifactStore, _file_lock
+
+BUCKET = "models"
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    with mock_aws():
+        client = boto3.client("s3")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+@pytest.fixture
+def store(s3, tmp_path):
+    return ArtifactStore(str(tmp_path / "cache"), part_size=1024, max_concurrency=4, keep=2, read_timeout=2.0)
+
+
+def count_gets(store, monkeypatch) -> list:
+    gets = []
+    get_object = store.client.get_object
+
+    def counted(**kwargs):
+        gets.append(kwargs["Range"])
+        return get_object(**kwargs)
+
+    monkeypatch.setattr(store.client, "get_object", counted)
+    return gets
+
+
+def test_client_has_short_timeouts(store):
+    config = store.client.meta.config
+
+    assert config.connect_timeout == 3 and config.read_timeout == 2.0
+
+
+def test_fetch_downloads_in_ranges_then_hits_the_cache(s3, store, monkeypatch, tmp_path):
+    content = os.urandom(5000)
+    source = tmp_path / "model.joblib"
+    source.write_bytes(content)
+    store.upload(str(source), f"s3://{BUCKET}/esg/model.joblib")
+    # Another host: nothing cached yet
+    other = ArtifactStore(str(tmp_path / "other-cache"), part_size=1024, max_concurrency=4)
+    gets = count_gets(other, monkeypatch)
+
+    path = other.fetch(f"s3://{BUCKET}/esg/model.joblib")
+
+    assert open(path, "rb").read() == content
+    assert os.path.basename(path) == "model.joblib"
+    assert len(gets) == 5
+    assert other.fetch(f"s3://{BUCKET}/esg/model.joblib") == path
+    assert len(gets) == 5
+
+
+def test_concurrent_fetches_download_once(s3, store, monkeypatch):
+    s3.put_object(Bucket=BUCKET, Key="esg/model.joblib", Body=b"x" * 3000)
+    gets = count_gets(store, monkeypatch)
+    paths = []
+    barrier = threading.Barrier(6)
+
+    def fetch():
+        barrier.wait()
+        paths.append(store.fetch(f"s3://{BUCKET}/esg/model.joblib"))
+
+    threads = [threading.Thread(target=fetch) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(paths)) == 1 and len(gets) == 3
+
+
+def test_corrupted_download_is_rejected(s3, store, monkeypatch):
+    s3.put_object(Bucket=BUCKET, Key="esg/model.joblib", Body=b"model", Metadata={"sha256": "0" * 64})
+
+    with pytest.raises(ValueError, match="Integrity check failed"):
+        store.fetch(f"s3://{BUCKET}/esg/model.joblib")
+    assert all(name.endswith(".lock") for name in os.listdir(store.cache_dir))
+
+
+def test_missing_object(store):
+    with pytest.raises(FileNotFoundError):
+        store.fetch(f"s3://{BUCKET}/esg/missing.joblib")
+
+
+def test_prune_keeps_recent_versions_and_locked_entries(s3, store):
+    paths = []
+    for i in range(4):
+        s3.put_object(Bucket=BUCKET, Key=f"esg/model-{i}.joblib", Body=f"model {i}".encode())
+        paths.append(store.fetch(f"s3://{BUCKET}/esg/model-{i}.joblib"))
+        os.utime(os.path.dirname(paths[-1]), (i, i))
+
+    assert [os.path.exists(path) for path in paths] == [False, False, True, True]
+    entries = [name for name in os.listdir(store.cache_dir) if not name.endswith(".lock")]
+    assert sorted(entries) == sorted(os.path.basename(os.path.dirname(path)) for path in paths[2:])
+
+    # An entry whose lock is held (being downloaded) is left alone, lock file included
+    entry = os.path.dirname(paths[2])
+    os.utime(entry, (0, 0))
+    s3.put_object(Bucket=BUCKET, Key="esg/model-4.joblib", Body=b"model 4")
+    with _file_lock(f"{entry}.lock") as locked:
+        assert locked
+        store.fetch(f"s3://{BUCKET}/esg/model-4.joblib")
+        assert os.path.exists(paths[2]) and os.path.exists(f"{entry}.lock")
+    store.prune()
+    assert not os.path.exists(paths[2]) and not os.path.exists(f"{entry}.lock")
+
+
+@pytest.mark.skipif(artifact_store_module.fcntl is None, reason="no file locks on this platform")
+def test_lock_waiter_relocks_a_lock_file_removed_by_its_holder(tmp_path):
+    lock_path = str(tmp_path / "entry.lock")
+    acquired = threading.Event()
+    inodes = []
+
+    def waiter():
+        with _file_lock(lock_path) as locked:
+            inodes.append((locked, os.stat(lock_path).st_ino))
+            acquired.set()
+
+    with _file_lock(lock_path):
+        old_inode = os.stat(lock_path).st_ino
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        assert not acquired.wait(0.2)
+        os.remove(lock_path)
+    thread.join(5)
+
+    assert inodes and inodes[0][0]
+    # The waiter holds the lock file now at the path, not the removed one
+    assert os.path.exists(lock_path)
+
+
+def test_staging_dir_uploads_changed_files_json_first(s3, store, monkeypatch):
+    s3.put_object(Bucket=BUCKET, Key="esg/model.joblib", Body=b"old model")
+    s3.put_object(Bucket=BUCKET, Key="esg/bundle.joblib", Body=b"bundle")
+    uploads = []
+    upload = store.upload
+
+    def recorded(path, uri):
+        uploads.append(uri)
+        return upload(path, uri)
+
+    monkeypatch.setattr(store, "upload", recorded)
+
+    with store.staging_dir(f"s3://{BUCKET}/esg", ["model.joblib", "bundle.joblib", "missing.joblib"]) as staging:
+        assert sorted(os.listdir(staging)) == ["bundle.joblib", "model.joblib"]
+        with open(os.path.join(staging, "model.joblib"), "wb") as f:
+            f.write(b"new model")
+        with open(os.path.join(staging, "model.preprocessing.json"), "w") as f:
+            f.write("{}")
+
+    assert uploads == [f"s3://{BUCKET}/esg/model.preprocessing.json", f"s3://{BUCKET}/esg/model.joblib"]
+    assert s3.get_object(Bucket=BUCKET, Key="esg/model.joblib")["Body"].read() == b"new model"
+    assert not os.path.exists(staging)
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.services.dataset_cache import DatasetCache
+
+
+def write_csv(path, codes):
+    df = pd.DataFrame({"Code": codes, "Revenue": np.arange(len(codes)) * 1.5, "Year": 2020})
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+def values(series):
+    return [None if pd.isna(value) else value for value in series]
+
+
+@pytest.mark.parametrize("codes", [
+    ["1", "2", "3", "4", "5", "A1", None, "7"],  # text after numeric rows
+    ["A1", "B2", "C3", "D4", "1", "2", "3", "4"],  # numbers after text rows
+    ["1", "2", "3", None, None, None, None, "X"],  # a chunk with no values at all
+])
+def test_columns_mixing_numbers_and_text_across_chunks_are_categorical(tmp_path, codes):
+    source = write_csv(tmp_path / "data.csv", codes)
+    expected = pd.read_csv(source)
+
+    df = DatasetCache(str(tmp_path / "cache"), chunk_rows=4).load(source)
+
+    assert isinstance(df["Code"].dtype, pd.CategoricalDtype)
+    assert values(df["Code"]) == [None if pd.isna(value) else str(value) for value in expected["Code"]]
+    np.testing.assert_array_equal(df["Revenue"], expected["Revenue"])
+    np.testing.assert_array_equal(df["Year"], expected["Year"])
+
+
+def test_cached_dataset_matches_read_csv(tmp_path):
+    source = str(tmp_path / "data.csv")
+    pd.DataFrame({"Industry": ["Energy", "Retail", None, "Energy", "Tech"],
+                  "GrowthRate": [1.0, np.nan, 3.0, 4.0, 5.0], "Year": [2020, 2021, 2022, 2023, 2024]}
+                 ).to_csv(source, index=False)
+    expected = pd.read_csv(source)
+
+    df = DatasetCache(str(tmp_path / "cache"), chunk_rows=2).load(source)
+
+    assert df["Industry"].tolist()[:2] == ["Energy", "Retail"] and pd.isna(df["Industry"][2])
+    assert df["Industry"].cat.categories.tolist() == ["Energy", "Retail", "Tech"]
+    np.testing.assert_array_equal(df["GrowthRate"], expected["GrowthRate"])
+    assert df["Year"].dtype == expected["Year"].dtype
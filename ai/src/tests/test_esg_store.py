@@ -0,0 +1,133 @@
+import threading
+from datetime import datetime
+
+import mongomock
+import pytest
+
+from src.configs.load_config import Config
+from src.stores.esg import PREDICTIONS, TRAINING_RUNS, EsgStore
+from src.stores.store import Store
+
+RECORD = {"CompanyID": 7, "CompanyName": "Company_7", "Year": 2021, "Industry": "Retail", "Revenue": 100.0}
+
+
+class BlockingDatabase:
+    """A mongomock database whose insert_many waits until ``release`` is set."""
+
+    def __init__(self, database):
+        self.database = database
+        self.release = threading.Event()
+        self.writing = threading.Event()
+
+    def __getitem__(self, name):
+        collection = self.database[name]
+        database = self
+
+        class Collection:
+            def insert_many(self, documents, ordered=True):
+                database.writing.set()
+                database.release.wait(5)
+                return collection.insert_many(documents, ordered=ordered)
+
+            def create_index(self, keys):
+                return collection.create_index(keys)
+
+        return Collection()
+
+
+class BlockingStore:
+    def __init__(self):
+        self.database = BlockingDatabase(mongomock.MongoClient().db)
+
+
+@pytest.fixture
+def store():
+    return Store(Config(), client=mongomock.MongoClient())
+
+
+def test_record_predictions_writes_the_successful_rows(store):
+    esg_store = EsgStore(store, flush_interval=0.05)
+    results = [{"success": True, "prediction": 61.5}, {"success": False, "error": "bad"},
+               {"success": True, "prediction": 48.0}]
+
+    assert esg_store.record_predictions("esg_overall", "v1", "esg_overall_batch",
+                                        [RECORD, {"Year": "x"}, {**RECORD, "CompanyID": 8}], results, cached=True)
+    assert esg_store.flush()
+
+    documents = list(store.database[PREDICTIONS].find({}, {"_id": 0}).sort("company_id"))
+    assert [d["company_id"] for d in documents] == [7, 8]
+    assert [d["prediction"] for d in documents] == [61.5, 48.0]
+    assert documents[0]["model_version"] == "v1" and documents[0]["endpoint"] == "esg_overall_batch"
+    assert documents[0]["cached"] is True
+    assert documents[0]["features"]["Revenue"] == 100.0 and documents[0]["features"]["Region"] is None
+    assert esg_store.stats()["written"] == 2
+    assert store.database[PREDICTIONS].index_information().keys() > {"_id_"}
+
+
+def test_records_are_written_behind_the_caller():
+    blocking = BlockingStore()
+    esg_store = EsgStore(blocking, batch_size=1, flush_interval=0.05)
+
+    assert esg_store.record_predictions("esg_overall", "v1", "esg_overall", [RECORD],
+                                        [{"success": True, "prediction": 1.0}])
+    assert blocking.database.writing.wait(5)
+    # The writer is blocked on MongoDB, yet recording returns at once
+    assert esg_store.record_predictions("esg_overall", "v1", "esg_overall", [RECORD],
+                                        [{"success": True, "prediction": 2.0}])
+    assert blocking.database.database[PREDICTIONS].count_documents({}) == 0
+    assert esg_store.stats()["pending"] == 2
+
+    blocking.database.release.set()
+    assert esg_store.flush()
+    assert blocking.database.database[PREDICTIONS].count_documents({}) == 2
+
+
+def test_documents_are_dropped_when_the_queue_is_full():
+    blocking = BlockingStore()
+    esg_store = EsgStore(blocking, queue_size=2, batch_size=1, flush_interval=0.05)
+    result = [{"success": True, "prediction": 1.0}]
+
+    assert esg_store.record_predictions("esg_overall", "v1", "esg_overall", [RECORD], result)
+    assert blocking.database.writing.wait(5)
+    assert esg_store.record_predictions("esg_overall", "v1", "esg_overall", [RECORD], result)
+    assert not esg_store.record_predictions("esg_overall", "v1", "esg_overall", [RECORD], result)
+
+    blocking.database.release.set()
+    assert esg_store.flush()
+    assert esg_store.stats()["dropped"] == 1
+    assert blocking.database.database[PREDICTIONS].count_documents({}) == 2
+
+
+def test_failed_writes_are_counted_and_dropped(store, monkeypatch):
+    esg_store = EsgStore(store, flush_interval=0.05)
+    def insert_many(*args, **kwargs):
+        raise ConnectionError("MongoDB is down")
+
+    monkeypatch.setattr(mongomock.Collection, "insert_many", insert_many)
+
+    assert esg_store.record_predictions("esg_overall", "v1", "esg_overall", [RECORD],
+                                        [{"success": True, "prediction": 1.0}])
+    assert esg_store.flush()
+    assert esg_store.stats()["failed"] == 1 and esg_store.stats()["pending"] == 0
+
+
+def test_record_training_run(store):
+    esg_store = EsgStore(store, flush_interval=0.05)
+    job = {"id": "job-1", "kind": "esg_overall", "status": "succeeded", "params": {"search_mode": "random"},
+           "metrics": {"r2": 0.5}, "result": {"best_params": {"max_depth": 10}}, "created_at": 0.0,
+           "started_at": 1.0, "finished_at": 61.0, "duration_seconds": 60.0}
+
+    assert esg_store.record_training_run(job, "esg_overall", "v2")
+    assert esg_store.flush()
+
+    document = store.database[TRAINING_RUNS].find_one({"job_id": "job-1"})
+    assert document["model_version"] == "v2" and document["best_params"] == {"max_depth": 10}
+    assert document["finished_at"].replace(tzinfo=None) == datetime(1970, 1, 1, 0, 1, 1)
+
+
+def test_without_a_store_nothing_is_recorded():
+    esg_store = EsgStore(None)
+
+    assert esg_store.record_predictions("esg_overall", "v1", "esg_overall", [RECORD],
+                                        [{"success": True, "prediction": 1.0}])
+    assert esg_store.stats()["queued"] == 0
@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+import pytest
+from flask import Flask
+
+from src.constants.model_features import TRAIN_FEATURES
+from src.controllers import model_controller
+from src.services.feature_store import LATEST_YEAR, FeatureStore, parse_ids
+from src.services.preprocessing import Preprocessor
+
+
+def make_dataset(revenue_offset: float = 0.0) -> pd.DataFrame:
+    rows = []
+    for company_id in (1, 2, 3):
+        for year in (2020, 2021, 2022):
+            rows.append({
+                "CompanyID": company_id, "CompanyName": f"Company_{company_id}",
+                "Industry": "Retail" if company_id % 2 else "Energy", "Region": "Asia", "Year": year,
+                # Revenue identifies the row: predictions below return it
+                "Revenue": company_id * 1000 + year + revenue_offset, "ProfitMargin": 5.0, "MarketCap": 100.0,
+                "GrowthRate": None if year == 2020 else 1.0, "ESG_Overall": 50.0, "CarbonEmissions": 10.0,
+                "WaterUsage": 1.0, "EnergyConsumption": 2.0,
+            })
+    return pd.DataFrame(rows)
+
+
+def revenue(company_id: int, year: int) -> float:
+    return float(company_id * 1000 + year)
+
+
+class RevenuePredictor:
+    """Predicts the Revenue feature, so every prediction tells which row it was made from."""
+
+    def predict(self, X):
+        return X[:, TRAIN_FEATURES.index("Revenue")].astype(np.float64)
+
+
+class FakeLoaded:
+    def __init__(self, preprocessor):
+        self.predictor = RevenuePredictor()
+        self.preprocessor = preprocessor
+        self.version = "test"
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    df = make_dataset()
+    path = tmp_path / "dataset.csv"
+    df.to_csv(path, index=False)
+    return str(path), Preprocessor.fit(df, TRAIN_FEATURES)
+
+
+def test_parse_ids_keeps_invalid_years_out_of_the_arrays():
+    company_ids, years, errors = parse_ids([{"CompanyID": 1, "Year": -1}, [2, 65536 + 2021], [3, "2021"], 4,
+                                            {"CompanyID": "x"}, [5, 2020.5]])
+
+    assert errors[0] == "Invalid Year: -1" and "Invalid Year" in errors[1]
+    assert errors[2] is None and errors[3] is None
+    assert "CompanyID" in errors[4] and "Year" in errors[5]
+    assert company_ids.tolist() == [0, 0, 3, 4, 0, 0]
+    assert years.tolist() == [LATEST_YEAR, LATEST_YEAR, 2021, LATEST_YEAR, LATEST_YEAR, LATEST_YEAR]
+
+
+def test_lookup_resolves_years_and_latest(dataset):
+    path, preprocessor = dataset
+    features = FeatureStore(path).get(preprocessor)
+    rows, years = features.lookup(np.array([1, 2, 3, 9]), np.array([2020, LATEST_YEAR, 2019, LATEST_YEAR]))
+
+    assert years.tolist() == [2020, 2022, 2019, LATEST_YEAR]
+    assert (rows >= 0).tolist() == [True, True, False, False]
+    np.testing.assert_array_equal(RevenuePredictor().predict(features.X[rows[:2]]),
+                                  [revenue(1, 2020), revenue(2, 2022)])
+
+
+def test_changed_dataset_reuses_unchanged_rows(dataset, tmp_path):
+    path, preprocessor = dataset
+    store = FeatureStore(path, cache_dir=str(tmp_path / "cache"), check_interval=0)
+    first = store.get(preprocessor)
+    df = make_dataset()
+    df.loc[df["CompanyID"] == 3, "Revenue"] += 0.5
+    df.to_csv(path, index=False)
+    second = store.get(preprocessor)
+
+    assert second.dataset_key != first.dataset_key
+    assert store.get(preprocessor) is second
+    rows, _ = second.lookup(np.array([1, 3]), np.array([2021, 2021]))
+    np.testing.assert_array_equal(RevenuePredictor().predict(second.X[rows]),
+                                  [revenue(1, 2021), revenue(3, 2021) + 0.5])
+
+
+def predict_by_id(monkeypatch, dataset, body):
+    path, preprocessor = dataset
+    monkeypatch.setattr(model_controller.model_registry, "get", lambda name: FakeLoaded(preprocessor))
+    monkeypatch.setattr(model_controller, "feature_store", FeatureStore(path))
+    with Flask(__name__).test_request_context(json=body):
+        return model_controller.predict_esg_overall_by_id()
+
+
+def test_mixed_batch_keeps_every_prediction_on_its_own_item(monkeypatch, dataset):
+    body, status = predict_by_id(monkeypatch, dataset, {"ids": [
+        [1, 2020], {"CompanyID": 2, "Year": -1}, [3, 65536 + 2021], 3, [9, 2020], "x", [2, 2021]]})
+
+    assert status == 200
+    results = body["results"]
+    assert [r["success"] for r in results] == [True, False, False, True, False, False, True]
+    assert results[0]["prediction"] == revenue(1, 2020)
+    assert results[3]["prediction"] == revenue(3, 2022) and results[3]["Year"] == 2022
+    assert results[6]["prediction"] == revenue(2, 2021)
+    assert "Year" in results[1]["error"] and "Year" in results[2]["error"]
+    assert body["succeeded"] == 3 and body["failed"] == 4
+
+
+def test_single_item_with_an_invalid_year_is_rejected(monkeypatch, dataset):
+    body, status = predict_by_id(monkeypatch, dataset, {"CompanyID": 1, "Year": 65536 + 2020})
+
+    assert status == 400 and "Year" in body["error"]
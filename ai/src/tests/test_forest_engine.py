@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import ExtraTreesRegressor, GradientBoostingRegressor, RandomForestRegressor
+
+from src.services.forest_engine import CompiledForest, SklearnPredictor, compile_explainer, compile_predictor
+from src.services.preprocessing import Preprocessor
+
+N_FEATURES = 6
+# Columns holding category codes, as the Preprocessor encodes Industry and Region
+CATEGORY_COLUMNS = (0, 1)
+
+
+def make_data(n_rows: int, seed: int = 0, nan_fraction: float = 0.0):
+    rng = np.random.default_rng(seed)
+    X = rng.standard_normal((n_rows, N_FEATURES))
+    for column in CATEGORY_COLUMNS:
+        X[:, column] = rng.integers(0, 5, n_rows)
+    y = 3 * X[:, 2] - X[:, 3] ** 2 + X[:, 0] + rng.normal(0, 0.1, n_rows)
+    if nan_fraction:
+        X[rng.random(X.shape) < nan_fraction] = np.nan
+    return X.astype(np.float32), y
+
+
+def random_inputs(n_rows: int, seed: int = 1) -> np.ndarray:
+    """Rows with NaNs, values far outside the training range and category codes never seen in training."""
+    X, _ = make_data(n_rows, seed, nan_fraction=0.1)
+    X[::7, 2] = 1e6
+    X[::11, 3] = -1e6
+    X[::5, CATEGORY_COLUMNS[0]] = 9
+    X[::3, CATEGORY_COLUMNS[1]] = -1
+    return X
+
+
+@pytest.fixture(scope="module")
+def forest():
+    X, y = make_data(500, nan_fraction=0.05)
+    return RandomForestRegressor(n_estimators=30, max_depth=8, random_state=0).fit(X, y)
+
+
+def test_compiled_forest_matches_sklearn_on_random_inputs(forest):
+    compiled = CompiledForest.from_sklearn(forest)
+    X = random_inputs(1000)
+    expected = SklearnPredictor(forest).predict(X)
+
+    np.testing.assert_array_equal(compiled.predict(X), expected)
+    for i in range(50):
+        np.testing.assert_array_equal(compiled.predict(X[i:i + 1]), expected[i:i + 1])
+
+
+def test_compiled_forest_matches_sklearn_on_probe_rows(forest):
+    assert CompiledForest.from_sklearn(forest).verify(forest)
+
+
+@pytest.mark.parametrize("estimator", [
+    ExtraTreesRegressor(n_estimators=20, random_state=0),
+    RandomForestRegressor(n_estimators=20, min_samples_leaf=3, random_state=0),
+])
+def test_compile_predictor_serves_forests_compiled(estimator):
+    X, y = make_data(400)
+    estimator.fit(X, y)
+    predictor = compile_predictor(estimator, "compiled")
+    X_new = random_inputs(300)
+
+    assert predictor.engine == "compiled"
+    np.testing.assert_array_equal(predictor.predict(X_new), estimator.predict(X_new))
+
+
+def test_compiled_multi_output_forest_matches_sklearn():
+    X, y = make_data(400)
+    Y = np.column_stack([y, -2 * y + X[:, 4]])
+    forest = RandomForestRegressor(n_estimators=15, random_state=0).fit(X, Y)
+    X_new = random_inputs(200)
+
+    np.testing.assert_array_equal(CompiledForest.from_sklearn(forest).predict(X_new), forest.predict(X_new))
+
+
+def test_gradient_boosting_is_served_by_sklearn():
+    X, y = make_data(400)
+    gbr = GradientBoostingRegressor(n_estimators=50, random_state=0).fit(X, y)
+    predictor = compile_predictor(gbr, "compiled")
+    X_new = random_inputs(300)
+    X_new = X_new[~np.isnan(X_new).any(axis=1)]
+
+    assert predictor.engine == "sklearn"
+    np.testing.assert_array_equal(predictor.predict(X_new), gbr.predict(X_new))
+
+
+def test_max_rows_hands_large_batches_to_sklearn(forest):
+    predictor = compile_predictor(forest, "compiled", max_rows=10)
+    X = random_inputs(50)
+
+    assert predictor.fallback is not None
+    np.testing.assert_array_equal(predictor.predict(X), forest.predict(X))
+
+
+def test_compacted_and_saved_forest_predict_the_same(forest, tmp_path):
+    compiled = CompiledForest.from_sklearn(forest)
+    X = random_inputs(500)
+    path = compiled.compacted().save(str(tmp_path / "model.slim.npz"), metadata={"source": "test"})
+    loaded = CompiledForest.load(path)
+
+    np.testing.assert_array_equal(loaded.predict(X), forest.predict(X))
+    assert loaded.metadata == {"source": "test"}
+
+
+def test_unseen_category_is_a_row_error_not_a_prediction():
+    df = pd.DataFrame({"Industry": ["Energy", "Retail", "Energy"], "Year": [2020, 2021, 2022],
+                       "GrowthRate": [1.0, np.nan, 3.0]})
+    preprocessor = Preprocessor.fit(df, features=["Industry", "Year", "GrowthRate"],
+                                    categorical=["Industry"], imputed=["GrowthRate"])
+    X, valid, errors = preprocessor.encode_records([
+        {"Industry": "Retail", "Year": 2023, "GrowthRate": None},
+        {"Industry": "Mining", "Year": 2023, "GrowthRate": 1.0},
+    ])
+
+    assert valid.tolist() == [True, False]
+    assert errors[0] is None and "Mining" in errors[1]
+    np.testing.assert_array_equal(X, np.array([[1, 2023, 2.0]], dtype=np.float32))
+
+
+def test_explain_contributions_add_up_to_the_prediction(forest):
+    explainer = compile_explainer(forest)
+    X = random_inputs(300)
+    predictions, bias, contributions = explainer.explain(X)
+
+    np.testing.assert_array_equal(predictions, forest.predict(X))
+    assert contributions.shape == (300, N_FEATURES)
+    np.testing.assert_allclose(bias + contributions.sum(axis=1), predictions, rtol=0, atol=1e-9)
+    # Features the target does not depend on move the score much less than those it does
+    assert np.abs(contributions[:, 5]).mean() < np.abs(contributions[:, 2]).mean()
+
+
+def test_forests_without_internal_node_values_cannot_be_explained(forest):
+    compacted = CompiledForest.from_sklearn(forest).compacted()
+
+    assert compile_explainer(forest, compacted) is not compacted
+    with pytest.raises(ValueError, match="Cannot explain"):
+        compile_explainer(GradientBoostingRegressor(n_estimators=5).fit(*make_data(50)))
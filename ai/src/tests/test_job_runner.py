@@ -0,0 +1,142 @@
+import json
+import subprocess
+import sys
+import time
+
+import pandas as pd
+import pytest
+
+from src.services.job_runner import (CANCELLED, FAILED, QUEUED, RUNNING, SUCCEEDED, TRAINERS, JobRunner,
+                                     _hold_owner_lock)
+
+
+def count_rows(df, model_dir, n_jobs, progress, seconds: float = 0.0, fail: bool = False):
+    """Trainer run by the training processes of these tests."""
+    progress(1, 2)
+    if fail:
+        raise ValueError("bad data")
+    time.sleep(seconds)
+    progress(2, 2)
+    return {"model_path": None, "rows": len(df), "metrics": {"rows": len(df)}}
+
+
+@pytest.fixture
+def make_runner(tmp_path, monkeypatch):
+    monkeypatch.setitem(TRAINERS, "rows", ("src.tests.test_job_runner", "count_rows", None))
+    data_path = tmp_path / "data.csv"
+    pd.DataFrame({"a": [1, 2, 3]}).to_csv(data_path, index=False)
+    runners = []
+
+    def make(**kwargs):
+        kwargs.setdefault("poll_seconds", 0.05)
+        runner = JobRunner(str(tmp_path / "jobs.json"), str(data_path), str(tmp_path / "models"), **kwargs)
+        runners.append(runner)
+        return runner
+
+    yield make
+    # The worker threads cannot be stopped; park them.
+    for runner in runners:
+        runner.poll_seconds = 3600
+
+
+def wait_for(runner, job_id, statuses, timeout: float = 60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = runner.get(job_id)
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"Job {job_id} is still {runner.get(job_id)['status']}")
+
+
+def test_job_runs_in_a_training_process_and_reports_its_result(make_runner):
+    runner = make_runner()
+    job = wait_for(runner, runner.submit("rows")["id"], (SUCCEEDED, FAILED))
+
+    assert job["status"] == SUCCEEDED, job["error"]
+    assert job["result"]["rows"] == 3 and job["metrics"] == {"rows": 3}
+    assert job["progress"] == {"fits_done": 2, "fits_total": 2}
+    assert job["owner"] == runner._token and job["id"] not in runner._processes
+
+
+def test_trainer_errors_fail_the_job(make_runner):
+    runner = make_runner()
+    job = wait_for(runner, runner.submit("rows", {"fail": True})["id"], (SUCCEEDED, FAILED))
+
+    assert job["status"] == FAILED
+    assert job["error"] == "ValueError: bad data"
+
+
+def test_jobs_wait_for_a_free_slot_and_running_jobs_can_be_cancelled(make_runner):
+    runner = make_runner(max_workers=1)
+    slow = runner.submit("rows", {"seconds": 60})["id"]
+    fast = runner.submit("rows")["id"]
+    wait_for(runner, slow, (RUNNING,))
+    time.sleep(0.3)
+    assert runner.get(fast)["status"] == QUEUED
+
+    process = runner._processes[slow]
+    assert runner.cancel(slow)["status"] == CANCELLED
+    assert process.wait(timeout=10) != 0
+    assert wait_for(runner, fast, (SUCCEEDED, FAILED))["status"] == SUCCEEDED
+    # The runner thread of the cancelled job leaves its status alone
+    assert runner.get(slow)["status"] == CANCELLED
+
+
+def _running_job(runner, script: str):
+    runner._token = "owner"
+    process = subprocess.Popen([sys.executable, "-c", script], stdout=subprocess.PIPE, text=True)
+    job = runner.submit("rows")
+    with runner._transaction():
+        runner._jobs[job["id"]].update(status=RUNNING, owner="owner", started_at=time.time(), pid=process.pid)
+        runner._processes[job["id"]] = process
+    return job["id"], process
+
+
+def test_lines_that_are_not_events_are_skipped(make_runner):
+    runner = make_runner(execute=False)
+    result = json.dumps({"event": "result", "result": {"metrics": {"r2": 1.0}}})
+    job_id, process = _running_job(runner, f"print('native library noise'); print(42); print({result!r})")
+
+    job = runner._run(job_id, process)
+
+    assert job["status"] == SUCCEEDED and job["metrics"] == {"r2": 1.0}
+    assert process.returncode == 0 and job_id not in runner._processes
+
+
+def test_training_process_is_reaped_when_reading_its_events_fails(make_runner):
+    runner = make_runner(execute=False)
+    job_id, process = _running_job(runner, "print('{\"event\": \"progress\"}')")
+
+    with pytest.raises(KeyError):
+        runner._run(job_id, process)
+    assert process.returncode == 0 and job_id not in runner._processes
+
+
+def test_running_jobs_of_dead_owners_are_marked_failed(make_runner, tmp_path):
+    runner = make_runner(execute=False)
+    jobs = [{"id": owner, "kind": "rows", "status": RUNNING, "owner": owner, "started_at": 1.0,
+             "finished_at": None} for owner in ("gone", "alive")]
+    (tmp_path / "jobs.json").write_text(json.dumps(jobs))
+    owner_file = _hold_owner_lock(runner._owner_path("alive"))
+
+    assert runner.get("gone")["status"] == FAILED
+    assert runner.get("gone")["error"] == "Interrupted by service restart"
+    assert runner.get("alive")["status"] == RUNNING
+
+    owner_file.close()
+    assert runner.get("alive")["status"] == FAILED
+    assert not (tmp_path / "jobs.json.owners" / "alive.lock").exists()
+
+
+def test_history_drops_the_oldest_finished_jobs_only(make_runner):
+    runner = make_runner(execute=False, history_limit=2)
+    a, b, c = (runner.submit("rows")["id"] for _ in range(3))
+    runner.cancel(a)
+    runner.cancel(b)
+    assert [job["id"] for job in runner.list()] == [c, b]
+
+    d = runner.submit("rows")["id"]
+    e = runner.submit("rows")["id"]
+    assert [job["id"] for job in runner.list()] == [e, d, c]
+    assert runner.cancel(a) is None
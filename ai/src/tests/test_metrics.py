@@ -0,0 +1,63 @@
+import os
+
+from src.utils.metrics import MetricsRegistry
+
+
+def make_registry():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests.", ("route",))
+    latency = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    in_flight = registry.gauge("in_flight", "Requests in flight.")
+    return registry, requests, latency, in_flight
+
+
+def test_render_reports_this_process():
+    registry, requests, latency, in_flight = make_registry()
+    requests.labels("/a").inc(2)
+    latency.labels().observe(0.05)
+    latency.labels().observe(5)
+    in_flight.labels().inc()
+
+    lines = registry.render().splitlines()
+    assert 'requests_total{route="/a"} 2' in lines
+    assert 'latency_seconds_bucket{le="0.1"} 1' in lines and 'latency_seconds_bucket{le="+Inf"} 2' in lines
+    assert "latency_seconds_sum 5.05" in lines and "in_flight 1" in lines
+
+
+def test_shared_metrics_sum_all_processes_and_keep_counters_of_exited_ones(tmp_path):
+    registry, requests, latency, in_flight = make_registry()
+    registry.share(str(tmp_path), flush_interval=3600)
+    requests.labels("/a").inc()
+    in_flight.labels().inc()
+
+    pid = os.fork()
+    if pid == 0:
+        # A forked worker starts from zero
+        try:
+            requests.labels("/a").inc(2)
+            requests.labels("/b").inc()
+            latency.labels().observe(0.5)
+            in_flight.labels().inc()
+            registry.flush()
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+
+    lines = registry.render().splitlines()
+    assert 'requests_total{route="/a"} 3' in lines and 'requests_total{route="/b"} 1' in lines
+    assert 'latency_seconds_bucket{le="1.0"} 1' in lines and "in_flight 2" in lines
+
+    registry.process_exited(pid)
+    lines = registry.render().splitlines()
+    assert 'requests_total{route="/a"} 3' in lines and 'requests_total{route="/b"} 1' in lines
+    assert "latency_seconds_count 1" in lines and "in_flight 1" in lines
+    assert set(os.listdir(tmp_path)) == {".lock", "exited.json", f"{os.getpid()}.json"}
+
+
+def test_share_clears_the_files_of_an_earlier_run(tmp_path):
+    (tmp_path / "123.json").write_text('{"requests_total": [[["/a"], [5]]]}')
+    registry, requests, _, _ = make_registry()
+
+    registry.share(str(tmp_path), flush_interval=3600, clear=True)
+
+    assert 'requests_total{route="/a"}' not in registry.render()
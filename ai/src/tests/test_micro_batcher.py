@@ -0,0 +1,120 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from src.services.micro_batcher import MicroBatcher
+
+
+class Doubler:
+    """Predicts twice the first feature and records the rows of every call."""
+
+    def __init__(self, delay: float = 0.0, error: Exception | None = None, outputs: int = 1):
+        self.delay = delay
+        self.error = error
+        self.outputs = outputs
+        self.calls = []
+
+    def predict(self, X):
+        self.calls.append(len(X))
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        if self.outputs == 1:
+            return X[:, 0] * 2
+        return np.column_stack([X[:, 0] * (k + 2) for k in range(self.outputs)])
+
+
+def row(value: float) -> np.ndarray:
+    return np.array([[value, 0.0]], dtype=np.float32)
+
+
+def predict_concurrently(batcher, predictors, n_callers: int = 48):
+    """Predict row(i) with predictors[i % len(predictors)] from n_callers threads at once."""
+    barrier = threading.Barrier(n_callers)
+
+    def call(i):
+        barrier.wait()
+        try:
+            return batcher.predict(predictors[i % len(predictors)], row(i))
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(n_callers) as pool:
+        return list(pool.map(call, range(n_callers)))
+
+
+def test_each_caller_gets_the_prediction_of_its_own_row():
+    batcher = MicroBatcher("test", window_seconds=0.01, max_rows=16)
+    predictor = Doubler(delay=0.01)
+
+    results = predict_concurrently(batcher, [predictor])
+
+    assert results == [2.0 * i for i in range(48)]
+    assert sum(predictor.calls) == 48 and max(predictor.calls) > 1 and max(predictor.calls) <= 16
+
+
+def test_rows_of_different_model_versions_are_predicted_by_their_own_version():
+    batcher = MicroBatcher("test", window_seconds=0.01, max_rows=64)
+    old, new = Doubler(delay=0.01), Doubler(delay=0.01, outputs=2)
+
+    results = predict_concurrently(batcher, [old, new])
+
+    assert results[0::2] == [2.0 * i for i in range(0, 48, 2)]
+    assert results[1::2] == [[2.0 * i, 3.0 * i] for i in range(1, 48, 2)]
+
+
+def test_a_predict_error_reaches_every_waiting_caller():
+    batcher = MicroBatcher("test", window_seconds=0.01, max_rows=64)
+    predictor = Doubler(delay=0.02, error=ValueError("model broke"))
+
+    results = predict_concurrently(batcher, [predictor])
+
+    assert all(isinstance(result, ValueError) and str(result) == "model broke" for result in results)
+    assert len(predictor.calls) < 48
+    # The dispatcher survives the error
+    predictor.error = None
+    assert batcher.predict(predictor, row(5)) == 10.0
+
+
+def test_under_load_a_row_waits_at_most_the_window_for_company():
+    batcher = MicroBatcher("test", window_seconds=0.3, max_rows=64)
+    predictor = Doubler(delay=0.01)
+    predict_concurrently(batcher, [predictor], n_callers=8)
+
+    # The last batch held several rows, so a lone row waits for the window...
+    started = time.perf_counter()
+    assert batcher.predict(predictor, row(1)) == 2.0
+    assert 0.25 <= time.perf_counter() - started < 2
+    # ...and is dispatched at once after a batch of one.
+    started = time.perf_counter()
+    assert batcher.predict(predictor, row(2)) == 4.0
+    assert time.perf_counter() - started < 0.25
+
+
+def test_callers_give_up_after_the_timeout_and_their_rows_are_skipped():
+    batcher = MicroBatcher("test", window_seconds=0.0, max_rows=64, timeout_seconds=0.1)
+    slow = Doubler(delay=0.3)
+    fast = Doubler()
+
+    with ThreadPoolExecutor(1) as pool:
+        first = pool.submit(batcher.predict, slow, row(1))
+        time.sleep(0.05)
+        # Queued behind the slow predict; it times out before its turn.
+        with pytest.raises(TimeoutError):
+            batcher.predict(fast, row(2))
+        with pytest.raises(TimeoutError):
+            first.result()
+    time.sleep(0.3)  # the slow predict finishes
+    assert batcher.predict(fast, row(3)) == 6.0
+    assert fast.calls == [1]
+
+
+def test_batching_disabled_predicts_in_the_caller():
+    batcher = MicroBatcher("test", max_rows=1)
+    predictor = Doubler(outputs=2)
+
+    assert batcher.predict(predictor, row(4)) == [8.0, 12.0]
+    assert batcher._pid is None
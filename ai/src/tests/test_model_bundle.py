@@ -0,0 +1,118 @@
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from flask import Flask
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+from sklearn.model_selection import KFold
+
+from src.constants.model_features import ALLOWED_INDUSTRIES, ALLOWED_REGIONS, BUNDLE_TARGETS, MODEL_BUNDLE, MODEL_FILES
+from src.controllers import model_controller
+from src.controllers.train_controller import train_model_bundle
+from src.services.forest_engine import compile_predictor
+from src.services.model_bundle import ModelBundle, fit_members, search_targets
+from src.services.model_registry import ModelRegistry
+
+TARGETS = ["A", "B", "C"]
+FEATURES = ["x0", "x1", "x2", "x3"]
+
+
+def make_data(n_rows: int = 200, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    X = rng.standard_normal((n_rows, len(FEATURES))).astype(np.float32)
+    Y = np.column_stack([2 * X[:, 0] + X[:, 1], X[:, 1] - X[:, 2], X[:, 0] * X[:, 3]])
+    return X, Y + rng.normal(0, 0.05, Y.shape)
+
+
+@pytest.fixture(scope="module")
+def bundle():
+    X, Y = make_data()
+    members = [
+        (RandomForestRegressor(n_estimators=10, random_state=0), [0, 1], [0, 1, 2, 3]),
+        (GradientBoostingRegressor(n_estimators=20, random_state=0), [2], [0, 3]),
+    ]
+    return ModelBundle(TARGETS, FEATURES, fit_members(X, Y, members, n_jobs=1), {"rows": len(X)})
+
+
+def test_bundle_routes_each_member_to_its_outputs(bundle):
+    X, _ = make_data(50, seed=1)
+    forest, _, _ = bundle.members[0]
+    boosting, _, _ = bundle.members[1]
+    predictions = bundle.predict(X)
+
+    assert predictions.shape == (50, 3)
+    np.testing.assert_array_equal(predictions[:, :2], forest.predict(X))
+    np.testing.assert_array_equal(predictions[:, 2], boosting.predict(X[:, [0, 3]]))
+
+
+@pytest.mark.parametrize("engine", ["sklearn", "compiled"])
+def test_bundle_predictor_matches_the_bundle(bundle, engine, tmp_path):
+    path = str(tmp_path / "bundle.joblib")
+    joblib.dump(bundle, path)
+    predictor = compile_predictor(joblib.load(path), engine)
+    X, _ = make_data(80, seed=2)
+
+    assert predictor.engine == ("mixed" if engine == "compiled" else "sklearn")
+    np.testing.assert_array_equal(predictor.predict(X), bundle.predict(X))
+    np.testing.assert_array_equal(predictor.predict(X[:1]), bundle.predict(X[:1]))
+
+
+def test_search_targets_shares_rows_and_folds():
+    X, Y = make_data()
+    train_index, test_index = np.arange(150), np.arange(150, 200)
+    folds = list(KFold(n_splits=3, shuffle=True, random_state=0).split(train_index))
+    grid = {"n_estimators": [5, 10], "max_depth": [2, None]}
+    specs = [{"target": name, "output": output, "columns": [0, 1, 2, 3], "n_iter": 2,
+              "estimator": RandomForestRegressor(random_state=0), "params": grid}
+             for output, name in enumerate(TARGETS)]
+    progress = []
+
+    results = search_targets(X, Y, train_index, test_index, specs, folds, n_jobs=2,
+                             progress=lambda *a: progress.append(a))
+
+    assert [len(r["y_pred"]) for r in results] == [50, 50, 50]
+    assert all(r["search"]["fits"] == 6 for r in results)
+    assert progress[0] == (0, 18) and progress[-1] == (18, 18)
+    # Same rows and folds: each target's result is what its own search finds
+    for output, result in enumerate(results):
+        alone = search_targets(X, Y, train_index, test_index, specs[output:output + 1], folds, n_jobs=1)[0]
+        assert alone["best_params"] == result["best_params"] and alone["cv_score"] == result["cv_score"]
+
+
+def make_dataset(n_rows: int = 80, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "Industry": rng.choice(ALLOWED_INDUSTRIES, n_rows), "Region": rng.choice(ALLOWED_REGIONS, n_rows),
+        "Year": rng.integers(2015, 2025, n_rows), "Revenue": rng.uniform(100, 5000, n_rows),
+        "ProfitMargin": rng.uniform(-5, 30, n_rows), "GrowthRate": rng.uniform(-10, 20, n_rows),
+        "CarbonEmissions": rng.uniform(1e3, 1e6, n_rows), "WaterUsage": rng.uniform(1e2, 1e5, n_rows),
+        "EnergyConsumption": rng.uniform(1e3, 1e6, n_rows),
+    })
+    df["MarketCap"] = df["Revenue"] * 3 + rng.normal(0, 50, n_rows)
+    for k, pillar in enumerate(BUNDLE_TARGETS[:-1]):
+        df[pillar] = 50 + df["ProfitMargin"] * (k + 1) / 4 - df["CarbonEmissions"] / 1e5 + df["MarketCap"] / 1e3
+    return df
+
+
+def predict_esg(body):
+    with Flask(__name__).test_request_context(json=body):
+        return model_controller.predict_esg()
+
+
+def test_bundle_predicts_records_without_market_cap(tmp_path, monkeypatch):
+    df = make_dataset()
+    train_model_bundle(df, model_dir=str(tmp_path), n_jobs=1, budget={"max_fits": 5}, multi_output=False,
+                       reuse_trials=False)
+    registry = ModelRegistry(str(tmp_path), check_interval=0)
+    registry.register(MODEL_BUNDLE, MODEL_FILES[MODEL_BUNDLE])
+    monkeypatch.setattr(model_controller, "model_registry", registry)
+    record = df.drop(columns=BUNDLE_TARGETS).iloc[0].to_dict()
+
+    body, status = predict_esg(record)
+    with_market_cap, _ = predict_esg({**record, "MarketCap": float(df["MarketCap"].iloc[0])})
+
+    assert status == 200, body
+    assert list(body["predictions"]) == BUNDLE_TARGETS
+    assert registry.get(MODEL_BUNDLE).preprocessor.fill_values["MarketCap"] == pytest.approx(df["MarketCap"].mean())
+    # The MarketCap model never reads MarketCap; the pillars use it when given
+    assert body["predictions"]["MarketCap"] == with_market_cap["predictions"]["MarketCap"]
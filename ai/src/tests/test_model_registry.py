@@ -0,0 +1,116 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+from src.services.model_registry import ModelRegistry, save_model
+from src.services.preprocessing import Preprocessor, preprocessor_path
+
+FEATURES = ["Revenue", "CarbonEmissions"]
+
+
+def train(path: str, seed: int) -> RandomForestRegressor:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.random((60, 2)) * 100, columns=FEATURES)
+    preprocessor = Preprocessor.fit(df, FEATURES)
+    model = RandomForestRegressor(n_estimators=5, random_state=seed).fit(preprocessor.transform(df),
+                                                                        df["Revenue"] * seed)
+    save_model(model, path, preprocessor)
+    return model
+
+
+@pytest.fixture
+def registry(tmp_path):
+    registry = ModelRegistry(str(tmp_path), check_interval=0)
+    registry.register("esg_overall", "model.joblib")
+    return registry
+
+
+def count_loads(registry, monkeypatch) -> list:
+    loads = []
+    load = registry._load
+
+    def counted(*args, **kwargs):
+        loads.append(args[0])
+        return load(*args, **kwargs)
+
+    monkeypatch.setattr(registry, "_load", counted)
+    return loads
+
+
+def test_model_is_loaded_once_until_the_file_changes(registry, monkeypatch):
+    loads = count_loads(registry, monkeypatch)
+    train(registry.path("esg_overall"), seed=1)
+
+    first = registry.get("esg_overall")
+    assert registry.get("esg_overall") is first
+    assert loads == ["esg_overall"]
+    assert first.preprocessor.features == FEATURES
+
+    model = train(registry.path("esg_overall"), seed=2)
+    # The rewrite may fall within the filesystem's mtime granularity
+    os.utime(registry.path("esg_overall"), ns=(first.signature[0] + 10**9,) * 2)
+    second = registry.get("esg_overall")
+
+    assert second is not first and second.version != first.version
+    assert len(loads) == 2
+    X = np.array([[10.0, 20.0]], dtype=np.float32)
+    np.testing.assert_array_equal(second.predictor.predict(X), model.predict(X))
+
+
+def test_requests_within_the_check_interval_skip_the_stat(tmp_path, monkeypatch):
+    registry = ModelRegistry(str(tmp_path), check_interval=3600)
+    registry.register("esg_overall", "model.joblib")
+    train(registry.path("esg_overall"), seed=1)
+    first = registry.get("esg_overall")
+    train(registry.path("esg_overall"), seed=2)
+
+    assert registry.get("esg_overall") is first
+    assert registry.refresh("esg_overall") is not first
+
+
+def test_deleted_model_keeps_being_served(registry):
+    train(registry.path("esg_overall"), seed=1)
+    loaded = registry.get("esg_overall")
+    os.remove(registry.path("esg_overall"))
+
+    assert registry.get("esg_overall") is loaded
+
+
+def test_missing_and_unknown_models(registry):
+    with pytest.raises(FileNotFoundError):
+        registry.get("esg_overall")
+    with pytest.raises(KeyError):
+        registry.get("unknown")
+
+
+def test_concurrent_first_requests_load_once(registry, monkeypatch):
+    loads = count_loads(registry, monkeypatch)
+    train(registry.path("esg_overall"), seed=1)
+    barrier = threading.Barrier(8)
+    results = []
+
+    def request():
+        barrier.wait()
+        results.append(registry.get("esg_overall"))
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(loads) == 1
+    assert len({id(loaded) for loaded in results}) == 1
+
+
+def test_model_and_preprocessing_must_agree(registry):
+    train(registry.path("esg_overall"), seed=1)
+    Preprocessor.fit(pd.DataFrame({"Revenue": [1.0]}), ["Revenue"]).save(
+        preprocessor_path(registry.path("esg_overall")))
+
+    with pytest.raises(ValueError, match="expects 2 features"):
+        registry.get("esg_overall")
@@ -0,0 +1,158 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import r2_score
+from sklearn.model_selection import train_test_split
+
+from src.constants.model_features import ALLOWED_INDUSTRIES, ALLOWED_REGIONS
+from src.controllers import train_controller
+from src.services.forest_engine import CompiledForest
+from src.services.model_registry import ModelRegistry, save_model
+from src.services.model_slimming import slim_forest, slim_model, slim_path
+from src.services.preprocessing import Preprocessor
+
+FEATURES = ["Revenue", "ProfitMargin", "GrowthRate"]
+
+
+def make_data(n_rows: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    X = rng.standard_normal((n_rows, len(FEATURES))).astype(np.float32)
+    return X, 3 * X[:, 0] + np.sin(2 * X[:, 1]) + rng.normal(0, 0.3, n_rows)
+
+
+@pytest.fixture(scope="module")
+def forest():
+    X, y = make_data(600)
+    return RandomForestRegressor(n_estimators=40, random_state=0).fit(X, y)
+
+
+def test_slim_forest_keeps_the_r2_floor_on_the_selection_rows(forest):
+    X, y = make_data(300, seed=1)
+    compiled = CompiledForest.from_sklearn(forest)
+    slim, info = slim_forest(compiled, X, y, max_r2_drop=0.01)
+
+    assert slim.n_trees < compiled.n_trees and info["n_trees"] == [40, slim.n_trees]
+    assert info["selection_r2"] >= info["selection_baseline_r2"] - 0.01
+    assert info["selection_r2"] == pytest.approx(r2_score(y, slim.predict(X)))
+    assert info["nodes"][1] < info["nodes"][0]
+
+
+def test_slim_forest_without_a_drop_keeps_the_predictions_when_nothing_is_cut(forest):
+    X, y = make_data(100, seed=2)
+    slim, info = slim_forest(CompiledForest.from_sklearn(forest), X, y, drop_trees=False, prune_depth=False)
+
+    assert info["n_trees"] == [40, 40]
+    np.testing.assert_array_equal(slim.predict(X), forest.predict(X))
+
+
+def test_slim_model_reports_r2_on_rows_not_used_for_selection(forest, tmp_path):
+    model_path = str(tmp_path / "model.joblib")
+    save_model(forest, model_path, Preprocessor.fit(pd.DataFrame(make_data(10)[0], columns=FEATURES), FEATURES))
+    X, y = make_data(400, seed=3)
+
+    report = slim_model(model_path, X, y, max_r2_drop=0.01, n_latency_rows=20)
+
+    assert report["path"] == slim_path(model_path) and os.path.exists(report["path"])
+    assert report["selection_rows"] == 200 and report["test_rows"] == 200
+    slim = CompiledForest.load(report["path"])
+    # The reported r2 is on the half of the rows the cut was not chosen on
+    _, test = train_test_split(np.arange(len(X)), test_size=0.5, random_state=42)
+    assert report["test_r2"]["model"] == "saved"
+    assert report["test_r2"]["slim"] == pytest.approx(r2_score(y[test], slim.predict(X[test])))
+    assert report["test_r2"]["original"] == pytest.approx(r2_score(y[test], forest.predict(X[test])))
+    assert report["test_r2"]["slim"] != pytest.approx(report["selection_r2"])
+    assert slim.metadata["selection_r2"] == report["selection_r2"]
+
+
+def test_slim_model_chooses_the_cut_on_a_reference_and_applies_it_to_the_saved_forest(tmp_path):
+    X, y = make_data(800, seed=5)
+    train, holdout = np.arange(600), np.arange(600, 800)
+    refit = RandomForestRegressor(n_estimators=40, random_state=1).fit(X, y)
+    reference = RandomForestRegressor(n_estimators=40, random_state=2).fit(X[train], y[train])
+    model_path = save_model(refit, str(tmp_path / "model.joblib"))
+
+    report = slim_model(model_path, X[holdout], y[holdout], max_r2_drop=0.01, n_latency_rows=20,
+                        reference=reference)
+
+    compiled = CompiledForest.from_sklearn(refit)
+    expected = compiled.truncated(**report["cut"]).compacted()
+    np.testing.assert_array_equal(CompiledForest.load(report["path"]).predict(X), expected.predict(X))
+    assert report["n_trees"] == [40, expected.n_trees] and report["nodes"][0] == len(compiled.feature)
+    # r2 is reported for the reference, which never saw the holdout rows
+    _, test = train_test_split(holdout, test_size=0.5, random_state=42)
+    judged = CompiledForest.from_sklearn(reference)
+    assert report["test_r2"]["model"] == "reference"
+    assert report["test_r2"]["original"] == pytest.approx(r2_score(y[test], judged.predict(X[test])))
+    assert report["test_r2"]["slim"] == pytest.approx(
+        r2_score(y[test], judged.truncated(**report["cut"]).predict(X[test])))
+
+
+def test_slim_model_needs_rows_to_select_and_test(forest, tmp_path):
+    model_path = save_model(forest, str(tmp_path / "model.joblib"))
+    X, y = make_data(3)
+
+    with pytest.raises(ValueError, match="at least 4"):
+        slim_model(model_path, X, y)
+
+
+def test_slimmed_artifact_is_served_by_the_registry(forest, tmp_path):
+    model_path = str(tmp_path / "model.joblib")
+    save_model(forest, model_path, Preprocessor.fit(pd.DataFrame(make_data(10)[0], columns=FEATURES), FEATURES))
+    X, y = make_data(200, seed=4)
+    report = slim_model(model_path, X, y, n_latency_rows=10)
+    registry = ModelRegistry(str(tmp_path))
+    registry.register("esg_overall", os.path.basename(report["path"]))
+
+    loaded = registry.get("esg_overall")
+
+    assert loaded.predictor.engine == "compiled"
+    assert loaded.preprocessor.features == FEATURES
+    np.testing.assert_array_equal(loaded.predictor.predict(X), CompiledForest.load(report["path"]).predict(X))
+
+
+
+def make_dataset(n_rows: int = 120, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "CompanyName": [f"Company_{i % 30}" for i in range(n_rows)],
+        "Industry": rng.choice(ALLOWED_INDUSTRIES, n_rows), "Region": rng.choice(ALLOWED_REGIONS, n_rows),
+        "Year": rng.integers(2015, 2025, n_rows), "Revenue": rng.uniform(100, 5000, n_rows),
+        "ProfitMargin": rng.uniform(-5, 30, n_rows), "MarketCap": rng.uniform(1e3, 1e5, n_rows),
+        "GrowthRate": rng.uniform(-10, 20, n_rows), "CarbonEmissions": rng.uniform(1e3, 1e6, n_rows),
+        "WaterUsage": rng.uniform(1e2, 1e5, n_rows), "EnergyConsumption": rng.uniform(1e3, 1e6, n_rows),
+    })
+    df["ESG_Overall"] = 50 + df["ProfitMargin"] - df["CarbonEmissions"] / 1e5 + rng.normal(0, 1, n_rows)
+    return df
+
+
+def test_training_chooses_the_cut_on_rows_the_judged_forest_never_saw(tmp_path, monkeypatch):
+    fitted_rows = {}
+    fit = RandomForestRegressor.fit
+
+    def recording_fit(self, X, y, *args, **kwargs):
+        fitted_rows[id(self)] = {row.tobytes() for row in np.asarray(X, dtype=np.float32)}
+        return fit(self, X, y, *args, **kwargs)
+
+    slim_calls = []
+    slim = train_controller.slim_model
+
+    def recording_slim(model_path, X, y, **kwargs):
+        slim_calls.append((X, kwargs.get("reference")))
+        return slim(model_path, X, y, **kwargs)
+
+    monkeypatch.setattr(RandomForestRegressor, "fit", recording_fit)
+    monkeypatch.setattr(train_controller, "slim_model", recording_slim)
+
+    result = train_controller.train_model_esg_overall(make_dataset(), model_dir=str(tmp_path), n_jobs=1,
+                                                      budget={"max_fits": 5}, reuse_trials=False)
+
+    (X, reference), = slim_calls
+    holdout = {row.tobytes() for row in np.asarray(X, dtype=np.float32)}
+    assert reference is not None and holdout.isdisjoint(fitted_rows[id(reference)])
+    # The saved forest itself was refit on every row, holdout included
+    assert any(holdout <= rows for rows in fitted_rows.values())
+    assert result["slim"]["test_r2"]["model"] == "reference"
+    assert os.path.exists(result["slim"]["path"])
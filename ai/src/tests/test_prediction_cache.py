@@ -0,0 +1,43 @@
+import numpy as np
+
+from src.services.prediction_cache import PredictionCache
+
+ROW = np.array([[1.0, 2.0]], dtype=np.float32)
+OTHER_ROW = np.array([[3.0, 4.0]], dtype=np.float32)
+
+
+def test_alternating_versions_keep_their_entries():
+    cache = PredictionCache(max_entries=100, max_versions=2)
+    cache.put("esg", "v1", ROW, 1.0)
+    cache.put("esg", "v2", ROW, 2.0)
+
+    for _ in range(3):
+        assert cache.get("esg", "v1", ROW) == 1.0
+        assert cache.get("esg", "v2", ROW) == 2.0
+    assert cache.stats()["invalidations"] == 0
+
+
+def test_least_recently_seen_version_is_dropped():
+    cache = PredictionCache(max_entries=100, max_versions=2)
+    cache.put("esg", "v1", ROW, 1.0)
+    cache.put("esg", "v2", ROW, 2.0)
+    cache.put("esg", "v2", OTHER_ROW, 2.5)
+    cache.get("esg", "v1", ROW)
+    cache.put("esg", "v3", ROW, 3.0)
+
+    stats = cache.stats()
+    assert stats["invalidations"] == 2
+    assert stats["size"] == 2
+    assert stats["model_versions"] == {"esg": ["v1", "v3"]}
+    assert cache.get("esg", "v1", ROW) == 1.0
+    assert cache.get("esg", "v3", ROW) == 3.0
+
+
+def test_versions_are_tracked_per_model():
+    cache = PredictionCache(max_entries=100, max_versions=1)
+    cache.put("esg", "v1", ROW, 1.0)
+    cache.put("bundle", "b1", ROW, [1.0, 2.0])
+    cache.put("esg", "v2", ROW, 2.0)
+
+    assert cache.get("esg", "v1", ROW) is None
+    assert cache.get("bundle", "b1", ROW) == [1.0, 2.0]
@@ -0,0 +1,131 @@
+import pickle
+
+import numpy as np
+import pytest
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestRegressor
+
+from src.services.search import ProgressHalvingRandomSearchCV, ProgressRandomizedSearchCV, make_search, planned_fits
+from src.services.trial_store import TrialStore, params_key
+
+PARAMS = {"n_estimators": [5, 10, 20], "max_depth": [2, 4, None], "min_samples_leaf": [1, 2]}
+
+
+def make_data(n_rows: int = 120, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    X = rng.standard_normal((n_rows, 4))
+    return X, 2 * X[:, 0] - X[:, 1] + rng.normal(0, 0.1, n_rows)
+
+
+def test_random_search_keeps_its_parameters_through_clone():
+    search = make_search(RandomForestRegressor(random_state=0), PARAMS, n_iter=4, cv=3, scoring="r2",
+                         random_state=7, n_jobs=1, chunk_size=2)
+    cloned = clone(search)
+
+    assert isinstance(cloned, ProgressRandomizedSearchCV)
+    params = cloned.get_params(deep=False)
+    assert {name: params[name] for name in ("n_iter", "cv", "scoring", "random_state", "n_jobs", "chunk_size")} == \
+        {"n_iter": 4, "cv": 3, "scoring": "r2", "random_state": 7, "n_jobs": 1, "chunk_size": 2}
+
+
+def test_random_search_set_params_and_pickle():
+    search = make_search(RandomForestRegressor(random_state=0), PARAMS, n_iter=4, cv=3, scoring="r2",
+                         random_state=7, n_jobs=1)
+    search.set_params(n_iter=2, estimator__max_features=1.0)
+    restored = pickle.loads(pickle.dumps(search))
+
+    assert restored.n_iter == 2 and restored.cv == 3
+    assert restored.estimator.max_features == 1.0
+
+
+def test_random_search_matches_randomized_search_cv():
+    from sklearn.model_selection import RandomizedSearchCV
+
+    X, y = make_data()
+    kwargs = {"n_iter": 5, "cv": 3, "scoring": "r2", "random_state": 3, "n_jobs": 1}
+    progress = []
+    ours = make_search(RandomForestRegressor(random_state=0), PARAMS, progress=lambda *a: progress.append(a),
+                       **kwargs).fit(X, y)
+    reference = RandomizedSearchCV(RandomForestRegressor(random_state=0), PARAMS, **kwargs).fit(X, y)
+
+    assert ours.best_params_ == reference.best_params_
+    np.testing.assert_array_equal(ours.cv_results_["mean_test_score"], reference.cv_results_["mean_test_score"])
+    assert progress[-1] == (15, 15)
+    assert ours.search_stats_["fits"] == 15
+
+
+def test_halving_search_keeps_its_parameters_through_clone():
+    search = make_search(RandomForestRegressor(random_state=0), PARAMS, mode="halving", n_iter=6, cv=3,
+                         scoring="r2", random_state=7, n_jobs=1, budget={"max_seconds": 60})
+    cloned = clone(search)
+
+    assert isinstance(cloned, ProgressHalvingRandomSearchCV)
+    params = cloned.get_params(deep=False)
+    assert {name: params[name] for name in ("resource", "max_resources", "min_resources", "cv", "scoring",
+                                            "random_state", "max_seconds")} == \
+        {"resource": "n_estimators", "max_resources": 20, "min_resources": "exhaust", "cv": 3, "scoring": "r2",
+         "random_state": 7, "max_seconds": 60}
+
+
+def test_halving_search_fits_and_reports_progress():
+    X, y = make_data()
+    progress = []
+    search = make_search(RandomForestRegressor(random_state=0), PARAMS, mode="halving", n_iter=6, cv=3,
+                         scoring="r2", random_state=7, n_jobs=1, progress=lambda *a: progress.append(a))
+    search.fit(X, y)
+
+    assert set(search.best_params_) == {"max_depth", "min_samples_leaf", "n_estimators"}
+    assert progress[-1][0] == progress[-1][1] == search.search_stats_["fits"]
+
+
+def stored_search(trials, n_iter: int = 5, random_state: int = 3):
+    return make_search(RandomForestRegressor(random_state=0), PARAMS, n_iter=n_iter, cv=3, scoring="r2",
+                       random_state=random_state, n_jobs=1, trials=trials, target="y")
+
+
+def test_rerun_from_stored_trials_gives_the_same_results_without_fitting(tmp_path):
+    X, y = make_data()
+    trials = TrialStore(str(tmp_path / "trials.db"))
+    first = stored_search(trials).fit(X, y)
+    progress = []
+    rerun = stored_search(trials).set_params(progress=lambda *a: progress.append(a)).fit(X, y)
+
+    assert rerun.search_stats_["fits"] == 0 and rerun.search_stats_["stored_trials"] == 5
+    assert progress[-1] == (0, 0)
+    timing = ("mean_fit_time", "std_fit_time", "mean_score_time", "std_score_time")
+    assert rerun.cv_results_.keys() == first.cv_results_.keys()
+    for key, values in first.cv_results_.items():
+        if key not in timing:
+            np.testing.assert_array_equal(rerun.cv_results_[key], values, err_msg=key)
+    assert rerun.best_index_ == first.best_index_ and rerun.best_score_ == first.best_score_
+    assert rerun.n_splits_ == 3
+    np.testing.assert_array_equal(rerun.predict(X), first.predict(X))
+
+
+def mean_scores(search) -> dict:
+    return {params_key(p): score for p, score in zip(search.cv_results_["params"],
+                                                     search.cv_results_["mean_test_score"])}
+
+
+def test_partly_stored_search_matches_a_fresh_search(tmp_path):
+    X, y = make_data()
+    trials = TrialStore(str(tmp_path / "trials.db"))
+    stored_search(trials, n_iter=4, random_state=1).fit(X, y)
+    resumed = stored_search(trials, n_iter=8).fit(X, y)
+    fresh = stored_search(None, n_iter=8).fit(X, y)
+
+    stored = resumed.search_stats_["stored_trials"]
+    assert 0 < stored < 8 and resumed.search_stats_["fits"] == (8 - stored) * 3
+    assert mean_scores(resumed) == mean_scores(fresh)
+    assert resumed.best_params_ == fresh.best_params_
+
+
+@pytest.mark.parametrize("mode", ["random", "halving"])
+def test_max_fits_is_never_exceeded(mode):
+    for max_fits in (3, 7, 20):
+        search = make_search(RandomForestRegressor(random_state=0), PARAMS, mode=mode, n_iter=6, cv=3,
+                             budget={"max_fits": max_fits})
+        assert planned_fits(search) <= max_fits
+
+    with pytest.raises(ValueError, match="at least the number of CV folds"):
+        make_search(RandomForestRegressor(random_state=0), PARAMS, mode=mode, cv=3, budget={"max_fits": 2})
@@ -0,0 +1,57 @@
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.model_selection import KFold
+
+from src.services.trial_store import TrialStore, estimator_key, fingerprint, params_key
+
+ESTIMATOR = estimator_key(RandomForestRegressor(random_state=0), {"max_depth": [2, 4]}, "r2")
+
+
+def test_saved_trials_are_looked_up_by_dataset_target_and_estimator(tmp_path):
+    store = TrialStore(str(tmp_path / "trials.db"))
+    store.save("data", "ESG_Overall", ESTIMATOR, [({"max_depth": 2}, [0.5, 0.6], 1.0),
+                                                  ({"max_depth": 4}, [0.7, 0.8], 2.0)])
+
+    found = store.lookup("data", "ESG_Overall", ESTIMATOR, [{"max_depth": 4}, {"max_depth": 8}])
+    assert found == {params_key({"max_depth": 4}): [0.7, 0.8]}
+    assert store.lookup("other data", "ESG_Overall", ESTIMATOR, [{"max_depth": 4}]) == {}
+    assert store.lookup("data", "MarketCap", ESTIMATOR, [{"max_depth": 4}]) == {}
+
+    store.save("data", "ESG_Overall", ESTIMATOR, [({"max_depth": 4}, [0.1, 0.2], 1.0)])
+    assert store.lookup("data", "ESG_Overall", ESTIMATOR, [{"max_depth": 4}]) == \
+        {params_key({"max_depth": 4}): [0.1, 0.2]}
+    assert store.stats()["searches"] == [{"target": "ESG_Overall", "estimator": "RandomForestRegressor",
+                                          "trials": 2, "datasets": 1, "fit_seconds": 2.0}]
+
+
+def test_best_params_come_from_other_datasets_best_first(tmp_path):
+    store = TrialStore(str(tmp_path / "trials.db"))
+    store.save("old", "ESG_Overall", ESTIMATOR, [({"max_depth": 2}, [0.5], 1.0), ({"max_depth": 4}, [0.9], 1.0),
+                                                 ({"max_depth": 8}, [float("nan")], 1.0)])
+    store.save("current", "ESG_Overall", ESTIMATOR, [({"max_depth": 16}, [0.99], 1.0)])
+
+    assert store.best_params("ESG_Overall", ESTIMATOR, exclude_fingerprint="current") == \
+        [{"max_depth": 4}, {"max_depth": 2}]
+    assert store.best_params("ESG_Overall", ESTIMATOR, limit=1) == [{"max_depth": 16}]
+
+
+def test_fingerprint_covers_the_data_and_the_folds():
+    rng = np.random.default_rng(0)
+    X, y = rng.random((30, 3)), rng.random(30)
+    folds = list(KFold(3).split(X))
+
+    key = fingerprint(X, y, folds)
+
+    assert fingerprint(X.copy(), y.copy(), list(KFold(3).split(X))) == key
+    assert fingerprint(X, y, list(KFold(3, shuffle=True, random_state=0).split(X))) != key
+    assert fingerprint(X.astype(np.float32), y, folds) != key
+    y[0] += 1
+    assert fingerprint(X, y, folds) != key
+
+
+def test_estimator_key_leaves_out_the_searched_parameters():
+    searched = {"max_depth": [2, 4]}
+
+    assert estimator_key(RandomForestRegressor(max_depth=2, random_state=0), searched, "r2") == ESTIMATOR
+    assert estimator_key(RandomForestRegressor(random_state=1), searched, "r2") != ESTIMATOR
+    assert estimator_key(RandomForestRegressor(random_state=0), searched, "neg_mean_squared_error") != ESTIMATOR
@@ -0,0 +1,137 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+
+class LogWriter:
+    """
+    Writes log lines from a background thread.
+
+    ``submit`` hands an entry over through a bounded queue, which costs
+    the caller one ``put_nowait``: a LogRecord, formatted with
+    ``formatter``, or a dict, written as a compact JSON line. Formatting
+    and I/O happen on the writer thread. When the queue is full the entry
+    is dropped and counted, so a slow log sink never blocks a request.
+
+    The thread is started on first use, and again in a forked child.
+    Entries still queued at exit are written for up to two seconds.
+    """
+
+    def __init__(self, stream=None, formatter: logging.Formatter | None = None, queue_size: int = 10000):
+        # None writes to the sys.stderr of the moment, so redirecting it still works
+        self.stream = stream
+        self.formatter = formatter or logging.Formatter()
+        self.queue_size = queue_size
+        self.written = 0
+        self.dropped = 0
+        self._queue = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def submit(self, entry) -> bool:
+        """Queue a LogRecord or a dict; returns False if it was dropped."""
+        if self._pid != os.getpid():
+            self._start()
+        try:
+            self._queue.put_nowait(entry)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def flush(self, timeout: float = 2.0) -> bool:
+        """Wait until every entry submitted so far has been written."""
+        if self._pid != os.getpid():
+            return True
+        deadline = time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def stats(self) -> dict:
+        pending = self._queue.qsize() if self._pid == os.getpid() else 0
+        return {"pending": pending, "written": self.written, "dropped": self.dropped}
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # A fresh queue: the parent's may have been locked at fork time.
+            self._queue = queue.Queue(self.queue_size)
+            threading.Thread(target=self._run, args=(self._queue,), name="log-writer", daemon=True).start()
+            if self._pid is None:
+                atexit.register(self.flush)
+            self._pid = os.getpid()
+
+    def _run(self, entries: queue.Queue) -> None:
+        while True:
+            entry = entries.get()
+            try:
+                stream = self.stream or sys.stderr
+                if isinstance(entry, logging.LogRecord):
+                    stream.write(self.formatter.format(entry) + "\n")
+                else:
+                    stream.write(_json_line(entry) + "\n")
+                if entries.empty():
+                    stream.flush()
+                self.written += 1
+            except Exception:
+                self.dropped += 1
+            finally:
+                entries.task_done()
+
+
+class WriterHandler(logging.Handler):
+    """Logging handler that hands records to a LogWriter instead of formatting them here."""
+
+    def __init__(self, writer: LogWriter):
+        super().__init__()
+        self.writer = writer
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.writer.submit(record)
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as one compact JSON object."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": record.created,
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "source": f"{record.filename}:{record.lineno}",
+            "msg": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id is not None:
+            entry["request_id"] = request_id
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return _json_line(entry)
+
+
+def _json_line(entry: dict) -> str:
+    # Timestamps and payloads are taken raw on the request path and converted here.
+    entry = {key: _text(value) for key, value in entry.items()}
+    if isinstance(entry.get("ts"), float):
+        entry["ts"] = datetime.fromtimestamp(entry["ts"], tz=timezone.utc).isoformat(timespec="milliseconds")
+    if isinstance(entry.get("duration_ms"), float):
+        entry["duration_ms"] = round(entry["duration_ms"], 3)
+    return json.dumps(entry, separators=(",", ":"), default=str)
+
+
+def _text(value):
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode("utf-8", errors="replace")
+    return value
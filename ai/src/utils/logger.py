@@ -1,4 +1,7 @@
 import logging
+
+from src.configs.load_config import Config
+from src.utils.log_writer import JsonFormatter, LogWriter, WriterHandler
 # import json
 # The line `from flask_log_request_id import RequestIDLogFilter` is importing the `RequestIDLogFilter`
 # class from the `flask_log_request_id` module. This class is likely used to filter log messages based
@@ -44,14 +47,21 @@ class ColoredFormatter(logging.Formatter):
         return log_msg
 
 
+config = Config()
+
 logger = logging.getLogger(__name__)
 logger.setLevel("DEBUG")
 
-formatter = ColoredFormatter(
-    "%(asctime)s %(levelname)s %(filename)s:%(lineno)d - %(msg)s", datefmt='%Y-%m-%d %H:%M:%S')
+if config.log.format == "json":
+    formatter = JsonFormatter()
+else:
+    formatter = ColoredFormatter(
+        "%(asctime)s %(levelname)s %(filename)s:%(lineno)d - %(msg)s", datefmt='%Y-%m-%d %H:%M:%S')
 
-handler = logging.StreamHandler()
+# Records are formatted and written by a background thread, off the request path.
+log_writer = LogWriter(formatter=formatter, queue_size=config.log.queue_size)
+handler = WriterHandler(log_writer)
 logger.addHandler(handler)
 
+# The request id is added by src.middlewares.log_request.RequestIdFilter
 # handler.addFilter(RequestIDLogFilter())
-handler.setFormatter(formatter)
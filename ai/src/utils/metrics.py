@@ -0,0 +1,410 @@
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single serving process, metrics are never shared
+    fcntl = None
+
+# Latency buckets in seconds, from 100us to 30s
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Durations of loads and training runs, from 10ms to 2h
+SLOW_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 1800.0, 3600.0, 7200.0)
+# Rows per batched predict call
+BATCH_ROW_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class _Shards:
+    """
+    Per-thread value arrays of one metric series.
+
+    Each thread writes only to its own list, so recording needs no lock.
+    Reading sums every list; lists of threads that have exited are folded
+    into a retired total so short-lived request threads do not pile up.
+    """
+
+    def __init__(self, size: int):
+        self._size = size
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = []
+        self._retired = [0] * size
+
+    def get(self) -> list:
+        try:
+            return self._local.values
+        except AttributeError:
+            values = [0] * self._size
+            with self._lock:
+                self._retire_dead()
+                self._shards.append((threading.current_thread(), values))
+            self._local.values = values
+            return values
+
+    def totals(self) -> list:
+        with self._lock:
+            self._retire_dead()
+            totals = list(self._retired)
+            for _, values in self._shards:
+                for i, value in enumerate(values):
+                    totals[i] += value
+        return totals
+
+    def _retire_dead(self) -> None:
+        # Must be called with the lock held.
+        alive = []
+        for thread, values in self._shards:
+            if thread.is_alive():
+                alive.append((thread, values))
+            else:
+                for i, value in enumerate(values):
+                    self._retired[i] += value
+        self._shards = alive
+
+
+class _Series:
+    """Values of one label combination, kept in per-thread shards."""
+
+    size = 1
+
+    def __init__(self):
+        self._shards = _Shards(self.size)
+
+    def totals(self) -> list:
+        return self._shards.totals()
+
+    def reset(self) -> None:
+        self._shards = _Shards(self.size)
+
+
+class Counter(_Series):
+    """A monotonically increasing count of one label combination."""
+
+    def inc(self, amount: float = 1) -> None:
+        self._shards.get()[0] += amount
+
+    def value(self) -> float:
+        return self._shards.totals()[0]
+
+
+class Gauge(_Series):
+    """A value that goes up and down, e.g. requests in flight."""
+
+    def inc(self, amount: float = 1) -> None:
+        self._shards.get()[0] += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self._shards.get()[0] -= amount
+
+    def value(self) -> float:
+        return self._shards.totals()[0]
+
+
+class Histogram(_Series):
+    """Observations counted in cumulative buckets, plus their sum."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        # One slot per bucket, one for +Inf, and the sum.
+        self.size = len(self.buckets) + 2
+        super().__init__()
+
+    def observe(self, value: float) -> None:
+        values = self._shards.get()
+        values[bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+    def snapshot(self) -> tuple[list, float]:
+        """Return (cumulative bucket counts including +Inf, sum)."""
+        return _cumulative(self.totals())
+
+
+class MetricFamily:
+    """
+    A named metric with label names. ``labels(*values)`` returns the
+    series for one label combination; it is created once and can be kept
+    by the caller, so the hot path never formats strings.
+    """
+
+    def __init__(self, kind: str, name: str, help: str, labelnames=(), **options):
+        self.kind = kind
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._options = options
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        series = self._series.get(values)
+        if series is None:
+            with self._lock:
+                series = self._series.get(values)
+                if series is None:
+                    if len(values) != len(self.labelnames):
+                        raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+                    series = _TYPES[self.kind](**self._options)
+                    self._series[values] = series
+        return series
+
+    def totals(self) -> dict:
+        """Current values of every series, keyed by label values."""
+        return {values: series.totals() for values, series in list(self._series.items())}
+
+    def reset(self) -> None:
+        """Set every series back to zero, keeping the objects callers hold."""
+        for series in list(self._series.values()):
+            series.reset()
+
+    def render(self, totals: dict | None = None) -> list[str]:
+        """Render ``totals`` (label values -> values), by default those of this process."""
+        totals = self.totals() if totals is None else totals
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, series_totals in totals.items():
+            labels = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values)]
+            if self.kind != "histogram":
+                lines.append(f"{self.name}{_braces(labels)} {_number(series_totals[0])}")
+                continue
+            cumulative, total = _cumulative(series_totals)
+            for bound, count in zip((*self._options["buckets"], "+Inf"), cumulative):
+                le = 'le="%s"' % (bound if bound == "+Inf" else _number(bound))
+                lines.append(f"{self.name}_bucket{_braces(labels + [le])} {_number(count)}")
+            lines.append(f"{self.name}_sum{_braces(labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_braces(labels)} {_number(cumulative[-1])}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Holds the metric families of this process and renders them in Prometheus text format.
+
+    After ``share(directory)`` the rendered values are those of every
+    process sharing the directory, e.g. all gunicorn workers, the master
+    and the training job executor (see ``share``).
+    """
+
+    def __init__(self):
+        self._families = {}
+        # Set by share(): directory holding one metrics file per process
+        self.directory = None
+        self.flush_interval = 1.0
+        self._flush_lock = threading.Lock()
+        self._hooks_installed = False
+
+    def counter(self, name: str, help: str, labelnames=()) -> MetricFamily:
+        return self._register(MetricFamily("counter", name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames=()) -> MetricFamily:
+        return self._register(MetricFamily("gauge", name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> MetricFamily:
+        return self._register(MetricFamily("histogram", name, help, labelnames, buckets=buckets))
+
+    def render(self) -> str:
+        totals = self._shared_totals() if self.directory else {}
+        lines = []
+        for family in self._families.values():
+            lines.extend(family.render(totals.get(family.name, {}) if self.directory else None))
+        return "\n".join(lines) + "\n"
+
+    def share(self, directory: str, flush_interval: float = 1.0, clear: bool = False) -> None:
+        """
+        Report the metrics of every process sharing ``directory``.
+
+        This process writes its values to ``<directory>/<pid>.json`` every
+        ``flush_interval`` seconds and when it exits, and ``render`` sums
+        the files of all processes, so other processes' values are up to
+        one interval old. A forked child starts from zero and writes its
+        own file, so what the parent recorded before the fork is counted
+        once. When a process exits, call ``process_exited`` with its pid
+        from its parent: its counters and histograms are kept and its
+        gauges dropped. ``clear`` removes the files of an earlier run.
+        """
+        os.makedirs(directory, exist_ok=True)
+        if clear:
+            for path in glob.glob(os.path.join(directory, "*.json")):
+                os.remove(path)
+        self.directory = directory
+        self.flush_interval = flush_interval
+        if not self._hooks_installed:
+            self._hooks_installed = True
+            os.register_at_fork(after_in_child=self._after_fork)
+            atexit.register(self.flush)
+        self._start_flusher()
+
+    def flush(self) -> None:
+        """Write the values of this process to its file in the shared directory."""
+        if self.directory is None:
+            return
+        data = {name: [[list(values), totals] for values, totals in family.totals().items()]
+                for name, family in self._families.items()}
+        with self._flush_lock:
+            _write_json(self._path(str(os.getpid())), data)
+
+    def process_exited(self, pid: int) -> None:
+        """
+        Fold the counters and histograms of an exited process into the
+        totals of all exited processes and remove its file. Its gauges,
+        e.g. requests in flight, ended with it.
+        """
+        path = self._path(str(pid))
+        with self._directory_lock():
+            if not os.path.exists(path):
+                return
+            exited = {}
+            self._add_file(exited, self._path("exited"))
+            self._add_file(exited, path, skip_gauges=True)
+            _write_json(self._path("exited"), {
+                name: [[list(values), totals] for values, totals in series.items()]
+                for name, series in exited.items()})
+            os.remove(path)
+
+    def _shared_totals(self) -> dict:
+        """Sum the files of every process: family name -> label values -> values."""
+        self.flush()
+        totals = {}
+        with self._directory_lock(shared=True):
+            for path in glob.glob(os.path.join(self.directory, "*.json")):
+                self._add_file(totals, path)
+        return totals
+
+    def _add_file(self, totals: dict, path: str, skip_gauges: bool = False) -> None:
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        for name, series in data.items():
+            family = self._families.get(name)
+            if family is None or (skip_gauges and family.kind == "gauge"):
+                continue
+            family_totals = totals.setdefault(name, {})
+            for values, values_totals in series:
+                current = family_totals.setdefault(tuple(values), [0] * len(values_totals))
+                for i, value in enumerate(values_totals):
+                    current[i] += value
+
+    def _start_flusher(self) -> None:
+        def flush_forever():
+            while True:
+                time.sleep(self.flush_interval)
+                try:
+                    self.flush()
+                except OSError as e:
+                    from src.utils.logger import logger
+                    logger.warning(f"Could not write metrics to {self.directory}: {e}")
+
+        threading.Thread(target=flush_forever, name="metrics-flusher", daemon=True).start()
+
+    def _after_fork(self) -> None:
+        if self.directory is None:
+            return
+        self._flush_lock = threading.Lock()
+        for family in self._families.values():
+            family._lock = threading.Lock()
+            family.reset()
+        self._start_flusher()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.json")
+
+    @contextmanager
+    def _directory_lock(self, shared: bool = False):
+        # Keeps readers from seeing an exited process both in its own file
+        # and in the exited totals, or in neither.
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.directory, ".lock"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _register(self, family: MetricFamily) -> MetricFamily:
+        if family.name in self._families:
+            raise ValueError(f"Metric already registered: {family.name}")
+        self._families[family.name] = family
+        return family
+
+
+_TYPES = {"counter": Counter, "gauge": Gauge, "histogram": Histogram}
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _braces(labels: list) -> str:
+    return "{" + ",".join(labels) + "}" if labels else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _cumulative(totals: list) -> tuple[list, float]:
+    """Cumulative bucket counts including +Inf, and the sum, of a histogram's values."""
+    cumulative, running = [], 0
+    for count in totals[:-1]:
+        running += count
+        cumulative.append(running)
+    return cumulative, totals[-1]
+
+
+def _write_json(path: str, data: dict) -> None:
+    tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+metrics = MetricsRegistry()
+
+REQUEST_SECONDS = metrics.histogram(
+    "esg_http_request_duration_seconds", "Request latency by route and status code.", ("route", "status"))
+REQUESTS_IN_FLIGHT = metrics.gauge(
+    "esg_http_requests_in_flight", "Requests being handled, by route.", ("route",))
+PREDICT_STAGE_SECONDS = metrics.histogram(
+    "esg_predict_stage_duration_seconds", "Time spent in each stage of a prediction request.",
+    ("endpoint", "stage"))
+CSV_SCORED_ROWS = metrics.counter(
+    "esg_csv_scored_rows_total", "Rows of uploaded CSV files scored, by outcome.", ("outcome",))
+MICRO_BATCH_ROWS = metrics.histogram(
+    "esg_predict_micro_batch_rows", "Single predictions served by one batched predict call.",
+    ("endpoint",), buckets=BATCH_ROW_BUCKETS)
+MICRO_BATCH_WAIT_SECONDS = metrics.histogram(
+    "esg_predict_micro_batch_wait_seconds", "Time a single prediction waited to be batched.", ("endpoint",))
+MODEL_LOAD_SECONDS = metrics.histogram(
+    "esg_model_load_duration_seconds", "Time to hash, deserialize and compile a model version.",
+    ("model",), buckets=SLOW_BUCKETS)
+MODEL_LOADS = metrics.counter(
+    "esg_model_loads_total", "Model versions loaded into this process.", ("model",))
+ARTIFACT_FETCHES = metrics.counter(
+    "esg_artifact_fetches_total",
+    "Object store artifacts resolved to the local cache: hit, shared (another download) or download.",
+    ("result",))
+ARTIFACT_DOWNLOAD_BYTES = metrics.counter(
+    "esg_artifact_download_bytes_total", "Bytes of object store artifacts downloaded into the local cache.")
+STORE_DOCUMENTS = metrics.counter(
+    "esg_store_documents_total", "Documents handed to the MongoDB write-behind queue, by outcome.",
+    ("collection", "outcome"))
+STORE_PENDING = metrics.gauge(
+    "esg_store_pending_documents", "Documents queued or being written to MongoDB.")
+STORE_WRITE_SECONDS = metrics.histogram(
+    "esg_store_write_duration_seconds", "Duration of one insert_many call.", ("collection",))
+TRAINING_JOB_SECONDS = metrics.histogram(
+    "esg_training_job_duration_seconds", "Wall time of finished training jobs.", ("kind", "status"),
+    buckets=SLOW_BUCKETS)
+TRAINING_JOBS = metrics.counter(
+    "esg_training_jobs_total", "Finished training jobs.", ("kind", "status"))
+TRAINING_CV_FITS = metrics.counter(
+    "esg_training_cv_fits_total", "Cross-validation fits completed by training jobs.", ("kind",))
@@ -0,0 +1,103 @@
+const { spawn } = require('child_process');
+const path = require('path');
+const readline = require('readline');
+
+// Talks to one long-lived `python ai_model.py serve` process over NDJSON,
+// so the interpreter start and model load are paid once instead of per request.
+class AiModelClient {
+    constructor({
+        python = process.env.PYTHON || 'python',
+        script = path.join(__dirname, '../ai/ai_model.py'),
+        timeoutMs = 5000
+    } = {}) {
+        this.python = python;
+        this.script = script;
+        this.timeoutMs = timeoutMs;
+        this.child = null;
+        this.nextId = 0;
+        this.pending = new Map();
+    }
+
+    // Score one record: { revenue, emissions } -> ESG score
+    async predict(record) {
+        const response = await this.request(record);
+        return response.esg_score;
+    }
+
+    // Score many records with a single model call -> array of ESG scores
+    async predictBatch(records) {
+        const response = await this.request({ records });
+        return response.esg_scores;
+    }
+
+    request(payload) {
+        const child = this.start();
+        const id = ++this.nextId;
+        return new Promise((resolve, reject) => {
+            const timer = setTimeout(() => {
+                this.pending.delete(id);
+                reject(new Error('AI model timed out'));
+            }, this.timeoutMs);
+            this.pending.set(id, { resolve, reject, timer });
+            child.stdin.write(JSON.stringify({ ...payload, id }) + '\n');
+        });
+    }
+
+    // Spawn the model process if it is not running (it is restarted after a crash)
+    start() {
+        if (this.child) {
+            return this.child;
+        }
+        const child = spawn(this.python, [this.script, 'serve'], {
+            stdio: ['pipe', 'pipe', 'inherit']
+        });
+        this.child = child;
+
+        readline.createInterface({ input: child.stdout }).on('line', (line) => {
+            let response;
+            try {
+                response = JSON.parse(line);
+            } catch (err) {
+                console.error('Invalid response from AI model:', line);
+                return;
+            }
+            const waiter = this.pending.get(response.id);
+            if (!waiter) {
+                return;
+            }
+            this.pending.delete(response.id);
+            clearTimeout(waiter.timer);
+            if (response.error) {
+                waiter.reject(new Error(response.error));
+            } else {
+                waiter.resolve(response);
+            }
+        });
+
+        const onExit = (err) => {
+            if (this.child !== child) {
+                return;
+            }
+            this.child = null;
+            for (const [id, waiter] of this.pending) {
+                clearTimeout(waiter.timer);
+                waiter.reject(err || new Error('AI model process exited'));
+                this.pending.delete(id);
+            }
+        };
+        child.on('exit', () => onExit());
+        child.on('error', onExit);
+        child.stdin.on('error', onExit);
+        return child;
+    }
+
+    stop() {
+        if (this.child) {
+            this.child.kill();
+            this.child = null;
+        }
+    }
+}
+
+module.exports = new AiModelClient();
+module.exports.AiModelClient = AiModelClient;
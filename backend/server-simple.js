@@ -9,6 +9,7 @@ require('dotenv').config();
 
 const { register, login } = require('./userModel');
 const { authenticateToken } = require('./authMiddleware');
+const aiModel = require('./aiModelClient');
 
 // Thay bằng Infura key (tạo miễn phí tại https://app.infura.io/register)
 const web3 = new Web3('https://sepolia.infura.io/v3/163d705cc5c14d53b5abc349908cb2c9');
@@ -142,70 +143,49 @@ app.get('/records/:id', authenticateToken, async (req, res) => {
 app.post('/evaluate', authenticateToken, async (req, res) => {
     try {
         const { 
+            revenue,
             emissions, 
-            waterUsage, 
-            wasteManagement, 
-            renewableEnergy, 
-            socialImpact,
             projectDescription = 'ESG Evaluation',
             loanAmount = 0
         } = req.body;
 
-        // Call AI model
-        const { spawn } = require('child_process');
-        const python = spawn('python', ['../ai/ai_model.py'], { cwd: __dirname });
-        
-        let dataString = '';
-        python.stdout.on('data', (data) => {
-            dataString += data.toString();
-        });
-
-        python.stdin.write(JSON.stringify({
-            emissions: parseFloat(emissions) || 0,
-            waterUsage: parseFloat(waterUsage) || 0,
-            wasteManagement: parseFloat(wasteManagement) || 0,
-            renewableEnergy: parseFloat(renewableEnergy) || 0,
-            socialImpact: parseFloat(socialImpact) || 0
-        }));
-        python.stdin.end();
-
-        python.on('close', async (code) => {
-            if (code !== 0) {
-                return res.status(500).json({ error: 'AI model failed' });
-            }
+        // Call AI model (long-lived process, see aiModelClient.js)
+        let score;
+        try {
+            score = await aiModel.predict({
+                revenue: parseFloat(revenue) || 0,
+                emissions: parseFloat(emissions) || 0
+            });
+        } catch (err) {
+            console.error('AI model failed:', err);
+            return res.status(500).json({ error: 'AI model failed' });
+        }
 
-            try {
-                const result = JSON.parse(dataString);
-                const esgScore = Math.round(result.esg_score);
-                const creditAmount = Math.round(esgScore * 100); // 100 tokens per ESG point
+        const esgScore = Math.round(score);
+        const creditAmount = Math.round(esgScore * 100); // 100 tokens per ESG point
 
-                // Add record to blockchain
-                const tx = await contract.methods.addRecord(esgScore, creditAmount).send({
-                    from: account,
-                    gas: 300000
-                });
+        // Add record to blockchain
+        const tx = await contract.methods.addRecord(esgScore, creditAmount).send({
+            from: account,
+            gas: 300000
+        });
 
-                // Emit WebSocket event
-                io.emit('transactionUpdate', {
-                    esgScore: esgScore,
-                    txHash: tx.transactionHash,
-                    creditAmount: creditAmount,
-                    user: req.user.username
-                });
+        // Emit WebSocket event
+        io.emit('transactionUpdate', {
+            esgScore: esgScore,
+            txHash: tx.transactionHash,
+            creditAmount: creditAmount,
+            user: req.user.username
+        });
 
-                res.json({
-                    esgScore: esgScore,
-                    creditAmount: creditAmount,
-                    txHash: tx.transactionHash,
-                    approved: esgScore > 70,
-                    interestRate: esgScore > 70 ? 5.5 : 8.0,
-                    projectDescription: projectDescription,
-                    loanAmount: loanAmount
-                });
-            } catch (err) {
-                console.error('Error processing AI result:', err);
-                res.status(500).json({ error: err.message });
-            }
+        res.json({
+            esgScore: esgScore,
+            creditAmount: creditAmount,
+            txHash: tx.transactionHash,
+            approved: esgScore > 70,
+            interestRate: esgScore > 70 ? 5.5 : 8.0,
+            projectDescription: projectDescription,
+            loanAmount: loanAmount
         });
 
     } catch (err) {